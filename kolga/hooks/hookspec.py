@@ -11,7 +11,7 @@ if TYPE_CHECKING:
 
     from kolga.libs.project import Project
     from kolga.libs.service import Service
-    from kolga.utils.models import DockerImage
+    from kolga.utils.models import BuildContextReport, DockerImage, ReleaseStatus
 
 
 class KolgaHookSpec:
@@ -47,6 +47,32 @@ class KolgaHookSpec:
             The return value is not acted upon by Kólga.
         """
 
+    @hookspec
+    def command_retry(
+        self,
+        command: str,
+        attempt: int,
+        delay: float,
+        elapsed: float,
+        reason: str,
+    ) -> Optional[bool]:
+        """
+        Fired when a command failed transiently and is about to be retried.
+
+        Args:
+            command: The command that failed
+            attempt: Number of the failed attempt, starting from 1
+            delay: Seconds to wait before the next attempt
+            elapsed: Seconds spent on the command so far
+            reason: The error the failure was classified as transient by
+
+        Returns:
+            Optionally returns a boolean value denoting if the plugin
+            finished successfully.
+
+            The return value is not acted upon by Kólga.
+        """
+
     @hookspec
     def container_build_begin(self) -> Optional[bool]:
         """
@@ -77,6 +103,24 @@ class KolgaHookSpec:
             The return value is not acted upon by Kólga.
         """
 
+    @hookspec
+    def container_build_context_analyzed(
+        self,
+        report: "BuildContextReport",
+    ) -> Optional[bool]:
+        """
+        Fired when the build context has been analyzed, before building.
+
+        Args:
+            report: A ``BuildContextReport`` object
+
+        Returns:
+            Optionally returns a boolean value denoting if the plugin
+            finished successfully.
+
+            The return value is not acted upon by Kólga.
+        """
+
     @hookspec
     def container_build_stage_begin(
         self,
@@ -195,6 +239,31 @@ class KolgaHookSpec:
             The return value is not acted upon by Kólga.
         """
 
+    @hookspec
+    def project_deployment_status(
+        self,
+        namespace: str,
+        project: "Project",
+        track: str,
+        status: "ReleaseStatus",
+    ) -> Optional[bool]:
+        """
+        Fired when the status of a failed deployment of a project has been collected.
+
+        Args:
+            namespace: Namespace of the deployment
+            project: A ``Project`` object including all information about the project
+            track: Track of the deployment
+            status: A ``ReleaseStatus`` snapshot of the Deployments, ReplicaSets
+                    and Pods of the release
+
+        Returns:
+            Optionally returns a boolean value denoting if the plugin
+            finished successfully.
+
+            The return value is not acted upon by Kólga.
+        """
+
     @hookspec
     def service_deployment_begin(
         self,
@@ -0,0 +1,198 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.settings import settings
+from kolga.utils.logger import logger
+
+CLUSTER_ISSUERS = "cluster_issuers"
+INGRESS_CLASSES = "ingress_classes"
+STORAGE_CLASSES = "storage_classes"
+
+
+class ClusterMetadata:
+    """
+    Cache of cluster scoped resources looked up during a deployment
+
+    The ClusterIssuers, StorageClasses and IngressClasses of the cluster are
+    listed through the API once, on the first lookup, and all lookups are
+    answered from memory after that.
+
+    If ``cache_path`` is set, the listings are also stored to that file and
+    read from there by other runs within ``cache_ttl`` seconds, as long as
+    they target the same cluster.
+
+    Args:
+        api_client: Kubernetes API client
+        cache_path: Path of the disk cache, disabled if empty
+        cache_ttl: Number of seconds the disk cache is valid for
+    """
+
+    ICON = "☸️"
+
+    def __init__(
+        self,
+        api_client: k8s_client.ApiClient,
+        cache_path: str = settings.K8S_CLUSTER_METADATA_CACHE,
+        cache_ttl: int = settings.K8S_CLUSTER_METADATA_CACHE_TTL,
+    ) -> None:
+        self.api_client = api_client
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cache_ttl = cache_ttl
+        self._metadata: Optional[Dict[str, Optional[List[str]]]] = None
+        # ClusterIssuers looked up by name when they can not be listed
+        self._cluster_issuers: Dict[str, Optional[bool]] = {}
+
+    @property
+    def server(self) -> str:
+        return str(self.api_client.configuration.host)
+
+    @staticmethod
+    def _list_names(list_function: Callable[[], Any]) -> Optional[List[str]]:
+        """
+        List the names of resources, or None if they can not be listed
+        """
+        try:
+            response = list_function()
+        except ApiException as e:
+            # The resource type does not exist in the cluster, for instance
+            # when cert-manager is not installed
+            if e.status == 404:
+                return []
+            return None
+
+        if isinstance(response, dict):
+            return sorted(item["metadata"]["name"] for item in response["items"])
+        return sorted(item.metadata.name for item in response.items)
+
+    @staticmethod
+    def _get_cert_manager_api() -> Tuple[str, str]:
+        if settings.K8S_CERTMANAGER_USE_OLD_API:
+            return "certmanager.k8s.io", "v1alpha1"
+        return "cert-manager.io", "v1"
+
+    def _list_cluster_issuers(self) -> Any:
+        custom_objects = k8s_client.CustomObjectsApi(self.api_client)
+        group, version = self._get_cert_manager_api()
+        return custom_objects.list_cluster_custom_object(
+            group=group, version=version, plural="clusterissuers"
+        )
+
+    def _get_cluster_issuer(self, name: str) -> Optional[bool]:
+        """
+        Look up a single ClusterIssuer, which only needs permission to get it
+        """
+        custom_objects = k8s_client.CustomObjectsApi(self.api_client)
+        group, version = self._get_cert_manager_api()
+        try:
+            custom_objects.get_cluster_custom_object(
+                group=group, version=version, plural="clusterissuers", name=name
+            )
+        except ApiException as e:
+            if e.status == 404:
+                return False
+            return None
+        return True
+
+    def fetch(self) -> Dict[str, Optional[List[str]]]:
+        """
+        List the cluster scoped resources through the API
+        """
+        storage_v1 = k8s_client.StorageV1Api(self.api_client)
+        networking_v1 = k8s_client.NetworkingV1Api(self.api_client)
+        return {
+            CLUSTER_ISSUERS: self._list_names(self._list_cluster_issuers),
+            INGRESS_CLASSES: self._list_names(networking_v1.list_ingress_class),
+            STORAGE_CLASSES: self._list_names(storage_v1.list_storage_class),
+        }
+
+    def _read_cache(self) -> Optional[Dict[str, Optional[List[str]]]]:
+        if not self.cache_path:
+            return None
+
+        try:
+            cache = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if cache.get("server") != self.server:
+            return None
+        if time.time() - float(cache.get("timestamp", 0)) > self.cache_ttl:
+            return None
+
+        metadata: Dict[str, Optional[List[str]]] = cache["metadata"]
+        return metadata
+
+    def _write_cache(self, metadata: Dict[str, Optional[List[str]]]) -> None:
+        if not self.cache_path:
+            return
+
+        cache = {"server": self.server, "timestamp": time.time(), "metadata": metadata}
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so that concurrent jobs never
+            # read a partially written cache
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_path.parent)
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(
+                icon=f"{self.ICON}  ⚠️", message=f"Could not write cluster cache: {e}"
+            )
+
+    @property
+    def metadata(self) -> Dict[str, Optional[List[str]]]:
+        if self._metadata is None:
+            self._metadata = self._read_cache()
+            if self._metadata is None:
+                self._metadata = self.fetch()
+                self._write_cache(self._metadata)
+        return self._metadata
+
+    def _has(self, kind: str, name: str) -> Optional[bool]:
+        names = self.metadata.get(kind)
+        if names is None:
+            return None
+        return name in names
+
+    def has_cluster_issuer(self, name: str) -> Optional[bool]:
+        """
+        Check if a ClusterIssuer exists
+
+        If the ClusterIssuers can not be listed, for instance when listing
+        them is not allowed, the ClusterIssuer is looked up by its name.
+
+        Returns:
+            None if the ClusterIssuer could not be looked up
+        """
+        has_cluster_issuer = self._has(CLUSTER_ISSUERS, name)
+        if has_cluster_issuer is None:
+            if name not in self._cluster_issuers:
+                self._cluster_issuers[name] = self._get_cluster_issuer(name)
+            return self._cluster_issuers[name]
+        return has_cluster_issuer
+
+    def has_ingress_class(self, name: str) -> Optional[bool]:
+        """
+        Check if an IngressClass exists
+
+        Returns:
+            None if the IngressClasses could not be listed
+        """
+        return self._has(INGRESS_CLASSES, name)
+
+    def has_storage_class(self, name: str) -> Optional[bool]:
+        """
+        Check if a StorageClass exists
+
+        Returns:
+            None if the StorageClasses could not be listed
+        """
+        return self._has(STORAGE_CLASSES, name)
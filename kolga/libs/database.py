@@ -1,7 +1,8 @@
 import re
+from typing import Optional
 from uuid import uuid4
 
-from kolga.utils.general import DATABASE_DEFAULT_PORT_MAPPING, MYSQL
+from kolga.utils.general import DATABASE_DEFAULT_PORT_MAPPING, MYSQL, POSTGRES
 from kolga.utils.url import URL  # type: ignore
 
 
@@ -11,7 +12,10 @@ class Database:
 
     @staticmethod
     def get_random_auth_database_url(
-        database_driver: str, database_name: str, database_hostname: str
+        database_driver: str,
+        database_name: str,
+        database_hostname: str,
+        username: Optional[str] = None,
     ) -> URL:
         if database_driver not in DATABASE_DEFAULT_PORT_MAPPING.keys():
             raise ValueError("Database not supported")
@@ -19,7 +23,7 @@ class Database:
         # Strip any non-valid chars
         database_name = re.sub(r"[^a-zA-Z0-9_]+", "_", database_name)
 
-        username = str(uuid4()).replace("-", "")
+        username = username or str(uuid4()).replace("-", "")
         password = str(uuid4()).replace("-", "")
         return URL(
             drivername=database_driver,
@@ -32,19 +36,61 @@ class Database:
 
     @staticmethod
     def get_database_creation_sql_from_url(url: URL) -> str:
-        if url.drivername != MYSQL:
-            raise ValueError("Only MySQL is supported at this time")
+        """
+        Get SQL for creating the database and user of a URL
+
+        The statements are idempotent, running them against an existing
+        database only resets the password of the user.
+
+        For PostgreSQL the SQL uses ``psql`` meta-commands and needs to be
+        run through ``psql``.
+        """
+        if url.drivername not in (MYSQL, POSTGRES):
+            raise ValueError("Only MySQL and PostgreSQL are supported at this time")
 
         sql = ""
         if url.drivername == MYSQL:
             sql = f"""
-            CREATE DATABASE `{url.database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci;
+            CREATE DATABASE IF NOT EXISTS `{url.database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci;
             CREATE USER IF NOT EXISTS '{url.username}'@'%' IDENTIFIED BY '{url.password}';
+            ALTER USER '{url.username}'@'%' IDENTIFIED BY '{url.password}';
             GRANT ALL PRIVILEGES ON `{url.database}`.* TO '{url.username}'@'%';
             FLUSH PRIVILEGES;
             """
+        elif url.drivername == POSTGRES:
+            sql = f"""
+            SELECT 'CREATE ROLE "{url.username}"' WHERE NOT EXISTS (SELECT FROM pg_roles WHERE rolname = '{url.username}')\\gexec
+            ALTER ROLE "{url.username}" WITH LOGIN PASSWORD '{url.password}';
+            SELECT 'CREATE DATABASE "{url.database}" OWNER "{url.username}"' WHERE NOT EXISTS (SELECT FROM pg_database WHERE datname = '{url.database}')\\gexec
+            """
+        return sql
+
+    @staticmethod
+    def get_database_deletion_sql_from_url(url: URL) -> str:
+        """
+        Get SQL for dropping the database and user of a URL
+        """
+        if url.drivername not in (MYSQL, POSTGRES):
+            raise ValueError("Only MySQL and PostgreSQL are supported at this time")
+
+        sql = ""
+        if url.drivername == MYSQL:
+            sql = f"""
+            DROP DATABASE IF EXISTS `{url.database}`;
+            DROP USER IF EXISTS '{url.username}'@'%';
+            """
+        elif url.drivername == POSTGRES:
+            sql = f"""
+            SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = '{url.database}';
+            DROP DATABASE IF EXISTS "{url.database}";
+            DROP ROLE IF EXISTS "{url.username}";
+            """
         return sql
 
     @property
     def creation_sql(self) -> str:
         return self.get_database_creation_sql_from_url(self.url)
+
+    @property
+    def deletion_sql(self) -> str:
+        return self.get_database_deletion_sql_from_url(self.url)
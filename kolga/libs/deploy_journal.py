@@ -0,0 +1,183 @@
+import json
+from base64 import b64decode
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.utils.logger import logger
+
+DEPLOY_JOURNAL_NAME = "kolga-deploy-journal"
+DEPLOY_JOURNAL_KEY = "journal.json"
+
+
+class DeployJournal:
+    """
+    A journal of the completed steps of a deployment
+
+    Every completed step is recorded right away together with a hash of its
+    inputs, so that a retried deployment can skip the steps that already
+    completed with the same inputs. A journal belongs to a single run of a
+    deployment, identified by ``run_id``. A journal left behind by another run
+    is ignored, and the journal is cleared once the whole deployment has
+    completed, so that deploying again does all of the work again.
+
+    The journal is kept in a Secret of the deployment namespace if
+    ``core_v1`` is given, in the file ``path`` if that is given, and only in
+    memory otherwise. The inputs of steps include secret values, so their
+    hashes are only stored where the secrets themselves can be read. Failures
+    to read or write the journal are logged and the deployment carries on
+    without it.
+
+    Args:
+        run_id: Identifier of the run of the deployment
+        core_v1: Kubernetes core API, such as ``kubernetes.client.CoreV1Api``
+        namespace: Namespace holding the journal Secret
+        path: Path of the journal file
+        name: Name of the journal Secret
+    """
+
+    ICON = "📒"
+
+    def __init__(
+        self,
+        run_id: str,
+        core_v1: Any = None,
+        namespace: str = "",
+        path: Optional[Path] = None,
+        name: str = DEPLOY_JOURNAL_NAME,
+    ) -> None:
+        self.run_id = run_id
+        self.core_v1 = core_v1
+        self.namespace = namespace
+        self.path = path
+        self.name = name
+        self.steps: Dict[str, str] = {}
+        self._stored = False
+
+    @staticmethod
+    def hash_inputs(inputs: Any) -> str:
+        """
+        Get a hash identifying the inputs of a step
+
+        Inputs are serialized as JSON with sorted keys, values JSON does not
+        support are serialized as strings.
+        """
+        serialized = json.dumps(inputs, sort_keys=True, default=str)
+        return sha256(serialized.encode()).hexdigest()
+
+    def _read(self) -> Optional[str]:
+        if self.core_v1 is not None:
+            try:
+                secret = self.core_v1.read_namespaced_secret(self.name, self.namespace)
+            except ApiException as e:
+                if e.status == 404:
+                    return None
+                raise
+            self._stored = True
+            content = (secret.data or {}).get(DEPLOY_JOURNAL_KEY)
+            return b64decode(content).decode("UTF-8") if content else None
+
+        if self.path and self.path.exists():
+            return self.path.read_text(encoding="UTF-8")
+        return None
+
+    def _write(self, content: str) -> None:
+        if self.core_v1 is not None:
+            body = k8s_client.V1Secret(
+                metadata=k8s_client.V1ObjectMeta(name=self.name),
+                string_data={DEPLOY_JOURNAL_KEY: content},
+                type="Opaque",
+            )
+            if self._stored:
+                self.core_v1.replace_namespaced_secret(self.name, self.namespace, body)
+            else:
+                self.core_v1.create_namespaced_secret(self.namespace, body)
+                self._stored = True
+        elif self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(content, encoding="UTF-8")
+
+    def load(self) -> None:
+        """
+        Load the steps completed by an earlier attempt of the same run
+        """
+        try:
+            content = self._read()
+        except (ApiException, OSError) as e:
+            logger.warning(f"Could not read the deploy journal: {e}", icon=self.ICON)
+            return
+        if not content:
+            return
+
+        try:
+            journal = json.loads(content)
+        except ValueError:
+            logger.warning("Ignoring a malformed deploy journal", icon=self.ICON)
+            return
+        if journal.get("run_id") == self.run_id:
+            self.steps = dict(journal.get("steps", {}))
+
+    def save(self) -> None:
+        content = json.dumps({"run_id": self.run_id, "steps": self.steps})
+        try:
+            self._write(content)
+        except (ApiException, OSError) as e:
+            logger.warning(f"Could not write the deploy journal: {e}", icon=self.ICON)
+
+    def is_completed(self, step: str, inputs: Any) -> bool:
+        """
+        Check if a step has completed with the same inputs
+        """
+        return self.steps.get(step) == self.hash_inputs(inputs)
+
+    def complete(self, step: str, inputs: Any) -> None:
+        """
+        Record the completion of a step and save the journal
+        """
+        self.steps[step] = self.hash_inputs(inputs)
+        self.save()
+
+    def run(self, step: str, inputs: Any, function: Callable[[], Any]) -> bool:
+        """
+        Run a step unless it has already completed with the same inputs
+
+        Args:
+            step: Name of the step, unique within the deployment
+            inputs: JSON serializable inputs of the step
+            function: Function doing the work of the step
+
+        Returns:
+            True if the step was run, False if it was skipped
+        """
+        if self.is_completed(step, inputs):
+            logger.info(
+                icon=f"{self.ICON} ⏭️", message=f"Skipping completed step {step}"
+            )
+            return False
+
+        function()
+        self.complete(step, inputs)
+        return True
+
+    def clear(self) -> None:
+        """
+        Remove the journal after the whole deployment has completed
+        """
+        self.steps = {}
+        try:
+            if self.core_v1 is not None:
+                if self._stored:
+                    self.core_v1.delete_namespaced_secret(self.name, self.namespace)
+                    self._stored = False
+            elif self.path and self.path.exists():
+                self.path.unlink()
+        except ApiException as e:
+            if e.status != 404:
+                logger.warning(
+                    f"Could not remove the deploy journal: {e}", icon=self.ICON
+                )
+        except OSError as e:
+            logger.warning(f"Could not remove the deploy journal: {e}", icon=self.ICON)
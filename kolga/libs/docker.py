@@ -1,12 +1,35 @@
+import json
+import os
 import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import Generator, List, Optional
+from typing import Dict, Generator, List, Optional, Tuple
 
+from kolga.utils.build_context import analyze_build_context, create_minimal_context
+from kolga.utils.dockerfile import parse_dockerfile
 from kolga.utils.logger import logger
-from kolga.utils.models import DockerImage, ImageStage
+from kolga.utils.models import (
+    BuildContextReport,
+    BuildxBuilder,
+    Dockerfile,
+    DockerfileStage,
+    DockerImage,
+    ImageStage,
+    SubprocessResult,
+)
 
 from ..settings import settings
-from ..utils.general import get_environment_vars_by_prefix, run_os_command
+from ..utils.general import (
+    format_bytes,
+    get_environment_vars_by_prefix,
+    loads_json,
+    parse_size,
+    run_os_command,
+)
+
+CACHE_EXPORT_MODES = ("max", "min", "none")
 
 
 class Docker:
@@ -14,14 +37,15 @@ class Docker:
     A wrapper class around various Docker tools
     """
 
-    STAGE_REGEX = re.compile(
-        r"^FROM .*?(?: +AS +(?P<stage>.*))?$", re.IGNORECASE | re.MULTILINE
-    )
+    PRUNE_TOTAL_REGEX = re.compile(r"^Total:\s+(?P<size>\S+)$", re.MULTILINE)
     ICON = "🐳"
 
     def __init__(self, dockerfile: str = settings.DOCKER_BUILD_SOURCE) -> None:
         self.dockerfile = Path(dockerfile)
+        self._parsed_dockerfile: Optional[Tuple[Path, Dockerfile]] = None
         self.docker_context = Path(settings.DOCKER_BUILD_CONTEXT)
+        # Context sent to BuildKit, a minimal copy of docker_context if enabled
+        self.build_context = self.docker_context
 
         self.image_repo = f"{settings.CONTAINER_REGISTRY_REPO}"
         if settings.DOCKER_IMAGE_NAME:
@@ -53,8 +77,146 @@ class Docker:
     def test_image_tag(self, stage: str = settings.DOCKER_TEST_IMAGE_STAGE) -> str:
         return self.stage_image_tag(stage)
 
-    def setup_buildkit(self, name: str = "kolgabk") -> None:
+    @staticmethod
+    def parse_builder(output: str) -> BuildxBuilder:
+        """
+        Parse the output of ``docker buildx inspect``
+        """
+        builder = BuildxBuilder(name="")
+        for line in output.splitlines():
+            key, _, value = line.partition(":")
+            key, value = key.strip(), value.strip()
+            if key == "Name" and not builder.name:
+                builder.name = value
+            elif key == "Driver":
+                builder.driver = value
+            elif key == "Endpoint":
+                builder.endpoints.append(value)
+            elif key == "Status":
+                builder.statuses.append(value)
+        return builder
+
+    def inspect_builder(self, name: str) -> Optional[BuildxBuilder]:
+        """
+        Inspect a buildx builder, starting it if it is stopped
+
+        Returns:
+            None if no builder with the name exists
+        """
+        result = run_os_command(
+            ["docker", "buildx", "inspect", "--bootstrap", name], retry=True
+        )
+        builder = self.parse_builder(result.out)
+        if result.return_code and not builder.name:
+            return None
+        return builder
+
+    @staticmethod
+    def get_buildkitd_config(keep_storage: str) -> str:
+        """
+        Get a BuildKit daemon configuration limiting the size of the local cache
+        """
+        return (
+            "[worker.oci]\n"
+            "  gc = true\n"
+            "\n"
+            "[[worker.oci.gcpolicy]]\n"
+            "  all = true\n"
+            f"  keepBytes = {parse_size(keep_storage)}\n"
+        )
+
+    @staticmethod
+    def get_buildkitd_config_path(name: str) -> Path:
+        docker_config = os.environ.get("DOCKER_CONFIG") or Path.home() / ".docker"
+        return Path(docker_config) / "buildx" / "kolga" / f"{name}.toml"
+
+    def _write_buildkitd_config(self, name: str, keep_storage: str) -> bool:
+        """
+        Write the BuildKit daemon configuration of a builder
+
+        Returns:
+            True if the configuration changed since it was last written
+        """
+        config_path = self.get_buildkitd_config_path(name)
+        config = self.get_buildkitd_config(keep_storage) if keep_storage else ""
+        try:
+            old_config = config_path.read_text()
+        except OSError:
+            old_config = ""
+
+        if config != old_config:
+            if config:
+                config_path.parent.mkdir(parents=True, exist_ok=True)
+                config_path.write_text(config)
+            else:
+                config_path.unlink(missing_ok=True)
+            return True
+        return False
+
+    def is_builder_reusable(
+        self, builder: BuildxBuilder, endpoint: str = settings.BUILDKIT_BUILDER_ENDPOINT
+    ) -> bool:
+        """
+        Check if an existing builder is running and uses the configured endpoint
+        """
+        if not builder.running:
+            return False
+        if endpoint:
+            return builder.driver == "remote" and endpoint in builder.endpoints
+        return builder.driver != "remote"
+
+    def setup_buildkit(
+        self,
+        name: str = settings.BUILDKIT_BUILDER_NAME,
+        endpoint: str = settings.BUILDKIT_BUILDER_ENDPOINT,
+        keep_state: bool = settings.BUILDKIT_BUILDER_KEEP_STATE,
+        gc_keep_storage: str = settings.BUILDKIT_GC_KEEP_STORAGE,
+    ) -> None:
+        """
+        Set up a buildx builder, reusing an existing one when possible
+
+        Reusing a builder keeps its local build cache warm between builds on
+        persistent runners. A builder is recreated if it can not be started,
+        does not use ``endpoint`` or its configuration has changed. The state
+        of the recreated builder, including its cache, is kept unless
+        ``keep_state`` is False.
+
+        Args:
+            name: Name of the builder
+            endpoint: Address of a remote BuildKit daemon, empty for a local one
+            keep_state: Keep the state volume of a recreated builder
+            gc_keep_storage: Maximum size of the local cache of the builder
+        """
+        if endpoint:
+            # A remote daemon is configured and garbage collected on its own
+            gc_keep_storage = ""
+
         with settings.plugin_manager.lifecycle.buildx_setup_buildkit():
+            config_changed = self._write_buildkitd_config(name, gc_keep_storage)
+            builder = self.inspect_builder(name)
+
+            if (
+                builder
+                and not config_changed
+                and self.is_builder_reusable(builder, endpoint)
+            ):
+                result = run_os_command(["docker", "buildx", "use", name])
+                if result.return_code:
+                    logger.std(result, raise_exception=True)
+                logger.success(
+                    icon=f"{self.ICON} 🔨",
+                    message=f"Reusing buildx builder instance (Instance name: {name})",
+                )
+                return
+
+            if builder:
+                remove_command = ["docker", "buildx", "rm"]
+                if keep_state:
+                    remove_command.append("--keep-state")
+                result = run_os_command([*remove_command, name])
+                if result.return_code:
+                    logger.std(result, raise_exception=True)
+
             setup_command = [
                 "docker",
                 "buildx",
@@ -63,6 +225,13 @@ class Docker:
                 name,
                 "--use",
             ]
+            if endpoint:
+                setup_command += ["--driver", "remote"]
+            if gc_keep_storage:
+                config_path = self.get_buildkitd_config_path(name)
+                setup_command += ["--config", str(config_path)]
+            if endpoint:
+                setup_command.append(endpoint)
 
             result = run_os_command(setup_command)
             if result.return_code:
@@ -89,7 +258,7 @@ class Docker:
             registry,
         ]
 
-        result = run_os_command(login_command)
+        result = run_os_command(login_command, retry=True)
         if result.return_code:
             logger.std(result, raise_exception=True)
         else:
@@ -126,22 +295,25 @@ class Docker:
             build_args.append(f"--build-arg={key}={value}")
         return build_args
 
+    def get_dockerfile_model(self) -> Dockerfile:
+        """
+        Get the parsed model of the Dockerfile
+
+        The Dockerfile is parsed once and the model is reused by everything
+        needing the stages, until ``dockerfile`` is pointed to another file.
+        """
+        if self._parsed_dockerfile and self._parsed_dockerfile[0] == self.dockerfile:
+            return self._parsed_dockerfile[1]
+
+        build_args = get_environment_vars_by_prefix(settings.DOCKER_BUILD_ARG_PREFIX)
+        model = parse_dockerfile(
+            self.dockerfile.read_text(encoding="UTF-8"), build_args=build_args
+        )
+        self._parsed_dockerfile = (self.dockerfile, model)
+        return model
+
     def get_stage_names(self) -> List[str]:
-        stage_names = []
-
-        with open(self.dockerfile) as f:
-            while True:
-                line = f.readline()
-                if not line:
-                    break
-                matched_stage = self.STAGE_REGEX.match(line)
-                if not matched_stage:
-                    continue
-                stage_name = (
-                    matched_stage.group("stage") if matched_stage.group("stage") else ""
-                )
-                stage_names.append(stage_name)
-        return stage_names
+        return self.get_dockerfile_model().stage_names
 
     def get_stages(self) -> List[ImageStage]:
         stages: List[ImageStage] = []
@@ -184,7 +356,7 @@ class Docker:
     def pull_image(self, image: str) -> bool:
         logger.info(icon=f"{self.ICON} ⏬", title=f"Pulling {image}:", end=" ")
         pull_command = ["docker", "pull", image]
-        result = run_os_command(pull_command, shell=False)
+        result = run_os_command(pull_command, shell=False, retry=True)
 
         if result.return_code:
             logger.std(result, raise_exception=False)
@@ -223,7 +395,15 @@ class Docker:
         built_images = []
         stages = self.get_stages()
 
-        with settings.plugin_manager.lifecycle.container_build():
+        with settings.plugin_manager.lifecycle.container_build(), ExitStack() as stack:
+            if (
+                settings.DOCKER_BUILD_CONTEXT_ANALYZE
+                or settings.DOCKER_BUILD_CONTEXT_MINIMIZE
+            ):
+                report = self.analyze_build_context()
+                if settings.DOCKER_BUILD_CONTEXT_MINIMIZE and report.unused_bytes:
+                    stack.enter_context(self.minimal_build_context(report))
+
             for stage in stages:
                 if not stage.build:
                     continue
@@ -241,18 +421,263 @@ class Docker:
 
         return built_images
 
-    def build_stage(
+    def analyze_build_context(self, top: int = 10) -> BuildContextReport:
+        """
+        Analyze the build context and report its size
+
+        Paths of the context not read by any stage of the Dockerfile are
+        reported as unused. The report is passed on to the
+        ``container_build_context_analyzed`` hook.
+        """
+        report = analyze_build_context(
+            self.docker_context.absolute(),
+            sources=self.get_dockerfile_model().context_sources,
+            dockerfile=self.dockerfile,
+            top=top,
+        )
+
+        logger.info(
+            icon=f"{self.ICON} 📦",
+            title=(
+                f"Build context: {format_bytes(report.total_bytes)} "
+                f"in {report.file_count} files"
+            ),
+        )
+        for path, size in report.largest_paths:
+            logger.info(title=f"\t {format_bytes(size):>10} {path}")
+        if report.unused_bytes:
+            logger.warning(
+                icon=f"{self.ICON} ⚠️",
+                message=(
+                    f"{format_bytes(report.unused_bytes)} of the build context is "
+                    "not used by the Dockerfile, consider adding it to .dockerignore"
+                ),
+            )
+            for path, size in report.unused_paths:
+                logger.info(title=f"\t {format_bytes(size):>10} {path}")
+
+        settings.plugin_manager.hook.container_build_context_analyzed(report=report)
+        return report
+
+    @contextmanager
+    def minimal_build_context(
+        self, report: BuildContextReport
+    ) -> Generator[Path, None, None]:
+        """
+        Build from a context holding only the files used by the Dockerfile
+        """
+        with tempfile.TemporaryDirectory(prefix="kolga-context-") as context:
+            create_minimal_context(
+                self.docker_context.absolute(), report.used_files, Path(context)
+            )
+            logger.info(
+                icon=f"{self.ICON} 📦",
+                title=(
+                    "Building from a minimal context, leaving out "
+                    f"{format_bytes(report.unused_bytes)}"
+                ),
+            )
+            self.build_context = Path(context)
+            try:
+                yield self.build_context
+            finally:
+                self.build_context = self.docker_context
+
+    @staticmethod
+    def get_platform_nodes(
+        nodes: List[str] = settings.BUILDKIT_PLATFORM_NODES,
+    ) -> Dict[str, str]:
+        """
+        Parse the native builder nodes of platforms
+
+        Nodes are given as ``<platform>=<node>``, where the node is either the
+        address of a remote BuildKit daemon or the name of a buildx builder.
+        """
+        platform_nodes = {}
+        for node in nodes:
+            platform, separator, address = node.partition("=")
+            if not separator or not platform.strip() or not address.strip():
+                raise ValueError(f"Invalid platform node {node}")
+            platform_nodes[platform.strip()] = address.strip()
+        return platform_nodes
+
+    @staticmethod
+    def get_platform_builder_name(
+        platform: str, name: str = settings.BUILDKIT_BUILDER_NAME
+    ) -> str:
+        return f"{name}-{platform.replace('/', '-')}"
+
+    def get_platform_builders(
         self,
-        stage: str = "",
-        final_image: bool = False,
-        push_images: bool = True,
-        disable_cache: bool = settings.BUILDKIT_CACHE_DISABLE,
-    ) -> DockerImage:
-        title = f"Building stage '{stage}': "
-        if settings.DOCKER_BUILD_PLATFORMS:
-            title += f" {settings.DOCKER_BUILD_PLATFORMS}"
-        logger.info(icon=f"{self.ICON} 🔨", title=title)
+        platforms: List[str],
+        nodes: List[str] = settings.BUILDKIT_PLATFORM_NODES,
+        name: str = settings.BUILDKIT_BUILDER_NAME,
+    ) -> Dict[str, List[str]]:
+        """
+        Group platforms by the builder building them
+
+        Platforms with a native node are built on their own builders, all
+        other platforms are built together on the builder ``name``, emulating
+        the platforms foreign to it.
+
+        Returns:
+            Platforms to build by builder name
+        """
+        platform_nodes = self.get_platform_nodes(nodes)
+        builders: Dict[str, List[str]] = {}
+        for platform in (platform.strip() for platform in platforms):
+            node = platform_nodes.get(platform)
+            if node is None:
+                builder = name
+            elif "://" in node:
+                builder = self.get_platform_builder_name(platform, name)
+            else:
+                builder = node
+            builders.setdefault(builder, []).append(platform)
+        return builders
+
+    def setup_platform_builders(
+        self,
+        nodes: List[str] = settings.BUILDKIT_PLATFORM_NODES,
+        name: str = settings.BUILDKIT_BUILDER_NAME,
+    ) -> None:
+        """
+        Set up builders for the remote BuildKit daemons of platforms
+
+        Builders named after an existing buildx builder are used as is.
+        """
+        for platform, node in self.get_platform_nodes(nodes).items():
+            if "://" in node:
+                self.setup_buildkit(
+                    name=self.get_platform_builder_name(platform, name),
+                    endpoint=node,
+                )
+
+    @staticmethod
+    def get_cache_export_mode(git_commit_ref: Optional[str] = None) -> str:
+        """
+        Get the cache export mode of the branch being built
+
+        The default branch uses ``BUILDKIT_CACHE_EXPORT_MODE``, other branches
+        ``BUILDKIT_CACHE_BRANCH_EXPORT_MODE`` if it is set.
+
+        Returns:
+            One of ``max``, ``min`` and ``none``
+        """
+        if git_commit_ref is None:
+            git_commit_ref = settings.GIT_COMMIT_REF_NAME
+
+        mode = settings.BUILDKIT_CACHE_EXPORT_MODE
+        if (
+            git_commit_ref != settings.GIT_DEFAULT_TARGET_BRANCH
+            and settings.BUILDKIT_CACHE_BRANCH_EXPORT_MODE
+        ):
+            mode = settings.BUILDKIT_CACHE_BRANCH_EXPORT_MODE
 
+        mode = mode.lower()
+        if mode not in CACHE_EXPORT_MODES:
+            raise ValueError(f"Invalid cache export mode {mode}")
+        return mode
+
+    def get_shared_cache_stage(self, stage: str) -> str:
+        """
+        Get the built stage whose cache export also covers a stage
+
+        A ``max`` mode export contains the layers of all stages the built
+        stage depends on. A stage that another built stage depends on does
+        not need an export of its own when shared exports are enabled.
+
+        Returns:
+            Name of the stage exporting the cache, ``stage`` itself if none
+        """
+        if (
+            not settings.BUILDKIT_CACHE_SHARED_EXPORT
+            or self.get_cache_export_mode() != "max"
+        ):
+            return stage
+
+        model = self.get_dockerfile_model()
+        target = self._get_model_stage(model, stage)
+        if target is None:
+            return stage
+
+        shared_stage = stage
+        for built_stage in self.get_stages():
+            built = self._get_model_stage(model, built_stage.name)
+            if not built_stage.build or built is None or built.index == target.index:
+                continue
+            if target in model.get_required_stages(built.index):
+                shared_stage = built_stage.name
+        return shared_stage
+
+    @staticmethod
+    def _get_model_stage(model: Dockerfile, stage: str) -> Optional[DockerfileStage]:
+        if stage:
+            return model.get_stage(stage)
+        return model.stages[-1] if model.stages else None
+
+    def get_cache_export(self, stage: str, cache_postfix: str) -> Optional[str]:
+        """
+        Get the cache reference a stage is exported to
+
+        Returns:
+            None if the cache of the stage is not exported
+        """
+        if self.get_cache_export_mode() == "none":
+            return None
+        if self.get_shared_cache_stage(stage) != stage:
+            return None
+        return self.create_cache_tag(postfix=cache_postfix)
+
+    @staticmethod
+    def get_cache_export_size(cache_ref: str) -> Optional[Tuple[int, int]]:
+        """
+        Get the size of a cache export from its manifest in the registry
+
+        Returns:
+            The number of layers and their total size in bytes, or None if
+            the manifest can not be read
+        """
+        inspect_command = ["docker", "buildx", "imagetools", "inspect", "--raw"]
+        result = run_os_command([*inspect_command, cache_ref], shell=False, retry=True)
+        if result.return_code:
+            return None
+
+        manifest = loads_json(result.out)
+        layers = manifest.get("layers") or manifest.get("manifests") or []
+        return len(layers), sum(int(layer.get("size", 0)) for layer in layers)
+
+    def report_cache_export(self, stage: str, cache_postfix: str) -> None:
+        cache_ref = self.get_cache_export(stage, cache_postfix)
+        if not cache_ref:
+            return
+
+        export_size = self.get_cache_export_size(cache_ref)
+        if export_size is None:
+            logger.warning(message=f"Could not inspect cache export {cache_ref}")
+            return
+
+        layers, size = export_size
+        logger.info(
+            title=f"\t 📦 Cache export {cache_ref}: {layers} layers, {format_bytes(size)}"
+        )
+
+    def _get_build_command(
+        self,
+        stage: str,
+        cache_postfix: str,
+        disable_cache: bool,
+        platforms: Optional[List[str]] = None,
+        log_lines: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Get the command for building a stage
+
+        The cache sources and exports used are logged, or appended to
+        ``log_lines`` when it is given, so that builds running in parallel
+        can log them afterwards without interleaving.
+        """
+        cache_info: List[str] = []
         build_command = [
             "docker",
             "buildx",
@@ -265,44 +690,110 @@ class Docker:
 
         build_command.extend(self.get_build_arguments())
 
-        if push_images:
-            build_command.append("--push")
-
         if not disable_cache:
-            cache_to = self.create_cache_tag(postfix=stage)
-            logger.info(title=f"\t ℹ️ Cache to: {cache_to}")
-            build_command.append(
-                f"--cache-to=type=registry,ref={cache_to},mode=max,oci-mediatypes=true,image-manifest=true"
-            )
+            mode = self.get_cache_export_mode()
+            cache_to = self.get_cache_export(stage, cache_postfix)
+            if cache_to:
+                cache_info.append(f"\t ℹ️ Cache to: {cache_to} (mode={mode})")
+                build_command.append(
+                    f"--cache-to=type=registry,ref={cache_to},mode={mode},oci-mediatypes=true,image-manifest=true"
+                )
+            elif mode != "none":
+                shared_stage = self.get_shared_cache_stage(stage)
+                cache_info.append(f"\t ℹ️ Cache exported with stage '{shared_stage}'")
 
             for cache_tag in self.get_cache_tags():
-                logger.info(title=f"\t ℹ️ Cache from: {cache_tag}")
+                cache_info.append(f"\t ℹ️ Cache from: {cache_tag}")
                 build_command.append(f"--cache-from=type=registry,ref={cache_tag}")
 
+            if platforms:
+                # Platform builds export their cache to platform specific refs,
+                # which includes the stage exporting the cache of this one
+                target_branch = (
+                    settings.GIT_TARGET_BRANCH or settings.GIT_DEFAULT_TARGET_BRANCH
+                )
+                shared_stage = self.get_shared_cache_stage(stage)
+                postfixes = [cache_postfix]
+                if shared_stage != stage:
+                    postfixes.append(
+                        self._get_platform_cache_postfix(shared_stage, platforms)
+                    )
+                for postfix in postfixes:
+                    for ref in (None, target_branch):
+                        cache_tag = self.create_cache_tag(postfix=postfix, ref=ref)
+                        build_command.append(
+                            f"--cache-from=type=registry,ref={cache_tag}"
+                        )
+
+        if log_lines is None:
+            for line in cache_info:
+                logger.info(title=line)
+        else:
+            log_lines.extend(cache_info)
+        return build_command
+
+    def build_stage(
+        self,
+        stage: str = "",
+        final_image: bool = False,
+        push_images: bool = True,
+        disable_cache: bool = settings.BUILDKIT_CACHE_DISABLE,
+    ) -> DockerImage:
+        title = f"Building stage '{stage}': "
+        if settings.DOCKER_BUILD_PLATFORMS:
+            title += f" {settings.DOCKER_BUILD_PLATFORMS}"
+        logger.info(icon=f"{self.ICON} 🔨", title=title)
+
+        tags = self.get_image_tags(stage, final_image=final_image)
+        image = DockerImage(repository=self.image_repo, tags=tags)
+
+        platform_builders = self.get_platform_builders(
+            settings.DOCKER_BUILD_PLATFORMS or [],
+            nodes=settings.BUILDKIT_PLATFORM_NODES,
+        )
+        if push_images and len(platform_builders) > 1:
+            with settings.plugin_manager.lifecycle.container_build_stage(
+                image=image, stage=stage
+            ):
+                self._build_stage_fan_out(
+                    stage, tags, platform_builders, disable_cache=disable_cache
+                )
+            return image
+
+        build_command = self._get_build_command(stage, stage, disable_cache)
+
+        if push_images:
+            build_command.append("--push")
+
+        # All the platforms may be built on the native node of one of them
+        builders = list(platform_builders)
+        if len(builders) == 1 and builders[0] != settings.BUILDKIT_BUILDER_NAME:
+            build_command.append(f"--builder={builders[0]}")
+
         if settings.DOCKER_BUILD_PLATFORMS:
             platforms = ",".join(
                 platform.strip() for platform in settings.DOCKER_BUILD_PLATFORMS
             )
             build_command.append(f"--platform={platforms}")
 
-        tags = self.get_image_tags(stage, final_image=final_image)
-
         for tag in tags:
             build_command.append(f"--tag={self.image_repo}:{tag}")
 
-        build_command.append(f"{self.docker_context.absolute()}")
-
-        image = DockerImage(repository=self.image_repo, tags=tags)
+        build_command.append(f"{self.build_context.absolute()}")
 
         with settings.plugin_manager.lifecycle.container_build_stage(
             image=image, stage=stage
         ):
-            result = run_os_command(build_command, shell=False)
+            result = run_os_command(
+                build_command, shell=False, log_artifact=f"docker-build-{stage}"
+            )
             if result.return_code:
                 logger.std(result, raise_exception=True)
             else:
                 for tag in tags:
                     logger.info(title=f"\t 🏷 Tagged: {self.image_repo}:{tag}")
+                if not disable_cache:
+                    self.report_cache_export(stage, stage)
 
             with logger.do_section(
                 section_title="\t📄 Build log",
@@ -312,14 +803,232 @@ class Docker:
                 logger.std(result)
         return image
 
+    @staticmethod
+    def _get_platform_postfix(platforms: List[str]) -> str:
+        return "-".join(platform.replace("/", "-") for platform in platforms)
+
+    def _get_platform_cache_postfix(self, stage: str, platforms: List[str]) -> str:
+        postfix = self._get_platform_postfix(platforms)
+        return f"{stage}-{postfix}" if stage else postfix
+
+    def _build_platforms(
+        self,
+        stage: str,
+        builder: str,
+        platforms: List[str],
+        metadata_file: Path,
+        disable_cache: bool,
+        log_lines: List[str],
+    ) -> SubprocessResult:
+        """
+        Build platforms of a stage on a builder, pushing the image by digest
+
+        Lines to log about the build are appended to ``log_lines``.
+        """
+        postfix = self._get_platform_postfix(platforms)
+        build_command = self._get_build_command(
+            stage,
+            self._get_platform_cache_postfix(stage, platforms),
+            disable_cache,
+            platforms=platforms,
+            log_lines=log_lines,
+        )
+        build_command += [
+            f"--builder={builder}",
+            f"--platform={','.join(platforms)}",
+            f"--output=type=image,name={self.image_repo},push-by-digest=true,name-canonical=true,push=true",
+            f"--metadata-file={metadata_file}",
+            f"{self.build_context.absolute()}",
+        ]
+        return run_os_command(
+            build_command, shell=False, log_artifact=f"docker-build-{stage}-{postfix}"
+        )
+
+    def _build_stage_fan_out(
+        self,
+        stage: str,
+        tags: List[str],
+        platform_builders: Dict[str, List[str]],
+        disable_cache: bool,
+    ) -> None:
+        """
+        Build the platforms of a stage on their builders in parallel
+
+        The platform images are pushed by digest and merged into a single
+        multi-platform image, tagged with ``tags``.
+        """
+        with tempfile.TemporaryDirectory() as metadata_dir:
+            builds = {
+                builder: Path(metadata_dir) / f"{i}.json"
+                for i, builder in enumerate(platform_builders)
+            }
+            log_lines: Dict[str, List[str]] = {builder: [] for builder in builds}
+            with ThreadPoolExecutor(max_workers=len(builds)) as executor:
+                futures = {
+                    builder: executor.submit(
+                        self._build_platforms,
+                        stage,
+                        builder,
+                        platform_builders[builder],
+                        metadata_file,
+                        disable_cache,
+                        log_lines[builder],
+                    )
+                    for builder, metadata_file in builds.items()
+                }
+                results = {
+                    builder: future.result() for builder, future in futures.items()
+                }
+
+            digests = []
+            for builder, result in results.items():
+                platforms = ", ".join(platform_builders[builder])
+                for line in log_lines[builder]:
+                    logger.info(title=line)
+                with logger.do_section(
+                    section_title=f"\t📄 Build log ({platforms})",
+                    section_name=f"docker_build_{stage}_{builder}",
+                    collapsed=True,
+                ):
+                    logger.std(result)
+                if result.return_code:
+                    logger.std(result, raise_exception=True)
+
+                metadata = json.loads(builds[builder].read_text())
+                digest = metadata["containerimage.digest"]
+                logger.info(title=f"\t 🔨 Built {platforms} on {builder}: {digest}")
+                digests.append(f"{self.image_repo}@{digest}")
+                if not disable_cache:
+                    self.report_cache_export(
+                        stage,
+                        self._get_platform_cache_postfix(
+                            stage, platform_builders[builder]
+                        ),
+                    )
+
+        self.merge_manifests(tags, digests)
+
+    def merge_manifests(self, tags: List[str], sources: List[str]) -> None:
+        """
+        Merge images into a multi-platform image with ``buildx imagetools``
+        """
+        merge_command = ["docker", "buildx", "imagetools", "create"]
+        for tag in tags:
+            merge_command.append(f"--tag={self.image_repo}:{tag}")
+        merge_command.extend(sources)
+
+        result = run_os_command(merge_command, shell=False)
+        if result.return_code:
+            logger.std(result, raise_exception=True)
+        for tag in tags:
+            logger.info(title=f"\t 🏷 Tagged: {self.image_repo}:{tag}")
+
     def delete_image(self, image: DockerImage) -> None:
-        logger.warning(icon=f"{self.ICON}", message="Removing Docker image")
-        for tag in image.tags:
-            logger.info(message=f"\t {image.repository}:{tag}: ", end="")
-            delete_command = ["docker", "rmi", f"{image.repository}:{tag}"]
-            result = run_os_command(delete_command, shell=False)
+        self.delete_images([image])
+
+    @staticmethod
+    def get_image_sizes(refs: List[str]) -> Dict[str, int]:
+        """
+        Get the sizes of local images by their IDs
 
+        References that do not exist locally are left out.
+        """
+        inspect_command = [
+            "docker",
+            "image",
+            "inspect",
+            "--format",
+            "{{.Id}} {{.Size}}",
+            *refs,
+        ]
+        # The command fails if any of the references is missing, but the
+        # existing ones are still printed
+        result = run_os_command(inspect_command, shell=False)
+        sizes = {}
+        for line in result.out.splitlines():
+            image_id, size = line.split()
+            sizes[image_id] = int(size)
+        return sizes
+
+    def delete_images(
+        self, images: List[DockerImage], prune_build_cache: bool = False
+    ) -> int:
+        """
+        Remove all tags of the given images with a single ``docker rmi``
+
+        Args:
+            images: Images to remove
+            prune_build_cache: Also prune unused build cache, see
+                :meth:`prune_build_cache`
+
+        Returns:
+            The number of bytes reclaimed
+        """
+        refs = [f"{image.repository}:{tag}" for image in images for tag in image.tags]
+        reclaimed = 0
+
+        if refs:
+            logger.warning(
+                icon=f"{self.ICON}", message=f"Removing {len(refs)} Docker image tags"
+            )
+            for ref in refs:
+                logger.info(message=f"\t {ref}")
+
+            sizes = self.get_image_sizes(refs)
+            delete_command = ["docker", "rmi", *refs]
+            result = run_os_command(delete_command, shell=False)
             if result.return_code:
                 logger.std(result, raise_exception=False)
-            else:
-                logger.success()
+
+            # Images that are still tagged with other tags are only untagged,
+            # only the images listed as deleted free up space
+            deleted = {
+                line.split(":", 1)[1].strip()
+                for line in result.out.splitlines()
+                if line.startswith("Deleted:")
+            }
+            reclaimed = sum(
+                size for image_id, size in sizes.items() if image_id in deleted
+            )
+            if deleted:
+                logger.success(
+                    message=f"Reclaimed {format_bytes(reclaimed)} from images"
+                )
+
+        if prune_build_cache:
+            reclaimed += self.prune_build_cache()
+
+        return reclaimed
+
+    def prune_build_cache(
+        self,
+        until: str = settings.BUILDKIT_CACHE_PRUNE_UNTIL,
+        keep_storage: str = settings.BUILDKIT_CACHE_PRUNE_KEEP_STORAGE,
+    ) -> int:
+        """
+        Prune build cache that is not used by any image
+
+        Args:
+            until: Only prune cache older than this, for example ``72h``
+            keep_storage: Keep at most this much cache, for example ``10gb``
+
+        Returns:
+            The number of bytes reclaimed
+        """
+        logger.info(icon=f"{self.ICON} 🧹", title="Pruning build cache: ", end="")
+
+        prune_command = ["docker", "buildx", "prune", "--force"]
+        if until:
+            prune_command += ["--filter", f"until={until}"]
+        if keep_storage:
+            prune_command += ["--keep-storage", keep_storage]
+
+        result = run_os_command(prune_command, shell=False)
+        if result.return_code:
+            logger.std(result, raise_exception=False)
+            return 0
+
+        match = self.PRUNE_TOTAL_REGEX.search(result.out)
+        reclaimed = parse_size(match.group("size")) if match else 0
+        logger.success(message=f"Reclaimed {format_bytes(reclaimed)}")
+        return reclaimed
@@ -0,0 +1,194 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from kolga.utils.general import parse_kubernetes_label_datetime
+from kolga.utils.logger import logger
+from kolga.utils.models import EnvironmentStatus
+
+DEPLOYMENT_TIME_LABEL = "deploymentTime"
+TRACK_LABEL = "track"
+
+
+class RateLimiter:
+    """
+    Spaces out calls to at most ``rate`` per minute across threads
+
+    Args:
+        rate: Maximum number of calls per minute, unlimited if zero
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 60 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_call = 0.0
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.next_call - now)
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay:
+            time.sleep(delay)
+
+
+class EnvironmentReaper:
+    """
+    Finds and removes abandoned environments
+
+    Environments are the namespaces carrying all of the given ``labels``. An
+    environment is stale when none of its Deployments has been deployed
+    within ``max_age``, going by the ``deploymentTime`` label set on every
+    deployment. Only environments whose Deployments all belong to one of
+    ``tracks`` are ever removed, so that long-lived environments which are
+    rarely deployed are left alone. Namespaces without Deployments are not
+    known to be environments and are left alone as well.
+
+    Args:
+        core_v1: Kubernetes core API, such as ``kubernetes.client.CoreV1Api``
+        apps_v1: Kubernetes apps API, such as ``kubernetes.client.AppsV1Api``
+        labels: Labels of the environment namespaces
+        max_age: Time since the last deployment after which an environment
+            is stale
+        tracks: Tracks of the environments that can be removed
+    """
+
+    ICON = "💀"
+
+    def __init__(
+        self,
+        core_v1: Any,
+        apps_v1: Any,
+        labels: Dict[str, str],
+        max_age: timedelta,
+        tracks: List[str],
+    ) -> None:
+        self.core_v1 = core_v1
+        self.apps_v1 = apps_v1
+        self.labels = labels
+        self.max_age = max_age
+        self.tracks = tracks
+
+    def get_environment_status(
+        self, namespace: str, now: Optional[datetime] = None
+    ) -> EnvironmentStatus:
+        """
+        Get the last deployment time and tracks of an environment, and tell
+        whether it is stale
+        """
+        now = now or datetime.now(timezone.utc)
+        status = EnvironmentStatus(namespace=namespace)
+
+        deployments = self.apps_v1.list_namespaced_deployment(namespace).items
+        for deployment in deployments:
+            template = deployment.spec and deployment.spec.template
+            labels = (template and template.metadata.labels) or {}
+
+            track = labels.get(TRACK_LABEL, "")
+            if track not in status.tracks:
+                status.tracks.append(track)
+
+            deployed = parse_kubernetes_label_datetime(
+                labels.get(DEPLOYMENT_TIME_LABEL, "")
+            )
+            if deployed and (
+                not status.last_deployment or deployed > status.last_deployment
+            ):
+                status.last_deployment = deployed
+
+        if not deployments:
+            status.reason = "no deployments"
+        elif any(track not in self.tracks for track in status.tracks):
+            status.reason = f"tracks {', '.join(sorted(status.tracks))} not reaped"
+        elif not status.last_deployment:
+            status.reason = "no deployment time"
+        elif now - status.last_deployment < self.max_age:
+            status.reason = f"deployed {status.last_deployment:%Y-%m-%d %H:%M} UTC"
+        else:
+            status.stale = True
+            status.reason = (
+                f"last deployed {status.last_deployment:%Y-%m-%d %H:%M} UTC, "
+                f"{(now - status.last_deployment).days} days ago"
+            )
+        return status
+
+    def list_environments(
+        self, now: Optional[datetime] = None
+    ) -> List[EnvironmentStatus]:
+        label_selector = ",".join(
+            f"{key}={value}" for key, value in self.labels.items()
+        )
+        response = self.core_v1.list_namespace(label_selector=label_selector)
+        namespaces = sorted(namespace.metadata.name for namespace in response.items)
+        return [self.get_environment_status(namespace, now) for namespace in namespaces]
+
+    def reap(
+        self,
+        delete: Callable[[str], None],
+        concurrency: int = 4,
+        rate: float = 0,
+        dry_run: bool = False,
+        now: Optional[datetime] = None,
+    ) -> List[EnvironmentStatus]:
+        """
+        Remove stale environments concurrently
+
+        A failure to remove one environment is logged and does not stop the
+        removal of the others.
+
+        Args:
+            delete: Function removing the environment of a namespace
+            concurrency: Number of environments removed at the same time
+            rate: Maximum number of removals started per minute, unlimited if
+                zero
+            dry_run: Only report the environments that would be removed
+            now: Time the age of the environments is measured at
+
+        Returns:
+            Statuses of all environments, the stale ones having been removed
+            unless ``dry_run`` is set
+        """
+        environments = self.list_environments(now)
+        stale = [environment for environment in environments if environment.stale]
+
+        for environment in environments:
+            action = "Stale" if environment.stale else "Keeping"
+            logger.info(
+                icon=f"{self.ICON} 🔎",
+                message=f"{action} {environment.namespace}: {environment.reason}",
+            )
+
+        if dry_run or not stale:
+            logger.info(
+                icon=f"{self.ICON} ℹ️",
+                message=f"{len(stale)} of {len(environments)} environments are stale"
+                + (" (dry run)" if dry_run else ""),
+            )
+            return environments
+
+        rate_limiter = RateLimiter(rate)
+
+        def reap_environment(environment: EnvironmentStatus) -> bool:
+            rate_limiter.wait()
+            try:
+                delete(environment.namespace)
+            except Exception as e:
+                logger.warning(
+                    f"Removing {environment.namespace} failed: {e}", icon=self.ICON
+                )
+                return False
+            logger.info(
+                icon=f"{self.ICON} 🗑️", message=f"Removed {environment.namespace}"
+            )
+            return True
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            removed = sum(executor.map(reap_environment, stale))
+
+        logger.success(
+            message=f"Removed {removed} of {len(stale)} stale environments",
+            icon=self.ICON,
+        )
+        return environments
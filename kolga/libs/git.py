@@ -1,4 +1,7 @@
 import os
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from kolga.settings import settings
 from kolga.utils.general import run_os_command
@@ -18,43 +21,222 @@ class Git:
         # directories that are owned by other users than the current user. In some
         # environments, like Github Actions, the mounted source directory is owned by
         # another user and therefore this is required.
+        #
+        # The directory is only added if it is not there already, as the global
+        # configuration persists between jobs on some runners.
+        cwd = os.getcwd()
+        if cwd in self._get_global_config_values("safe.directory"):
+            return
+
         config_command = [
             "git",
             "config",
             "--global",
             "--add",
             "safe.directory",
-            os.getcwd(),
+            cwd,
         ]
         result = run_os_command(config_command)
         if result.return_code:
             logger.std(result, raise_exception=True)
 
-    def update_submodules(self, depth: int = 0, jobs: int = 0) -> None:
+    @staticmethod
+    def _get_global_config_values(key: str) -> List[str]:
+        result = run_os_command(["git", "config", "--global", "--get-all", key])
+        # Exit code 1 means that the key is not set
+        if result.return_code == 1:
+            return []
+        if result.return_code:
+            logger.std(result, raise_exception=True)
+        return [str(value) for value in result.out.splitlines()]
+
+    @staticmethod
+    def parse_submodule_status(status: str) -> Dict[str, Tuple[str, str]]:
         """
-        Update all submodules
+        Parse the output of ``git submodule status``
+
+        Args:
+            status: Output of ``git submodule status``
 
         Returns:
-            None
+            The state and the recorded commit of the submodules by their paths
         """
-        os_command = [
-            "git",
-            "submodule",
-            "update",
-            "--init",
-            "--recursive",
+        submodules = {}
+        for line in status.splitlines():
+            if not line.strip():
+                continue
+            # The state is a space if the recorded commit is checked out, "-"
+            # if the submodule is not initialized, "+" if another commit is
+            # checked out and "U" if the submodule has merge conflicts.
+            sha, path = line[1:].split()[:2]
+            submodules[path] = (line[0], sha)
+        return submodules
+
+    @staticmethod
+    def get_paths_to_update(submodules: Dict[str, Tuple[str, str]]) -> List[str]:
+        """
+        Get the top level submodules that are, or contain, outdated submodules
+        """
+        top_level: List[str] = []
+        for path in sorted(submodules):
+            if not any(path.startswith(f"{parent}/") for parent in top_level):
+                top_level.append(path)
+
+        outdated = [path for path, (state, _) in submodules.items() if state != " "]
+        return [
+            parent
+            for parent in top_level
+            if any(path == parent or path.startswith(f"{parent}/") for path in outdated)
         ]
 
-        if depth:
-            os_command += ["--depth", f"{depth}"]
+    def get_submodule_status(self) -> Dict[str, Tuple[str, str]]:
+        """
+        Get the state and the recorded commit of all submodules, recursively
+        """
+        result = run_os_command(["git", "submodule", "status", "--recursive"])
+        if result.return_code:
+            logger.std(result, raise_exception=True)
+        return self.parse_submodule_status(str(result.out))
+
+    @staticmethod
+    def _get_submodule_urls(paths: List[str]) -> Dict[str, str]:
+        """
+        Get the resolved URLs of initialized top level submodules by their paths
+        """
+        names = run_os_command(
+            ["git", "config", "--file", ".gitmodules", "--get-regexp", r"\.path$"]
+        )
+        urls = run_os_command(
+            ["git", "config", "--get-regexp", r"^submodule\..*\.url$"]
+        )
+        if names.return_code or urls.return_code:
+            return {}
+
+        # Lines are in the form of "submodule.<name>.path <path>"
+        name_by_path = {}
+        for line in str(names.out).splitlines():
+            key, path = line.split(maxsplit=1)
+            name_by_path[path] = key[len("submodule.") : -len(".path")]
+
+        url_by_name = {}
+        for line in str(urls.out).splitlines():
+            key, url = line.split(maxsplit=1)
+            url_by_name[key[len("submodule.") : -len(".url")]] = url
+
+        return {
+            path: url_by_name[name_by_path[path]]
+            for path in paths
+            if name_by_path.get(path) in url_by_name
+        }
+
+    def update_reference_cache(self, cache: str, paths: List[str]) -> Optional[str]:
+        """
+        Fetch missing commits of top level submodules to a persistent object cache
+
+        The cache is a bare repository passed as ``--reference`` to
+        ``git submodule update``, so objects already in it are not downloaded
+        again. Only remotes whose recorded commit is missing from the cache are
+        fetched.
+
+        Args:
+            cache: Path of the cache repository, created if it does not exist
+            paths: Paths of the top level submodules to update
+
+        Returns:
+            Path of the cache, or None if it could not be created
+        """
+        if not Path(cache, "HEAD").exists():
+            result = run_os_command(["git", "init", "--quiet", "--bare", cache])
+            if result.return_code:
+                logger.std(result, raise_exception=False)
+                return None
+
+        submodules = self.get_submodule_status()
+        urls = self._get_submodule_urls(paths)
+        for path, url in urls.items():
+            _, sha = submodules[path]
+            has_commit = run_os_command(
+                ["git", "-C", cache, "cat-file", "-e", f"{sha}^{{commit}}"]
+            )
+            if not has_commit.return_code:
+                continue
+
+            # Each remote gets a ref namespace of its own in the cache
+            namespace = sha256(url.encode("UTF-8")).hexdigest()[:16]
+            fetch_command = [
+                "git",
+                "-C",
+                cache,
+                "fetch",
+                "--quiet",
+                "--no-tags",
+                url,
+                f"+refs/heads/*:refs/remotes/{namespace}/*",
+            ]
+            result = run_os_command(fetch_command, retry=True)
+            # A failing cache update only makes the update slower
+            if result.return_code:
+                logger.std(result, raise_exception=False)
+        return cache
+
+    def update_submodules(
+        self,
+        depth: int = 0,
+        jobs: int = 0,
+        reference_cache: str = settings.GIT_SUBMODULE_REFERENCE_CACHE,
+        filter_spec: str = settings.GIT_SUBMODULE_FILTER,
+    ) -> None:
+        """
+        Update all submodules that are not at their recorded commit
 
-        if jobs:
-            os_command += ["--jobs", f"{jobs}"]
+        Args:
+            depth: Create shallow clones with history truncated to this many commits
+            jobs: Number of submodules fetched in parallel, defaults to the CPU count
+            reference_cache: Path of a persistent repository to borrow objects from
+            filter_spec: Partial clone filter, such as ``blob:none``
 
+        Returns:
+            None
+        """
         logger.info(icon=f"{self.ICON} 🌱", title="Updating submodules: ", end="")
 
         with settings.plugin_manager.lifecycle.git_submodule_update():
-            result = run_os_command(os_command)
+            paths = self.get_paths_to_update(self.get_submodule_status())
+            if not paths:
+                logger.success("Already up to date")
+                return
+
+            os_command = [
+                "git",
+                "submodule",
+                "update",
+                "--init",
+                "--recursive",
+                "--jobs",
+                f"{jobs or os.cpu_count() or 1}",
+            ]
+
+            if depth:
+                os_command += ["--depth", f"{depth}"]
+
+            if filter_spec:
+                os_command += ["--filter", filter_spec]
+
+            if reference_cache:
+                # Submodule URLs are resolved by "init"
+                result = run_os_command(["git", "submodule", "init"])
+                if result.return_code:
+                    logger.std(result, raise_exception=True)
+
+                cache = self.update_reference_cache(reference_cache, paths)
+                if cache:
+                    # Copy the borrowed objects, the cache could go away
+                    # while the repository is still in use
+                    os_command += ["--reference", cache, "--dissociate"]
+
+            os_command += ["--", *paths]
+
+            result = run_os_command(os_command, retry=True)
             if result.return_code:
                 logger.std(result, raise_exception=True)
             logger.success()
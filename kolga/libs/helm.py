@@ -1,13 +1,16 @@
 import functools
 import operator
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 from typing import Any, List, Optional
 
-import yaml
-
 from kolga.settings import settings
-from kolga.utils.general import kubernetes_safe_name, run_os_command
+from kolga.utils.general import (
+    deep_get,
+    dump_yaml,
+    kubernetes_safe_name,
+    loads_json,
+    run_os_command,
+)
 from kolga.utils.logger import logger
 from kolga.utils.models import HelmValues, SubprocessResult
 
@@ -39,7 +42,9 @@ class Helm:
             title=f"Adding Helm repo {repo_url} with name {repo_name}: ",
             end="",
         )
-        result = run_os_command(["helm", "repo", "add", repo_name, repo_url])
+        result = run_os_command(
+            ["helm", "repo", "add", repo_name, repo_url], retry=True
+        )
         if not result.return_code:
             logger.success()
         else:
@@ -62,7 +67,48 @@ class Helm:
 
     def update_repos(self) -> None:
         logger.info(icon=f"{self.ICON}  🔄", title="Updating Helm repos: ", end="")
-        result = run_os_command(["helm", "repo", "update"])
+        result = run_os_command(["helm", "repo", "update"], retry=True)
+        if not result.return_code:
+            logger.success()
+        else:
+            logger.std(result, raise_exception=True)
+
+    def release_exists(self, name: str, namespace: str) -> bool:
+        """
+        Check if a release has been successfully deployed
+
+        Args:
+            name: Name of the release
+            namespace: Namespace of the release
+
+        Returns:
+            True if the release exists and is in the ``deployed`` state
+        """
+        safe_name = kubernetes_safe_name(name=name)
+        os_command = [
+            "helm",
+            "status",
+            safe_name,
+            "--namespace",
+            namespace,
+            "--output",
+            "json",
+        ]
+        result = run_os_command(os_command, retry=True)
+        if result.return_code:
+            return False
+
+        return bool(deep_get(loads_json(result.out), "info.status") == "deployed")
+
+    def uninstall_chart(self, name: str, namespace: str) -> None:
+        safe_name = kubernetes_safe_name(name=name)
+        logger.info(
+            icon=f"{self.ICON}  🗑️ ",
+            title=f"Uninstalling release '{safe_name}': ",
+            end="",
+        )
+        os_command = ["helm", "uninstall", safe_name, "--namespace", namespace]
+        result = run_os_command(os_command)
         if not result.return_code:
             logger.success()
         else:
@@ -101,6 +147,7 @@ class Helm:
         install: bool = True,
         version: Optional[str] = None,
         raise_exception: bool = True,
+        atomic: bool = True,
     ) -> SubprocessResult:
         if chart_path:
             if not chart_path.is_absolute():
@@ -131,9 +178,6 @@ class Helm:
         helm_command = [
             "helm",
             "upgrade",
-            "--atomic",
-            "--timeout",
-            f"{timeout}s",
             "--history-max",
             "30",
             install_arg,
@@ -141,6 +185,10 @@ class Helm:
             f"{namespace}",
         ]
 
+        # Without --atomic Helm returns as soon as the resources are created
+        if atomic:
+            helm_command += ["--atomic", "--timeout", f"{timeout}s"]
+
         if version:
             helm_command += ["--version", version]
 
@@ -149,13 +197,13 @@ class Helm:
             helm_command += self.get_chart_params(flag="--values", values=values_files)
 
         safe_name = kubernetes_safe_name(name=name)
-        values_yaml = yaml.dump(values)
 
-        with NamedTemporaryFile(buffering=0) as fobj:
-            fobj.write(values_yaml.encode())
-            result = run_os_command(
-                [*helm_command, "--values", fobj.name, f"{safe_name}", f"{chart}"],
-            )
+        # The values are passed through stdin, after the values files so that
+        # they take precedence
+        result = run_os_command(
+            [*helm_command, "--values", "-", f"{safe_name}", f"{chart}"],
+            input=dump_yaml(values),
+        )
 
         if result.return_code:
             logger.std(result, raise_exception=raise_exception)
@@ -0,0 +1,243 @@
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from kolga.settings import settings
+from kolga.utils.general import format_bytes, loads_json, run_os_command
+from kolga.utils.logger import logger
+from kolga.utils.models import ImagePullResult
+
+
+class ImagePuller:
+    """
+    Pulls Docker images concurrently, skipping images that are already present
+
+    Before pulling, the digest of an image is resolved from the registry and
+    compared against the repository digests of the local image. The pull is
+    skipped when the local image already has the remote digest.
+
+    Args:
+        concurrency: Maximum number of images pulled at the same time
+    """
+
+    ICON = "🐳"
+    PULL_COMPLETE_REGEX = re.compile(
+        r"^(?P<layer>[0-9a-f]{12}): Pull complete$", re.MULTILINE
+    )
+
+    def __init__(self, concurrency: int = settings.DOCKER_PULL_CONCURRENCY) -> None:
+        self.concurrency = max(concurrency, 1)
+        self._platform: Optional[str] = None
+        self._platform_lock = threading.Lock()
+
+    @staticmethod
+    def get_repository(image: str) -> str:
+        """
+        Strip the tag or digest from an image reference
+
+        Example:
+            registry.example.com:5000/project:tag --> registry.example.com:5000/project
+        """
+        repository = image.split("@", 1)[0]
+        name_start = repository.rfind("/") + 1
+        tag_start = repository.rfind(":")
+        if tag_start >= name_start:
+            repository = repository[:tag_start]
+        return repository
+
+    @staticmethod
+    def inspect_remote_manifest(image: str) -> Dict[str, Any]:
+        """
+        Get the manifest, or the manifest list, of an image from its registry
+
+        Returns:
+            The manifest, including its digest, or an empty dict on failure
+        """
+        inspect_command = [
+            "docker",
+            "buildx",
+            "imagetools",
+            "inspect",
+            "--format",
+            "{{json .Manifest}}",
+            image,
+        ]
+        result = run_os_command(inspect_command, retry=True)
+        if result.return_code:
+            return {}
+        return loads_json(result.out)
+
+    @staticmethod
+    def get_local_digests(image: str) -> List[str]:
+        """
+        Get the repository digests of a local image
+
+        Returns:
+            Digests, such as ``sha256:...``, or an empty list if the image
+            does not exist locally
+        """
+        inspect_command = [
+            "docker",
+            "image",
+            "inspect",
+            "--format",
+            "{{json .RepoDigests}}",
+            image,
+        ]
+        result = run_os_command(inspect_command)
+        if result.return_code:
+            return []
+
+        try:
+            repo_digests = json.loads(result.out) or []
+        except ValueError:
+            return []
+        return [repo_digest.split("@", 1)[-1] for repo_digest in repo_digests]
+
+    def get_platform(self) -> str:
+        """
+        Get the platform of the Docker daemon, such as ``linux/amd64``
+        """
+        with self._platform_lock:
+            if self._platform is None:
+                version_command = [
+                    "docker",
+                    "version",
+                    "--format",
+                    "{{.Server.Os}}/{{.Server.Arch}}",
+                ]
+                result = run_os_command(version_command)
+                self._platform = "" if result.return_code else result.out.strip()
+        return self._platform
+
+    def get_layer_sizes(self, image: str, manifest: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Get the compressed sizes of the layers of an image by their digests
+
+        For manifest lists, the layers of the manifest matching the platform of
+        the Docker daemon are returned.
+        """
+        if "manifests" in manifest:
+            platform = self.get_platform()
+            for descriptor in manifest["manifests"]:
+                descriptor_platform = descriptor.get("platform", {})
+                os_arch = (
+                    f"{descriptor_platform.get('os')}/"
+                    f"{descriptor_platform.get('architecture')}"
+                )
+                if os_arch == platform:
+                    manifest = self.inspect_remote_manifest(
+                        f"{self.get_repository(image)}@{descriptor['digest']}"
+                    )
+                    break
+            else:
+                return {}
+
+        return {
+            layer["digest"]: int(layer.get("size", 0))
+            for layer in manifest.get("layers", [])
+        }
+
+    @classmethod
+    def count_transferred_bytes(cls, output: str, layer_sizes: Dict[str, int]) -> int:
+        """
+        Count the bytes of the layers downloaded by ``docker pull``
+
+        Layers that already existed locally are reported as "Already exists"
+        by ``docker pull``, only layers reported as "Pull complete" are counted.
+
+        Args:
+            output: Output of ``docker pull``
+            layer_sizes: Compressed sizes of the layers of the image by their digests
+        """
+        pulled_layers = set(cls.PULL_COMPLETE_REGEX.findall(output))
+        return sum(
+            size
+            for digest, size in layer_sizes.items()
+            if digest.split(":")[-1][:12] in pulled_layers
+        )
+
+    def pull_image(self, image: str) -> ImagePullResult:
+        """
+        Pull an image unless the local image already has the remote digest
+
+        Nothing is logged, as this is run in worker threads by :meth:`pull_images`.
+        """
+        manifest = self.inspect_remote_manifest(image)
+        digest = manifest.get("digest")
+
+        if digest and digest in self.get_local_digests(image):
+            return ImagePullResult(
+                image=image,
+                success=True,
+                skipped=True,
+                digest=digest,
+                bytes_transferred=0,
+            )
+
+        result = run_os_command(["docker", "pull", image], retry=True)
+        if result.return_code:
+            return ImagePullResult(image=image, success=False, result=result)
+
+        bytes_transferred = None
+        layer_sizes = self.get_layer_sizes(image, manifest)
+        if layer_sizes:
+            bytes_transferred = self.count_transferred_bytes(result.out, layer_sizes)
+
+        return ImagePullResult(
+            image=image,
+            success=True,
+            digest=digest,
+            bytes_transferred=bytes_transferred,
+            result=result,
+        )
+
+    def _log_result(self, pull_result: ImagePullResult) -> None:
+        logger.info(
+            icon=f"{self.ICON} ⏬", title=f"Pulling {pull_result.image}:", end=" "
+        )
+        if not pull_result.success and pull_result.result:
+            logger.std(pull_result.result, raise_exception=False)
+        elif pull_result.skipped:
+            logger.success(message=f"Up to date ({pull_result.digest})")
+        elif pull_result.bytes_transferred is not None:
+            logger.success(
+                message=f"Done, {format_bytes(pull_result.bytes_transferred)} transferred"
+            )
+        else:
+            logger.success()
+
+    def pull_images(self, images: List[str]) -> List[ImagePullResult]:
+        """
+        Pull images concurrently
+
+        Duplicate images are only pulled once. The results are logged as the
+        pulls complete.
+
+        Args:
+            images: Images to pull
+
+        Returns:
+            The results of the pulls in the order of ``images``
+        """
+        unique_images = list(dict.fromkeys(images))
+        results: Dict[str, ImagePullResult] = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {
+                executor.submit(self.pull_image, image): image
+                for image in unique_images
+            }
+            for future in as_completed(futures):
+                pull_result = future.result()
+                self._log_result(pull_result)
+                results[futures[future]] = pull_result
+
+        total = sum(result.bytes_transferred or 0 for result in results.values())
+        logger.info(
+            icon=f"{self.ICON} 📦",
+            message=f"Pulled {len(unique_images)} image(s), {format_bytes(total)} transferred",
+        )
+        return [results[image] for image in unique_images]
@@ -1,11 +1,11 @@
 import shutil
 import tempfile
 from base64 import b64encode
+from datetime import timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from typing import Any, Dict, List, Optional, Tuple, TypedDict, Union
 
 import colorful as cf
-import yaml
 from kubernetes import client as k8s_client
 from kubernetes import config as k8s_config
 from kubernetes.client.models.events_v1_event import EventsV1Event
@@ -13,9 +13,22 @@ from kubernetes.client.models.events_v1_event_list import EventsV1EventList
 from kubernetes.client.rest import ApiException
 from tabulate import tabulate
 
+from kolga.libs.cluster_metadata import ClusterMetadata
+from kolga.libs.database import Database
+from kolga.libs.deploy_journal import DeployJournal
+from kolga.libs.environment_reaper import DEPLOYMENT_TIME_LABEL, EnvironmentReaper
 from kolga.libs.helm import Helm
 from kolga.libs.project import Project
-from kolga.libs.service import Service
+from kolga.libs.release_status import ReleaseStatusCollector
+from kolga.libs.resource_recommender import (
+    MetricsApiSource,
+    PrometheusSource,
+    get_deployment_pod_regex,
+)
+from kolga.libs.service import Service, WarmPoolService
+from kolga.libs.services import services
+from kolga.libs.services.database import DatabaseService
+from kolga.libs.warm_pool import WarmPool
 from kolga.settings import settings
 from kolga.utils.exceptions import (
     DeploymentFailed,
@@ -25,6 +38,7 @@ from kolga.utils.exceptions import (
 from kolga.utils.general import (
     camel_case_split,
     current_datetime_kubernetes_label_safe,
+    dump_yaml,
     get_deploy_name,
     get_environment_vars_by_prefix,
     kubernetes_safe_name,
@@ -36,10 +50,17 @@ from kolga.utils.kube_logger import KubeLoggerThread
 from kolga.utils.logger import logger
 from kolga.utils.models import (
     BasicAuthUser,
+    EnvironmentStatus,
     HelmValues,
     ReleaseStatus,
+    ResourceUsage,
     SubprocessResult,
 )
+from kolga.utils.url import URL  # type: ignore
+
+SHARED_DATABASE_ENVIRONMENT_LABEL = "kolga.io/environment"
+SHARED_DATABASE_RELEASE_LABEL = "kolga.io/release"
+SHARED_DATABASE_SERVICE_LABEL = "kolga.io/service"
 
 
 class _Monitoring(TypedDict, total=False):
@@ -160,6 +181,7 @@ class Kubernetes:
         k8s_client.Configuration.__init__ = new_init
 
         self.client = self.create_client(track=track)
+        self.cluster_metadata = ClusterMetadata(self.client)
         self.helm = Helm()
 
     def create_client(self, track: str) -> k8s_client.ApiClient:
@@ -514,6 +536,90 @@ class Kubernetes:
         with settings.plugin_manager.lifecycle.service_deployment(
             namespace=namespace, service=service, track=track
         ):
+            if isinstance(service, DatabaseService) and service.shared_server:
+                self.deploy_shared_database_service(
+                    service=service, namespace=namespace
+                )
+            elif (
+                settings.SERVICE_WARM_POOL_SIZE
+                and isinstance(service, WarmPoolService)
+                and service.can_use_warm_pool_instance()
+            ):
+                self.deploy_warm_pool_service(
+                    service=service, namespace=namespace, deploy_name=deploy_name
+                )
+            else:
+                self.helm.upgrade_chart(
+                    chart=service.chart,
+                    chart_path=service.chart_path,
+                    name=deploy_name,
+                    namespace=namespace,
+                    values=service.values,
+                    values_files=service.values_files,
+                    version=service.chart_version,
+                )
+
+    def get_warm_pool(self) -> WarmPool:
+        v1 = k8s_client.CoreV1Api(self.client)
+        return WarmPool(core_v1=v1, helm=self.helm)
+
+    def get_deploy_journal(self, namespace: str, track: str) -> DeployJournal:
+        """
+        Get the journal of the deployment of a track
+
+        The journal is stored according to ``DEPLOY_JOURNAL``: in a Secret of
+        the namespace with ``secret``, in the build artifact folder with
+        ``artifact`` and only in memory when it is not set.
+        """
+        run_id = ":".join(
+            [settings.GIT_COMMIT_SHA, settings.JOB_PIPELINE_ID, settings.JOB_NAME]
+        )
+        storage = settings.DEPLOY_JOURNAL.lower()
+
+        if storage == "secret":
+            v1 = k8s_client.CoreV1Api(self.client)
+            journal = DeployJournal(run_id=run_id, core_v1=v1, namespace=namespace)
+        elif storage == "artifact":
+            if not settings.BUILD_ARTIFACT_FOLDER:
+                raise ImproperlyConfigured(
+                    "BUILD_ARTIFACT_FOLDER is needed for storing the deploy journal"
+                )
+            path = Path(settings.BUILD_ARTIFACT_FOLDER) / f"deploy-journal-{track}.json"
+            journal = DeployJournal(run_id=run_id, path=path)
+        elif not storage:
+            journal = DeployJournal(run_id=run_id)
+        else:
+            raise ImproperlyConfigured(f"Invalid deploy journal storage {storage}")
+
+        journal.load()
+        return journal
+
+    def deploy_warm_pool_service(
+        self, service: WarmPoolService, namespace: str, deploy_name: str
+    ) -> None:
+        """
+        Use a pre-provisioned instance of a service from the warm pool
+
+        The pool is replenished in the background after claiming an instance.
+        If no instance can be claimed, the service is deployed as usual.
+
+        Args:
+            service: Service to deploy
+            namespace: Namespace of the environment using the service
+            deploy_name: Release name used when falling back to a normal deploy
+        """
+        self.create_namespace(settings.SERVICE_WARM_POOL_NAMESPACE)
+        warm_pool = self.get_warm_pool()
+
+        try:
+            claimed = warm_pool.claim(service=service, namespace=namespace)
+        except ApiException as e:
+            self._handle_api_error(e, raise_client_exception=False)
+            claimed = False
+
+        warm_pool.replenish_in_background(service=service)
+
+        if not claimed:
             self.helm.upgrade_chart(
                 chart=service.chart,
                 chart_path=service.chart_path,
@@ -524,6 +630,168 @@ class Kubernetes:
                 version=service.chart_version,
             )
 
+    def release_warm_pool_instances(
+        self, namespace: str = settings.K8S_NAMESPACE
+    ) -> None:
+        """
+        Remove the warm pool instances claimed by an environment
+
+        Args:
+            namespace: Namespace of the environment
+        """
+        try:
+            released = self.get_warm_pool().release(namespace=namespace)
+        except ApiException as e:
+            self._handle_api_error(e, raise_client_exception=False)
+            return
+
+        for release_name in released:
+            logger.info(
+                icon=f"{self.ICON}  🗑 ",
+                message=f"Removed warm pool instance '{release_name}'",
+            )
+
+    def deploy_shared_database_service(
+        self, service: DatabaseService, namespace: str
+    ) -> None:
+        """
+        Provision the databases of a service on a shared database server
+
+        The shared server release is deployed only if it does not exist yet.
+        The databases are registered to a config map in the shared namespace
+        before they are created, so that :meth:`delete_shared_databases` can
+        drop them when the environment is removed.
+
+        Args:
+            service: Database service with databases set up for its dependents
+            namespace: Namespace of the environment using the databases
+        """
+        shared_namespace = self.create_namespace(
+            settings.DATABASE_SHARED_SERVER_NAMESPACE
+        )
+        release_name = service.shared_release_name
+
+        if self.helm.release_exists(name=release_name, namespace=shared_namespace):
+            logger.info(
+                icon=f"{self.ICON}  ♻️ ",
+                title=f"Using shared {service.name} server '{release_name}'",
+            )
+        else:
+            self.helm.upgrade_chart(
+                chart=service.chart,
+                chart_path=service.chart_path,
+                name=release_name,
+                namespace=shared_namespace,
+                values=service.get_shared_server_values(),
+                values_files=service.values_files,
+                version=service.chart_version,
+            )
+
+        self._register_shared_databases(service=service, namespace=namespace)
+
+        for database in service.databases.values():
+            self._run_shared_database_sql(
+                title=f"Creating database '{database.url.database}'",
+                release_name=release_name,
+                command=service.get_sql_command(database.creation_sql),
+            )
+
+    def delete_shared_databases(self, namespace: str = settings.K8S_NAMESPACE) -> None:
+        """
+        Drop databases provisioned on shared database servers for an environment
+
+        Args:
+            namespace: Namespace of the environment using the databases
+        """
+        v1 = k8s_client.CoreV1Api(self.client)
+        shared_namespace = settings.DATABASE_SHARED_SERVER_NAMESPACE
+        labels = {SHARED_DATABASE_ENVIRONMENT_LABEL: namespace}
+
+        try:
+            config_maps = v1.list_namespaced_config_map(
+                shared_namespace, label_selector=self.labels_to_string(labels)
+            )
+        except ApiException as e:
+            self._handle_api_error(e)
+            return
+
+        for config_map in config_maps.items:
+            config_map_labels = config_map.metadata.labels
+            service_name = config_map_labels[SHARED_DATABASE_SERVICE_LABEL]
+            service_class = services.get(service_name)
+            if not service_class or not issubclass(service_class, DatabaseService):
+                logger.warning(f"Unknown shared database service: {service_name}")
+                continue
+
+            for database_name, username in (config_map.data or {}).items():
+                url = URL(
+                    drivername=service_name, database=database_name, username=username
+                )
+                self._run_shared_database_sql(
+                    title=f"Dropping database '{database_name}'",
+                    release_name=config_map_labels[SHARED_DATABASE_RELEASE_LABEL],
+                    command=service_class.get_sql_command(Database(url).deletion_sql),
+                )
+
+            v1.delete_namespaced_config_map(
+                name=config_map.metadata.name, namespace=shared_namespace
+            )
+
+    def _register_shared_databases(
+        self, service: DatabaseService, namespace: str
+    ) -> None:
+        v1 = k8s_client.CoreV1Api(self.client)
+        shared_namespace = settings.DATABASE_SHARED_SERVER_NAMESPACE
+        name = kubernetes_safe_name(f"{namespace}-{service.name}")
+        labels = {
+            SHARED_DATABASE_ENVIRONMENT_LABEL: namespace,
+            SHARED_DATABASE_RELEASE_LABEL: service.shared_release_name,
+            SHARED_DATABASE_SERVICE_LABEL: service.name,
+        }
+        data = {
+            str(database.url.database): str(database.url.username)
+            for database in service.databases.values()
+        }
+
+        try:
+            existing = v1.read_namespaced_config_map(name, shared_namespace)
+        except ApiException as e:
+            if e.status != 404:
+                self._handle_api_error(e, raise_client_exception=True)
+            existing = None
+
+        body = k8s_client.V1ConfigMap(
+            data={**((existing and existing.data) or {}), **data},
+            metadata=k8s_client.V1ObjectMeta(
+                name=name, namespace=shared_namespace, labels=labels
+            ),
+        )
+
+        if existing:
+            v1.replace_namespaced_config_map(
+                name=name, namespace=shared_namespace, body=body
+            )
+        else:
+            v1.create_namespaced_config_map(namespace=shared_namespace, body=body)
+
+    def _run_shared_database_sql(
+        self, title: str, release_name: str, command: List[str]
+    ) -> None:
+        logger.info(icon=f"{self.ICON}  🛢️ ", title=f"{title}: ", end="")
+        os_command = [
+            "kubectl",
+            "exec",
+            f"--namespace={settings.DATABASE_SHARED_SERVER_NAMESPACE}",
+            f"service/{release_name}",
+            "--",
+            *command,
+        ]
+        result = run_os_command(os_command)
+        if not result.return_code:
+            logger.success()
+        else:
+            logger.std(result, raise_exception=True)
+
     def get_application_deployment_values(
         self,
         namespace: str,
@@ -585,12 +853,17 @@ class Kubernetes:
             values["application"]["fileSecretPath"] = settings.K8S_FILE_SECRET_MOUNTPATH
 
         if settings.K8S_PERSISTENT_STORAGE:
+            storage_class = settings.K8S_PERSISTENT_STORAGE_STORAGE_TYPE
+            if self.cluster_metadata.has_storage_class(storage_class) is False:
+                raise ImproperlyConfigured(
+                    f'No StorageClass "{storage_class}" found in the cluster'
+                )
             values["application"]["pvc"] = {
                 "accessMode": settings.K8S_PERSISTENT_STORAGE_ACCESS_MODE,
                 "enabled": settings.K8S_PERSISTENT_STORAGE,
                 "mountPath": settings.K8S_PERSISTENT_STORAGE_PATH,
                 "size": settings.K8S_PERSISTENT_STORAGE_SIZE,
-                "storageClass": settings.K8S_PERSISTENT_STORAGE_STORAGE_TYPE,
+                "storageClass": storage_class,
             }
 
         if project.request_cpu:
@@ -722,11 +995,19 @@ class Kubernetes:
                     icon=f"{self.ICON} 🏷️",
                     title="Deployment values (without environment vars):",
                 )
-                for line in yaml.dump(values).split("\n"):
+                for line in dump_yaml(values).split("\n"):
                     logger.info(message=f"\t{line}")
 
-                status = self.status(namespace=namespace, labels=application_labels)
+                # The deployment time is only set on the pod template
+                status = self.status(
+                    namespace=namespace,
+                    labels={"release": project.deploy_name, "track": track},
+                    pod_labels={"deploymentTime": values["deployment"]["timestamp"]},
+                )
                 logger.info(message=str(status))
+                settings.plugin_manager.hook.project_deployment_status(
+                    namespace=namespace, project=project, track=track, status=status
+                )
 
                 logger.info(
                     icon=f"{self.ICON}  📋️️ ",
@@ -804,6 +1085,103 @@ class Kubernetes:
     def delete_namespace(self, namespace: str = settings.K8S_NAMESPACE) -> None:
         self.delete(resource="namespace", name=namespace)
 
+    def get_resource_usage(
+        self,
+        project: Project,
+        namespace: str = settings.K8S_NAMESPACE,
+        window: float = 24 * 3600,
+        samples: int = 10,
+        interval: float = 30,
+    ) -> ResourceUsage:
+        """
+        Get the observed resource usage of the pods of a project
+
+        The usage history is read from ``K8S_METRICS_PROMETHEUS_URL`` when it
+        is set. Otherwise the metrics API of the cluster is sampled. Either
+        way, only the pods of the Deployments of the release are observed.
+
+        Args:
+            project: Project whose release is observed
+            namespace: Namespace of the release
+            window: Seconds of history read from Prometheus
+            samples: Number of samples taken from the metrics API
+            interval: Seconds between samples taken from the metrics API
+        """
+        source: Union[MetricsApiSource, PrometheusSource]
+        if settings.K8S_METRICS_PROMETHEUS_URL:
+            # Prometheus only knows the pods by name, which are named after
+            # their Deployments
+            apps_v1 = k8s_client.AppsV1Api(self.client)
+            deployments = apps_v1.list_namespaced_deployment(
+                namespace, label_selector=f"release={project.deploy_name}"
+            )
+            deployment_names = [item.metadata.name for item in deployments.items]
+            if not deployment_names:
+                return ResourceUsage()
+            source = PrometheusSource(
+                url=settings.K8S_METRICS_PROMETHEUS_URL,
+                namespace=namespace,
+                pod_regex=get_deployment_pod_regex(deployment_names),
+                window=window,
+            )
+        else:
+            # Only the pods of the Deployment carry the deployment time label
+            source = MetricsApiSource(
+                custom_objects=k8s_client.CustomObjectsApi(self.client),
+                namespace=namespace,
+                label_selector=f"release={project.deploy_name},{DEPLOYMENT_TIME_LABEL}",
+                samples=samples,
+                interval=interval,
+            )
+        return source.get_usage()
+
+    def delete_environment(self, namespace: str = settings.K8S_NAMESPACE) -> None:
+        """
+        Remove an environment along with the resources it uses outside of its
+        namespace
+        """
+        if settings.DATABASE_SHARED_SERVER:
+            self.delete_shared_databases(namespace=namespace)
+        if settings.SERVICE_WARM_POOL_SIZE:
+            self.release_warm_pool_instances(namespace=namespace)
+        self.delete_namespace(namespace=namespace)
+
+    def reap_environments(
+        self,
+        max_age: timedelta,
+        tracks: List[str],
+        concurrency: int = 4,
+        rate: float = 0,
+        dry_run: bool = False,
+    ) -> List[EnvironmentStatus]:
+        """
+        Remove the environments of the project that have not been deployed
+        within ``max_age``
+
+        See :class:`EnvironmentReaper` for how stale environments are found.
+
+        Raises:
+            ImproperlyConfigured: If the project ID is not known, as the
+                namespaces of the project could not be told apart from those
+                of other projects
+        """
+        if not settings.PROJECT_ID:
+            raise ImproperlyConfigured("PROJECT_ID is needed for reaping environments")
+
+        reaper = EnvironmentReaper(
+            core_v1=k8s_client.CoreV1Api(self.client),
+            apps_v1=k8s_client.AppsV1Api(self.client),
+            labels=self.get_namespace_labels(),
+            max_age=max_age,
+            tracks=tracks,
+        )
+        return reaper.reap(
+            delete=self.delete_environment,
+            concurrency=concurrency,
+            rate=rate,
+            dry_run=dry_run,
+        )
+
     def _resource_command(
         self,
         resource: str,
@@ -835,9 +1213,7 @@ class Kubernetes:
             cert_issuer = f"certificate-letsencrypt-{track}"
             logger.info(message=" (track): ", end="")
 
-        os_command = ["kubectl", "get", "clusterissuer", cert_issuer]
-        result = run_os_command(os_command, shell=True)  # nosec
-        if not result.return_code:
+        if self.cluster_metadata.has_cluster_issuer(cert_issuer):
             logger.success(message=cert_issuer)
             return cert_issuer
         else:
@@ -863,7 +1239,7 @@ class Kubernetes:
             resource=resource, name=name, labels=labels, namespace=namespace
         )
         logger.info(": ", end="")
-        result = run_os_command(os_command, shell=True)  # nosec
+        result = run_os_command(os_command, shell=True, retry=True)  # nosec
         if not result.return_code:
             logger.success()
         else:
@@ -874,16 +1250,20 @@ class Kubernetes:
         self,
         labels: Optional[Dict[str, str]] = None,
         namespace: str = settings.K8S_NAMESPACE,
+        pod_labels: Optional[Dict[str, str]] = None,
     ) -> ReleaseStatus:
-        deployment_status = self.get(
-            resource="deployments",
-            labels=labels,
-            namespace=namespace,
-            raise_exception=False,
-        )
+        """
+        Get a snapshot of the Deployments, ReplicaSets and Pods matching labels
 
-        pods_status = self.get(
-            resource="pods", labels=labels, namespace=namespace, raise_exception=False
-        )
+        Args:
+            labels: Labels of the release
+            namespace: Namespace of the release
+            pod_labels: Labels only set on the pod template of the release
 
-        return ReleaseStatus(deployment=deployment_status.out, pods=pods_status.out)
+        Returns:
+            The status of the release
+        """
+        collector = ReleaseStatusCollector(self.client)
+        return collector.collect(
+            namespace=namespace, labels=labels or {}, pod_labels=pod_labels
+        )
@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.utils.logger import logger
+from kolga.utils.models import (
+    DeploymentStatus,
+    PodStatus,
+    ReleaseStatus,
+    ReplicaSetStatus,
+)
+
+REVISION_ANNOTATION = "deployment.kubernetes.io/revision"
+
+
+class ReleaseStatusCollector:
+    """
+    Collects a snapshot of the workloads of a release through the API
+
+    The Deployments, ReplicaSets and Pods matching the labels of the release
+    are listed concurrently, in pages of ``page_size`` items.
+
+    Args:
+        api_client: Kubernetes API client shared with the other API calls
+        page_size: Maximum number of items fetched per request
+    """
+
+    def __init__(self, api_client: k8s_client.ApiClient, page_size: int = 100) -> None:
+        self.api_client = api_client
+        self.page_size = page_size
+
+    def _list_all(
+        self, list_function: Callable[..., Any], namespace: str, label_selector: str
+    ) -> List[Any]:
+        items: List[Any] = []
+        _continue = None
+        while True:
+            kwargs = {"label_selector": label_selector, "limit": self.page_size}
+            if _continue:
+                kwargs["_continue"] = _continue
+            try:
+                response = list_function(namespace, **kwargs)
+            except ApiException as e:
+                # The snapshot is for diagnostics, a partial one is better
+                # than none
+                logger.debug(f"Listing resources for the status failed: {e}")
+                return items
+
+            items.extend(response.items)
+            _continue = response.metadata and response.metadata._continue
+            if not _continue:
+                return items
+
+    @staticmethod
+    def parse_deployment(deployment: k8s_client.V1Deployment) -> DeploymentStatus:
+        status = deployment.status or k8s_client.V1DeploymentStatus()
+        return DeploymentStatus(
+            name=deployment.metadata.name,
+            replicas=(deployment.spec and deployment.spec.replicas) or 0,
+            ready_replicas=status.ready_replicas or 0,
+            updated_replicas=status.updated_replicas or 0,
+            available_replicas=status.available_replicas or 0,
+        )
+
+    @staticmethod
+    def parse_replica_set(replica_set: k8s_client.V1ReplicaSet) -> ReplicaSetStatus:
+        annotations = replica_set.metadata.annotations or {}
+        status = replica_set.status or k8s_client.V1ReplicaSetStatus(replicas=0)
+        return ReplicaSetStatus(
+            name=replica_set.metadata.name,
+            revision=annotations.get(REVISION_ANNOTATION, ""),
+            replicas=status.replicas or 0,
+            ready_replicas=status.ready_replicas or 0,
+        )
+
+    @staticmethod
+    def parse_pod(pod: k8s_client.V1Pod) -> PodStatus:
+        status = pod.status or k8s_client.V1PodStatus()
+        container_statuses = [
+            *(status.init_container_statuses or []),
+            *(status.container_statuses or []),
+        ]
+
+        pod_status = PodStatus(
+            name=pod.metadata.name,
+            phase=status.phase or "",
+            containers=len(status.container_statuses or []),
+            ready_containers=sum(
+                1 for container in status.container_statuses or [] if container.ready
+            ),
+        )
+        for container in container_statuses:
+            pod_status.restarts += container.restart_count or 0
+
+            state = container.state
+            if state and state.waiting and state.waiting.reason:
+                pod_status.waiting_reasons.append(
+                    f"{container.name}: {state.waiting.reason}"
+                )
+
+            for container_state in (container.last_state, state):
+                terminated = container_state and container_state.terminated
+                if terminated and terminated.reason == "OOMKilled":
+                    pod_status.oom_killed.append(container.name)
+                    break
+        return pod_status
+
+    def collect(
+        self,
+        namespace: str,
+        labels: Dict[str, str],
+        pod_labels: Optional[Dict[str, str]] = None,
+    ) -> ReleaseStatus:
+        """
+        Collect the status of the workloads matching labels
+
+        Args:
+            namespace: Namespace of the release
+            labels: Labels of the release
+            pod_labels: Additional labels of the pod template, such as the
+                deployment time, that the Deployments themselves don't have
+
+        Returns:
+            A snapshot of the Deployments, ReplicaSets and Pods of the release
+        """
+        label_selector = ",".join(f"{key}={value}" for key, value in labels.items())
+        pod_label_selector = ",".join(
+            f"{key}={value}" for key, value in {**labels, **(pod_labels or {})}.items()
+        )
+        apps_v1 = k8s_client.AppsV1Api(self.api_client)
+        core_v1 = k8s_client.CoreV1Api(self.api_client)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            deployments = executor.submit(
+                self._list_all,
+                apps_v1.list_namespaced_deployment,
+                namespace,
+                label_selector,
+            )
+            replica_sets = executor.submit(
+                self._list_all,
+                apps_v1.list_namespaced_replica_set,
+                namespace,
+                pod_label_selector,
+            )
+            pods = executor.submit(
+                self._list_all,
+                core_v1.list_namespaced_pod,
+                namespace,
+                pod_label_selector,
+            )
+
+        return ReleaseStatus(
+            deployments=[self.parse_deployment(d) for d in deployments.result()],
+            replica_sets=[self.parse_replica_set(rs) for rs in replica_sets.result()],
+            pods=[self.parse_pod(pod) for pod in pods.result()],
+        )
@@ -0,0 +1,241 @@
+import json
+import math
+import re
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Sequence
+
+from kubernetes.client.rest import ApiException
+from kubernetes.utils.quantity import parse_quantity
+
+from kolga.utils.logger import logger
+from kolga.utils.models import ResourceRecommendation, ResourceUsage
+
+# Smallest requests and limits recommended
+MIN_CPU_CORES = 0.01
+MIN_MEMORY_BYTES = 32 * 1024**2
+
+# Pods of the initialize and migrate jobs of a release
+JOB_POD_REGEX = ".*-(initialize|migrate)-.*"
+
+# Characters of the names Kubernetes generates, such as the hash of a
+# ReplicaSet and the random suffix of a pod name
+GENERATED_NAME_CHARACTERS = "[bcdfghjklmnpqrstvwxz2456789]"
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """
+    Get a percentile of values, interpolating linearly between the closest
+    ranks
+    """
+    if not values:
+        raise ValueError("No values to get a percentile of")
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * percent / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def get_deployment_pod_regex(deployment_names: Sequence[str]) -> str:
+    """
+    Get a regular expression matching only the pod names of Deployments
+
+    Pods of a Deployment are named ``<deployment>-<replicaset hash>-<suffix>``.
+    Pods of other workloads whose names start with the name of a Deployment,
+    such as ``<deployment>-postgresql-0``, do not match.
+    """
+    names = "|".join(re.escape(name) for name in deployment_names)
+    return (
+        f"({names})-{GENERATED_NAME_CHARACTERS}{{1,10}}-"
+        f"{GENERATED_NAME_CHARACTERS}{{5}}"
+    )
+
+
+def format_cpu(cores: float) -> str:
+    return f"{math.ceil(max(cores, MIN_CPU_CORES) * 1000)}m"
+
+
+def format_memory(size: float) -> str:
+    return f"{math.ceil(max(size, MIN_MEMORY_BYTES) / 1024**2)}Mi"
+
+
+def recommend_resources(
+    usage: ResourceUsage,
+    request_percentile: float = 90,
+    limit_percentile: float = 99,
+    headroom: float = 0.2,
+) -> ResourceRecommendation:
+    """
+    Compute requests and limits from the observed usage of a release
+
+    Requests cover usage up to ``request_percentile``, so that the pods fit
+    on nodes by their typical usage. Limits add ``headroom`` on top of the
+    ``limit_percentile`` of usage, so that the pods are only throttled or
+    killed when they use clearly more than they have been seen to use.
+
+    Args:
+        usage: Observed CPU and memory usage of the pods of the release
+        request_percentile: Percentile of usage covered by requests
+        limit_percentile: Percentile of usage that limits are based on
+        headroom: Share of usage added to limits
+
+    Raises:
+        ValueError: If there are no samples of CPU or memory usage
+    """
+    if not usage.cpu_cores or not usage.memory_bytes:
+        raise ValueError("No resource usage observed")
+
+    return ResourceRecommendation(
+        request_cpu=format_cpu(percentile(usage.cpu_cores, request_percentile)),
+        request_ram=format_memory(percentile(usage.memory_bytes, request_percentile)),
+        limit_cpu=format_cpu(
+            percentile(usage.cpu_cores, limit_percentile) * (1 + headroom)
+        ),
+        limit_ram=format_memory(
+            percentile(usage.memory_bytes, limit_percentile) * (1 + headroom)
+        ),
+        samples=min(len(usage.cpu_cores), len(usage.memory_bytes)),
+    )
+
+
+class MetricsApiSource:
+    """
+    Samples the usage of the pods of a release from the Kubernetes metrics API
+
+    The metrics API only knows the current usage of pods, so it is sampled
+    ``samples`` times, ``interval`` seconds apart. The usage of a pod is the
+    sum of the usage of its containers.
+
+    Args:
+        custom_objects: Kubernetes custom objects API, such as
+            ``kubernetes.client.CustomObjectsApi``
+        namespace: Namespace of the release
+        label_selector: Label selector of the pods of the release
+        samples: Number of times the usage is sampled
+        interval: Seconds between samples
+    """
+
+    def __init__(
+        self,
+        custom_objects: Any,
+        namespace: str,
+        label_selector: str,
+        samples: int = 10,
+        interval: float = 30,
+    ) -> None:
+        self.custom_objects = custom_objects
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.samples = samples
+        self.interval = interval
+
+    def sample(self, usage: ResourceUsage) -> None:
+        response = self.custom_objects.list_namespaced_custom_object(
+            "metrics.k8s.io",
+            "v1beta1",
+            self.namespace,
+            "pods",
+            label_selector=self.label_selector,
+        )
+        for pod in response.get("items", []):
+            containers = [container["usage"] for container in pod["containers"]]
+            usage.cpu_cores.append(
+                float(sum(parse_quantity(c["cpu"]) for c in containers))
+            )
+            usage.memory_bytes.append(
+                float(sum(parse_quantity(c["memory"]) for c in containers))
+            )
+
+    def get_usage(self) -> ResourceUsage:
+        usage = ResourceUsage()
+        for i in range(self.samples):
+            if i:
+                time.sleep(self.interval)
+            try:
+                self.sample(usage)
+            except ApiException as e:
+                logger.warning(f"Sampling pod metrics failed: {e.reason}")
+        return usage
+
+
+class PrometheusSource:
+    """
+    Reads the usage history of the pods of a release from a Prometheus
+    compatible API
+
+    The usage is read from the cAdvisor metrics of the pods over the last
+    ``window`` seconds, with one sample every ``step`` seconds per pod.
+
+    Args:
+        url: Base URL of the Prometheus API
+        namespace: Namespace of the release
+        pod_regex: Regular expression matching the pod names of the release
+        window: Seconds of history to read
+        step: Seconds between samples
+        timeout: Timeout of the requests in seconds
+    """
+
+    def __init__(
+        self,
+        url: str,
+        namespace: str,
+        pod_regex: str,
+        window: float = 24 * 3600,
+        step: float = 300,
+        timeout: float = 30,
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.namespace = namespace
+        self.pod_regex = pod_regex
+        self.window = window
+        self.step = step
+        self.timeout = timeout
+
+    @property
+    def selector(self) -> str:
+        # Backslashes of the regular expression are escaped in PromQL strings
+        pod_regex = self.pod_regex.replace("\\", "\\\\")
+        return (
+            f'namespace="{self.namespace}",pod=~"{pod_regex}",'
+            f'pod!~"{JOB_POD_REGEX}",container!="",container!="POD"'
+        )
+
+    def query_range(self, query: str) -> List[float]:
+        """
+        Run a range query and get the values of all of the resulting series
+        """
+        end = time.time()
+        params = urllib.parse.urlencode(
+            {
+                "query": query,
+                "start": end - self.window,
+                "end": end,
+                "step": self.step,
+            }
+        )
+        url = f"{self.url}/api/v1/query_range?{params}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:  # nosec
+            body: Dict[str, Any] = json.load(response)
+
+        if body.get("status") != "success":
+            raise ValueError(f"Prometheus query failed: {body.get('error')}")
+        return [
+            float(value)
+            for series in body["data"]["result"]
+            for _, value in series["values"]
+            if value not in ("NaN", "+Inf", "-Inf")
+        ]
+
+    def get_usage(self) -> ResourceUsage:
+        return ResourceUsage(
+            cpu_cores=self.query_range(
+                "sum by (pod) "
+                f"(rate(container_cpu_usage_seconds_total{{{self.selector}}}[5m]))"
+            ),
+            memory_bytes=self.query_range(
+                f"sum by (pod) (container_memory_working_set_bytes{{{self.selector}}})"
+            ),
+        )
@@ -1,8 +1,10 @@
+from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Dict, List, Mapping, Optional, Set
 
 from kolga.utils.general import get_environment_vars_by_prefix, get_project_secret_var
 from kolga.utils.models import HelmValues
+from kolga.utils.url import URL  # type: ignore
 
 
 class Service:
@@ -69,3 +71,53 @@ class Service:
         return get_project_secret_var(
             project_name=service.name, value=self.artifact_name
         )
+
+
+class WarmPoolService(Service, ABC):
+    """
+    A service whose instances can be pre-provisioned to a warm pool
+
+    Instead of deploying the service for every environment, a ready instance
+    is claimed from the pool with the credentials it was deployed with.
+    """
+
+    def can_use_warm_pool_instance(self) -> bool:
+        """
+        Whether a warm pool instance can stand in for a deployment of the service
+        """
+        return True
+
+    @abstractmethod
+    def get_warm_pool_url(self, release_name: str, namespace: str) -> URL:
+        """
+        Get a URL, with new credentials, for a warm pool instance of the service
+
+        Args:
+            release_name: Name of the Helm release of the instance
+            namespace: Namespace of the warm pool
+
+        Returns:
+            The URL the instance can be reached with once deployed
+        """
+
+    @abstractmethod
+    def get_warm_pool_values(self, release_name: str, url: URL) -> HelmValues:
+        """
+        Get values for deploying a warm pool instance of the service
+
+        Args:
+            release_name: Name of the Helm release of the instance
+            url: URL returned by :meth:`get_warm_pool_url` for the instance
+
+        Returns:
+            Helm values for the instance
+        """
+
+    @abstractmethod
+    def use_warm_pool_instance(self, url: URL) -> None:
+        """
+        Use a claimed warm pool instance instead of deploying the service
+
+        Args:
+            url: URL of the claimed instance
+        """
@@ -0,0 +1,167 @@
+import re
+from abc import abstractmethod
+from hashlib import sha256
+from typing import Any, Dict, List, Mapping
+
+from kolga.libs.database import Database
+from kolga.libs.service import Service, WarmPoolService
+from kolga.settings import settings
+from kolga.utils.general import (
+    get_project_secret_var,
+    kubernetes_safe_name,
+    truncate_with_hash,
+)
+from kolga.utils.models import HelmValues
+from kolga.utils.url import URL  # type: ignore
+
+# PostgreSQL limits identifiers to 63 characters and MySQL (5.7) user names
+# to 32 characters
+DATABASE_NAME_MAX_LENGTH = 63
+DATABASE_USERNAME_MAX_LENGTH = 32
+
+
+class DatabaseService(WarmPoolService):
+    """
+    A service providing databases for the projects depending on it
+
+    By default each environment gets a database server release of its own.
+    In the shared server mode (``DATABASE_SHARED_SERVER``) a single long-lived
+    release per track, living in ``DATABASE_SHARED_SERVER_NAMESPACE``, is used
+    by all environments. A database and a user is then provisioned with SQL
+    for each dependent project instead of deploying a new server.
+    """
+
+    database: str
+
+    def __init__(
+        self, shared_server: bool = settings.DATABASE_SHARED_SERVER, **kwargs: Any
+    ) -> None:
+        super().__init__(**kwargs)
+        self.shared_server = shared_server
+        self.databases: Dict[Service, Database] = {}
+
+    @property
+    def shared_release_name(self) -> str:
+        return kubernetes_safe_name(f"shared-{self.track}-{self.name}")
+
+    def get_shared_server_host(self) -> str:
+        namespace = settings.DATABASE_SHARED_SERVER_NAMESPACE
+        return f"{self.shared_release_name}.{namespace}.svc"
+
+    @abstractmethod
+    def get_shared_server_values(self) -> HelmValues:
+        """
+        Values for deploying the shared database server release
+        """
+
+    @staticmethod
+    @abstractmethod
+    def get_sql_command(sql: str) -> List[str]:
+        """
+        Command for running SQL as an admin inside the database server container
+
+        Args:
+            sql: SQL statements to run
+
+        Returns:
+            A command that can be passed to ``kubectl exec``
+        """
+
+    @staticmethod
+    def get_shared_database_name(service: Service) -> str:
+        name = re.sub(
+            r"[^a-zA-Z0-9_]+", "_", f"{settings.K8S_NAMESPACE}_{service.name}"
+        )
+        return truncate_with_hash(name, DATABASE_NAME_MAX_LENGTH, separator="_")
+
+    @staticmethod
+    def get_shared_database_username(database_name: str) -> str:
+        """
+        Get a stable username for a database
+
+        The username is derived from the database name so that provisioning
+        the same environment again reuses the user instead of creating a new one.
+        """
+        digest = sha256(database_name.encode("utf-8")).hexdigest()
+        return f"u{digest[:DATABASE_USERNAME_MAX_LENGTH - 1]}"
+
+    def _setup_shared_databases(self) -> Dict[Service, Database]:
+        databases = {}
+        for dependent in self._prerequisite_of:
+            database_name = self.get_shared_database_name(dependent)
+            database_url = Database.get_random_auth_database_url(
+                database_driver=self.name,
+                database_name=database_name,
+                database_hostname=self.get_shared_server_host(),
+                username=self.get_shared_database_username(database_name),
+            )
+            databases[dependent] = Database(url=database_url)
+        return databases
+
+    def get_warm_pool_url(self, release_name: str, namespace: str) -> URL:
+        return Database.get_random_auth_database_url(
+            database_driver=self.name,
+            database_name=self.database,
+            database_hostname=f"{release_name}.{namespace}.svc",
+        )
+
+    def can_use_warm_pool_instance(self) -> bool:
+        # A warm pool instance holds a single database, while a deployed
+        # server gets a database of its own for each dependent
+        return len(self._prerequisite_of) <= 1
+
+    def use_warm_pool_instance(self, url: URL) -> None:
+        self.databases = {
+            dependent: Database(url=url) for dependent in self._prerequisite_of
+        }
+
+    def _get_default_database_values(
+        self, url: URL, service_name: str = ""
+    ) -> Dict[str, str]:
+        """
+        Return a set of default extra values that are non-user definable
+
+        Currently there is only support for the user to set a single value when
+        adding a service. This adds some default values in order for the application
+        to be able to get every part of the database URL separately.
+
+        Args:
+            url: The URL of the database as a single string
+            service_name: Prefixes for each value
+
+        Returns:
+
+        """
+
+        return {
+            get_project_secret_var(
+                project_name=service_name, value="DATABASE_URL"
+            ): str(url),
+            get_project_secret_var(
+                project_name=service_name, value="DATABASE_HOST"
+            ): str(url.host),
+            get_project_secret_var(project_name=service_name, value="DATABASE_DB"): str(
+                url.database
+            ),
+            get_project_secret_var(
+                project_name=service_name, value="DATABASE_PORT"
+            ): str(url.port),
+            get_project_secret_var(
+                project_name=service_name, value="DATABASE_USERNAME"
+            ): str(url.username),
+            get_project_secret_var(
+                project_name=service_name, value="DATABASE_PASSWORD"
+            ): str(url.password),
+        }
+
+    def get_artifacts(self) -> Mapping[str, str]:
+        artifacts = {}
+        for service, database in self.databases.items():
+            main_artifact_name = self.get_service_secret_artifact_name(service=service)
+            artifacts[main_artifact_name] = str(database.url)
+            artifacts.update(
+                self._get_default_database_values(
+                    url=database.url, service_name=service.name
+                )
+            )
+        return artifacts
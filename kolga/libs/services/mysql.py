@@ -1,18 +1,11 @@
-import tempfile
-from pathlib import Path
-from typing import Any, Dict, Mapping, TypedDict
+from typing import Any, Dict, List, NotRequired, TypedDict
 from uuid import uuid4
 
 from kolga.libs.database import Database
 from kolga.libs.service import Service
+from kolga.libs.services.database import DatabaseService
 from kolga.settings import settings
-from kolga.utils.general import (
-    DATABASE_DEFAULT_PORT_MAPPING,
-    MYSQL,
-    get_deploy_name,
-    get_project_secret_var,
-    string_to_yaml,
-)
+from kolga.utils.general import DATABASE_DEFAULT_PORT_MAPPING, MYSQL, get_deploy_name
 from kolga.utils.models import HelmValues
 from kolga.utils.url import URL  # type: ignore
 
@@ -31,9 +24,14 @@ class _Image(TypedDict):
 class _Values(HelmValues):
     auth: _Auth
     image: _Image
+    initdbScripts: NotRequired[Dict[str, str]]
 
 
-class MysqlService(Service):
+class _SharedValues(HelmValues):
+    image: _Image
+
+
+class MysqlService(DatabaseService):
     def __init__(
         self,
         chart: str = "bitnami/mysql",
@@ -55,7 +53,6 @@ class MysqlService(Service):
         self.password = password
         self.database = database
         self.mysql_version = mysql_version
-        self.__databases: Dict[Service, Database] = {}
         self.values: _Values = {
             "auth": {
                 "database": self.database,
@@ -67,8 +64,34 @@ class MysqlService(Service):
         }
 
     def setup_prerequisites(self) -> None:
-        if self._prerequisite_of:
-            self.__databases = self._setup_database_init()
+        if not self._prerequisite_of:
+            return
+
+        if self.shared_server:
+            self.databases = self._setup_shared_databases()
+        else:
+            self.databases = self._setup_database_init()
+
+    def get_shared_server_values(self) -> _SharedValues:
+        # The root password is generated by the chart on the first install
+        return {"image": {"tag": self.mysql_version}}
+
+    @staticmethod
+    def get_sql_command(sql: str) -> List[str]:
+        return ["sh", "-c", 'mysql -uroot -p"$MYSQL_ROOT_PASSWORD" -e "$1"', "sh", sql]
+
+    def get_warm_pool_values(self, release_name: str, url: URL) -> _Values:
+        # The chart derives its full name from the release name as it
+        # contains the chart name, so the release name is the host name
+        return {
+            "auth": {
+                "database": url.database,
+                "password": url.password,
+                "rootPassword": str(uuid4()).replace("-", ""),
+                "username": url.username,
+            },
+            "image": {"tag": self.mysql_version},
+        }
 
     def get_base_database_url(self) -> URL:
         deploy_name = get_deploy_name(self.track)
@@ -79,9 +102,7 @@ class MysqlService(Service):
 
     def _setup_database_init(self) -> Dict[Service, Database]:
         databases = {}
-        database_values_file = tempfile.NamedTemporaryFile(delete=False)
-        values_file = Path(database_values_file.name)
-        database_values_file.write(b"initdbScripts: \n")
+        initdb_scripts = {}
         for dependent in self._prerequisite_of:
             database_url = self.get_base_database_url()
             database_url.username = str(uuid4()).replace("-", "")
@@ -89,65 +110,7 @@ class MysqlService(Service):
             database_url.database = dependent.name
             database = Database(url=database_url)
 
-            database_values_file.write(
-                string_to_yaml(f"{dependent.name}.sql: ", indentation=2, strip=False)
-            )
-
-            yaml_sql_string = string_to_yaml(database.creation_sql, indentation=4)
-            database_values_file.write(yaml_sql_string)
-            database_values_file.write(b"\n")
+            initdb_scripts[f"{dependent.name}.sql"] = database.creation_sql
             databases[dependent] = database
-        database_values_file.close()
-        self.values_files.append(values_file)
+        self.values["initdbScripts"] = initdb_scripts
         return databases
-
-    def _get_default_database_values(
-        self, url: URL, service_name: str = ""
-    ) -> Dict[str, str]:
-        """
-        Return a set of default extra values that are non-user definable
-
-        Currently there is only support for the user to set a single value when
-        adding a service. This adds some default values in order for the application
-        to be able to get every part of the database URL separately.
-
-        Args:
-            url: The URL of the database as a single string
-            service_name: Prefixes for each value
-
-        Returns:
-
-        """
-
-        return {
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_URL"
-            ): str(url),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_HOST"
-            ): str(url.host),
-            get_project_secret_var(project_name=service_name, value="DATABASE_DB"): str(
-                url.database
-            ),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_PORT"
-            ): str(url.port),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_USERNAME"
-            ): str(url.username),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_PASSWORD"
-            ): str(url.password),
-        }
-
-    def get_artifacts(self) -> Mapping[str, str]:
-        artifacts = {}
-        for service, database in self.__databases.items():
-            main_artifact_name = self.get_service_secret_artifact_name(service=service)
-            artifacts[main_artifact_name] = str(database.url)
-            artifacts.update(
-                self._get_default_database_values(
-                    url=database.url, service_name=service.name
-                )
-            )
-        return artifacts
@@ -1,13 +1,8 @@
-from typing import Any, Dict, Mapping, TypedDict
+from typing import Any, List, Mapping, TypedDict
 
-from kolga.libs.service import Service
+from kolga.libs.services.database import DatabaseService
 from kolga.settings import settings
-from kolga.utils.general import (
-    DATABASE_DEFAULT_PORT_MAPPING,
-    POSTGRES,
-    get_deploy_name,
-    get_project_secret_var,
-)
+from kolga.utils.general import DATABASE_DEFAULT_PORT_MAPPING, POSTGRES, get_deploy_name
 from kolga.utils.models import DockerImageRef, HelmValues
 from kolga.utils.url import URL  # type: ignore
 
@@ -40,9 +35,18 @@ class _Values(HelmValues):
     resources: _Limits
 
 
-class PostgresqlService(Service):
+class _SharedValues(HelmValues):
+    fullnameOverride: str
+    image: _Image
+    resources: _Limits
+
+
+class PostgresqlService(DatabaseService):
     """
-    TODO: Add support for multiple databases within one server
+    PostgreSQL database service
+
+    Outside of the shared server mode all dependent projects share the same
+    database and credentials.
     """
 
     def __init__(
@@ -64,13 +68,13 @@ class PostgresqlService(Service):
         self.username = username
         self.password = password
         self.database = database
-        image = DockerImageRef.parse_string(settings.POSTGRES_IMAGE)
+        self.image = DockerImageRef.parse_string(settings.POSTGRES_IMAGE)
 
         self.memory_request = self.service_specific_values.get("MEMORY_REQUEST", "50Mi")
         self.cpu_request = self.service_specific_values.get("CPU_REQUEST", "50m")
 
         self.values: _Values = {
-            "image": {"repository": image.repository},
+            "image": self._get_image_values(),
             "fullnameOverride": get_deploy_name(track=self.track, postfix=self.name),
             "auth": {
                 "username": self.username,
@@ -82,11 +86,55 @@ class PostgresqlService(Service):
             },
         }
 
-        if image.registry is not None:
-            self.values["image"]["registry"] = image.registry
+    def _get_image_values(self) -> _Image:
+        image_values: _Image = {"repository": self.image.repository}
+
+        if self.image.registry is not None:
+            image_values["registry"] = self.image.registry
+
+        if self.image.tag is not None:
+            image_values["tag"] = self.image.tag
+
+        return image_values
+
+    def setup_prerequisites(self) -> None:
+        if self.shared_server and self._prerequisite_of:
+            self.databases = self._setup_shared_databases()
+
+    def get_shared_server_values(self) -> _SharedValues:
+        # The admin password is generated by the chart on the first install
+        return {
+            "fullnameOverride": self.shared_release_name,
+            "image": self._get_image_values(),
+            "resources": {
+                "requests": {"memory": self.memory_request, "cpu": self.cpu_request},
+            },
+        }
+
+    @staticmethod
+    def get_sql_command(sql: str) -> List[str]:
+        # SQL is piped to psql, instead of using ``--command``, so that each
+        # statement runs in a transaction of its own (``CREATE DATABASE``
+        # can't be run inside a transaction block).
+        script = (
+            'printf "%s\\n" "$1" | '
+            'PGPASSWORD="$POSTGRES_PASSWORD" psql -v ON_ERROR_STOP=1 -U postgres'
+        )
+        return ["sh", "-c", script, "sh", sql]
 
-        if image.tag is not None:
-            self.values["image"]["tag"] = image.tag
+    def get_warm_pool_values(self, release_name: str, url: URL) -> _Values:
+        return {
+            "fullnameOverride": release_name,
+            "image": self._get_image_values(),
+            "auth": {
+                "username": url.username,
+                "password": url.password,
+                "database": url.database,
+            },
+            "resources": {
+                "requests": {"memory": self.memory_request, "cpu": self.cpu_request},
+            },
+        }
 
     def get_database_url(self) -> URL:
         deploy_name = get_deploy_name(self.track)
@@ -102,46 +150,12 @@ class PostgresqlService(Service):
             database=self.database,
         )
 
-    def _get_default_database_values(
-        self, url: URL, service_name: str = ""
-    ) -> Dict[str, str]:
-        """
-        Return a set of default extra values that are non-user definable
-
-        Currently there is only support for the user to set a single value when
-        adding a service. This adds some default values in order for the application
-        to be able to get every part of the database URL separately.
-
-        Args:
-            url: The URL of the database as a single string
-            service_name: Prefixes for each value
-
-        Returns:
-
-        """
-
-        return {
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_URL"
-            ): str(url),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_HOST"
-            ): str(url.host),
-            get_project_secret_var(project_name=service_name, value="DATABASE_DB"): str(
-                url.database
-            ),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_PORT"
-            ): str(url.port),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_USERNAME"
-            ): str(url.username),
-            get_project_secret_var(
-                project_name=service_name, value="DATABASE_PASSWORD"
-            ): str(url.password),
-        }
-
     def get_artifacts(self) -> Mapping[str, str]:
+        # Databases are set up for the dependents in the shared server mode
+        # and when a warm pool instance is used
+        if self.databases:
+            return super().get_artifacts()
+
         artifacts = {}
         for service in self._prerequisite_of:
             main_artifact_name = self.get_service_secret_artifact_name(service=service)
@@ -1,7 +1,8 @@
-from typing import Any, Dict, Mapping, TypedDict
+from typing import Any, Dict, Mapping, Optional, TypedDict
+from uuid import uuid4
 
 from kolga.libs.database import Database
-from kolga.libs.service import Service
+from kolga.libs.service import WarmPoolService
 from kolga.settings import settings
 from kolga.utils.general import (
     AMQP,
@@ -28,7 +29,7 @@ class _Values(HelmValues):
     auth: _RabbitMQ
 
 
-class RabbitmqService(Service):
+class RabbitmqService(WarmPoolService):
     def __init__(
         self,
         chart: str = "bitnami/rabbitmq",
@@ -51,12 +52,16 @@ class RabbitmqService(Service):
         self.vhost = vhost
         self.rabbitmq_version = rabbitmq_version
         self.__databases: Dict[str, Database] = {}
+        self.server_url: Optional[URL] = None
         self.values: _Values = {
             "image": {"tag": self.rabbitmq_version},
             "auth": {"password": self.password, "username": self.username},
         }
 
     def get_base_server_url(self) -> URL:
+        if self.server_url:
+            return self.server_url
+
         deploy_name = get_deploy_name(self.track)
         port = DATABASE_DEFAULT_PORT_MAPPING[AMQP]
         host = f"{deploy_name}-rabbitmq"
@@ -68,6 +73,24 @@ class RabbitmqService(Service):
             password=self.password,
         )
 
+    def get_warm_pool_url(self, release_name: str, namespace: str) -> URL:
+        return URL(
+            drivername=AMQP,
+            host=f"{release_name}.{namespace}.svc",
+            port=DATABASE_DEFAULT_PORT_MAPPING[AMQP],
+            username=self.username,
+            password=str(uuid4()).replace("-", ""),
+        )
+
+    def get_warm_pool_values(self, release_name: str, url: URL) -> _Values:
+        return {
+            "image": {"tag": self.rabbitmq_version},
+            "auth": {"password": url.password, "username": url.username},
+        }
+
+    def use_warm_pool_instance(self, url: URL) -> None:
+        self.server_url = url
+
     def _get_default_broker_values(
         self, url: URL, service_name: str = ""
     ) -> Dict[str, str]:
@@ -0,0 +1,282 @@
+import json
+import threading
+from base64 import b64decode, b64encode
+from hashlib import sha256
+from typing import Any, List, Optional
+from uuid import uuid4
+
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.libs.helm import Helm
+from kolga.libs.service import WarmPoolService
+from kolga.settings import settings
+from kolga.utils.general import kubernetes_safe_name
+from kolga.utils.logger import logger
+from kolga.utils.url import make_url  # type: ignore
+
+WARM_POOL_LABEL = "kolga.io/warm-pool"
+WARM_POOL_SPEC_LABEL = "kolga.io/warm-pool-spec"
+WARM_POOL_STATE_LABEL = "kolga.io/warm-pool-state"
+WARM_POOL_CLAIMED_BY_LABEL = "kolga.io/claimed-by"
+
+STATE_READY = "ready"
+STATE_CLAIMED = "claimed"
+
+# Label set by the charts on all resources of a release
+INSTANCE_LABEL = "app.kubernetes.io/instance"
+
+
+class WarmPool:
+    """
+    A pool of pre-provisioned service instances
+
+    The pool keeps ``size`` instances of each service type deployed in its
+    namespace. Every instance is a Helm release accompanied by a secret, with
+    the same name, holding the connection URL of the instance. The labels of
+    the secret tell which service the instance is for and whether it is still
+    available.
+
+    An environment claims a ready instance by relabeling its secret. The
+    relabeling is done with the ``resourceVersion`` of the listed secret, so
+    that only one of two concurrent claims for the same instance can succeed.
+
+    Args:
+        core_v1: Kubernetes core API, such as ``kubernetes.client.CoreV1Api``
+        helm: Helm wrapper used for deploying and removing instances
+        namespace: Namespace of the pool
+        size: Number of ready instances to keep for each service type
+    """
+
+    ICON = "🔥"
+
+    def __init__(
+        self,
+        core_v1: Any,
+        helm: Helm,
+        namespace: str = settings.SERVICE_WARM_POOL_NAMESPACE,
+        size: int = settings.SERVICE_WARM_POOL_SIZE,
+    ) -> None:
+        self.core_v1 = core_v1
+        self.helm = helm
+        self.namespace = namespace
+        self.size = size
+
+    @staticmethod
+    def get_spec(service: WarmPoolService) -> str:
+        """
+        Get a hash identifying the deployment specification of a service
+
+        Instances deployed from another chart, chart version or image are
+        never handed out, and are removed when the pool is replenished.
+        """
+        spec = {
+            "chart": service.chart,
+            "chart_version": service.chart_version,
+            "image": dict(service.values).get("image"),
+        }
+        return sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _list_instances(self, **labels: str) -> List[k8s_client.V1Secret]:
+        label_selector = ",".join(f"{key}={value}" for key, value in labels.items())
+        response = self.core_v1.list_namespaced_secret(
+            self.namespace, label_selector=label_selector
+        )
+        return list(response.items)
+
+    def _list_service_instances(
+        self, service: WarmPoolService
+    ) -> List[k8s_client.V1Secret]:
+        return self._list_instances(
+            **{WARM_POOL_LABEL: service.name, WARM_POOL_STATE_LABEL: STATE_READY}
+        )
+
+    def is_instance_ready(self, release_name: str) -> bool:
+        """
+        Check that all pods of an instance are running and ready
+        """
+        response = self.core_v1.list_namespaced_pod(
+            self.namespace, label_selector=f"{INSTANCE_LABEL}={release_name}"
+        )
+        if not response.items:
+            return False
+
+        for pod in response.items:
+            conditions = (pod.status and pod.status.conditions) or []
+            if not any(c.type == "Ready" and c.status == "True" for c in conditions):
+                return False
+        return True
+
+    def claim(self, service: WarmPoolService, namespace: str) -> bool:
+        """
+        Claim a ready instance of a service for an environment
+
+        On success the service is set to use the claimed instance, so that
+        :meth:`WarmPoolService.get_artifacts` returns its credentials.
+
+        Args:
+            service: WarmPoolService to claim an instance for
+            namespace: Namespace of the environment claiming the instance
+
+        Returns:
+            True if an instance was claimed, False if none was available
+        """
+        spec = self.get_spec(service)
+
+        for secret in self._list_service_instances(service):
+            release_name = secret.metadata.name
+            if secret.metadata.labels.get(WARM_POOL_SPEC_LABEL) != spec:
+                continue
+            if not self.is_instance_ready(release_name):
+                continue
+
+            secret.metadata.labels[WARM_POOL_STATE_LABEL] = STATE_CLAIMED
+            secret.metadata.labels[WARM_POOL_CLAIMED_BY_LABEL] = namespace
+            try:
+                self.core_v1.replace_namespaced_secret(
+                    name=release_name, namespace=self.namespace, body=secret
+                )
+            except ApiException as e:
+                # Someone else claimed the instance first
+                if e.status == 409:
+                    continue
+                raise
+
+            url = make_url(b64decode(secret.data["url"]).decode("UTF-8"))
+            service.use_warm_pool_instance(url)
+            logger.success(
+                icon=f"{self.ICON}",
+                message=f"Claimed warm pool instance '{release_name}' for {service.name}",
+            )
+            return True
+
+        logger.info(
+            icon=f"{self.ICON}", message=f"No warm pool instance of {service.name}"
+        )
+        return False
+
+    def add_instance(self, service: WarmPoolService) -> str:
+        """
+        Deploy a new instance of a service to the pool
+
+        Helm is not waiting for the instance to roll out, an instance is not
+        claimed until :meth:`is_instance_ready` says so.
+
+        Returns:
+            Release name of the instance
+        """
+        release_name = kubernetes_safe_name(f"pool-{service.name}-{uuid4().hex[:8]}")
+        url = service.get_warm_pool_url(release_name, self.namespace)
+        labels = {
+            WARM_POOL_LABEL: service.name,
+            WARM_POOL_SPEC_LABEL: self.get_spec(service),
+            WARM_POOL_STATE_LABEL: STATE_READY,
+        }
+        body = k8s_client.V1Secret(
+            data={"url": b64encode(str(url).encode("UTF-8")).decode("UTF-8")},
+            metadata=k8s_client.V1ObjectMeta(
+                name=release_name, namespace=self.namespace, labels=labels
+            ),
+            type="Opaque",
+        )
+        self.core_v1.create_namespaced_secret(namespace=self.namespace, body=body)
+
+        result = self.helm.upgrade_chart(
+            chart=service.chart,
+            chart_path=service.chart_path,
+            name=release_name,
+            namespace=self.namespace,
+            values=service.get_warm_pool_values(release_name, url),
+            values_files=service.values_files,
+            version=service.chart_version,
+            raise_exception=False,
+            atomic=False,
+        )
+        if result.return_code:
+            self.core_v1.delete_namespaced_secret(
+                name=release_name, namespace=self.namespace
+            )
+        return release_name
+
+    def remove_instance(self, release_name: str) -> None:
+        """
+        Remove an instance, including its volumes, from the pool
+        """
+        self.helm.uninstall_chart(name=release_name, namespace=self.namespace)
+        self.core_v1.delete_collection_namespaced_persistent_volume_claim(
+            self.namespace, label_selector=f"{INSTANCE_LABEL}={release_name}"
+        )
+        self.core_v1.delete_namespaced_secret(
+            name=release_name, namespace=self.namespace
+        )
+
+    def replenish(self, service: WarmPoolService) -> int:
+        """
+        Fill the pool up to its size with instances of a service
+
+        Available instances with an outdated specification are removed.
+
+        Returns:
+            The number of instances added
+        """
+        spec = self.get_spec(service)
+        available = 0
+        for secret in self._list_service_instances(service):
+            if secret.metadata.labels.get(WARM_POOL_SPEC_LABEL) == spec:
+                available += 1
+            else:
+                self.remove_instance(secret.metadata.name)
+
+        missing = max(self.size - available, 0)
+        for _ in range(missing):
+            self.add_instance(service)
+        return missing
+
+    def _replenish_or_warn(self, service: WarmPoolService) -> None:
+        # A failing replenish must not fail the deployment it runs alongside
+        try:
+            self.replenish(service)
+        except Exception as e:
+            reason = e.reason if isinstance(e, ApiException) else e
+            logger.warning(
+                icon=f"{self.ICON}",
+                message=f"Could not replenish warm pool of {service.name}: {reason}",
+            )
+
+    def replenish_in_background(self, service: WarmPoolService) -> threading.Thread:
+        """
+        Replenish the pool in a separate thread
+
+        The thread is not a daemon thread, the application waits for it to
+        finish before exiting.
+        """
+        thread = threading.Thread(
+            target=self._replenish_or_warn,
+            args=(service,),
+            name=f"warm-pool-{service.name}",
+        )
+        thread.start()
+        return thread
+
+    def release(self, namespace: str) -> List[str]:
+        """
+        Remove the instances claimed by an environment
+
+        Args:
+            namespace: Namespace of the environment
+
+        Returns:
+            Release names of the removed instances
+        """
+        released = []
+        for secret in self._list_instances(
+            **{
+                WARM_POOL_STATE_LABEL: STATE_CLAIMED,
+                WARM_POOL_CLAIMED_BY_LABEL: namespace,
+            }
+        ):
+            release_name: Optional[str] = secret.metadata.name
+            if release_name:
+                self.remove_instance(release_name)
+                released.append(release_name)
+        return released
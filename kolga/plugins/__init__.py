@@ -1,25 +1,69 @@
-from importlib import import_module
+from importlib.metadata import entry_points
 from pathlib import Path
-from typing import Callable, Generator, Iterator, Optional, Type, TypeVar
+from typing import Callable, Generator, Iterator, List, Optional, TypeVar
 
 from kolga.plugins.base import PluginBase
+from kolga.plugins.manifest import MANIFEST_FILENAME, PluginManifest
 from kolga.utils.logger import logger
 
+ENTRY_POINT_GROUP = "kolga.plugins"
 
-def _import_plugins(
+
+def _read_manifests(
     directory: Optional[Path] = None,
-) -> Generator[Type[PluginBase], None, None]:
+) -> Generator[PluginManifest, None, None]:
+    """
+    Read the manifests of the plugin packages in a directory
+
+    Packages without a manifest get one naming only their ``Plugin`` class,
+    so that they are always imported, as before manifests existed.
+    """
     if not directory:
         directory = Path(__file__).parent
 
-    for init_file in directory.glob("*/__init__.py"):
-        module_name = init_file.parent.name
-        module = import_module(f".{module_name}", package=__package__)
+    for init_file in sorted(directory.glob("*/__init__.py")):
+        package_name = init_file.parent.name
+        package = f"{__package__}.{package_name}"
+        manifest_file = init_file.parent / MANIFEST_FILENAME
+        if not manifest_file.exists():
+            logger.debug(f"No {MANIFEST_FILENAME} in plugin package {package_name}")
+            yield PluginManifest(name=package_name, module=package)
+            continue
 
         try:
-            yield getattr(module, "Plugin")
-        except AttributeError:
-            logger.warning(f"Unable to load plugin: {module_name}")
+            yield PluginManifest.from_file(manifest_file, package=package)
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Unable to read plugin manifest {manifest_file}: {e}")
+
+
+def get_entry_point_manifests() -> List[PluginManifest]:
+    """
+    Get the manifests of plugins registered through entry points
+
+    An entry point can also refer to a plugin class directly. Such a plugin
+    is always imported, as there is nothing to check before importing it.
+    """
+    manifests = []
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            loaded = entry_point.load()
+        except ImportError as e:
+            logger.warning(f"Unable to load plugin {entry_point.name}: {e}")
+            continue
+
+        if isinstance(loaded, PluginManifest):
+            manifests.append(loaded)
+        elif isinstance(loaded, type) and issubclass(loaded, PluginBase):
+            manifests.append(
+                PluginManifest(
+                    name=entry_point.name,
+                    module=entry_point.module,
+                    attribute=entry_point.attr,
+                )
+            )
+        else:
+            logger.warning(f"Unable to load plugin: {entry_point.name}")
+    return manifests
 
 
 _T = TypeVar("_T")
@@ -40,4 +84,4 @@ class _LazyList(list[_T]):
         return super().__iter__()
 
 
-KOLGA_CORE_PLUGINS = _LazyList(_import_plugins)
+KOLGA_CORE_PLUGINS = _LazyList(_read_manifests)
@@ -1,4 +1,8 @@
-from typing import List
+import json
+import platform
+import tempfile
+from pathlib import Path
+from typing import List, Set
 
 from environs import Env
 
@@ -8,6 +12,54 @@ from kolga.plugins.exceptions import PluginMissingConfiguration
 from kolga.utils.general import run_os_command
 from kolga.utils.logger import logger
 
+BINFMT_MISC_PATH = Path("/proc/sys/fs/binfmt_misc")
+BOOT_ID_PATH = Path("/proc/sys/kernel/random/boot_id")
+
+# Names of the binfmt_misc entries registered by tonistiigi/binfmt
+QEMU_EMULATORS = {
+    "386": "qemu-i386",
+    "amd64": "qemu-x86_64",
+    "arm": "qemu-arm",
+    "arm64": "qemu-aarch64",
+    "loong64": "qemu-loongarch64",
+    "mips64": "qemu-mips64",
+    "mips64le": "qemu-mips64el",
+    "ppc64le": "qemu-ppc64le",
+    "riscv64": "qemu-riscv64",
+    "s390x": "qemu-s390x",
+}
+
+# Docker architectures of the machine names returned by uname
+NATIVE_ARCHITECTURES = {
+    "aarch64": "arm64",
+    "amd64": "amd64",
+    "arm64": "arm64",
+    "i386": "386",
+    "i686": "386",
+    "x86_64": "amd64",
+}
+
+
+def get_architecture(docker_platform: str) -> str:
+    """
+    Get the architecture of a platform, such as ``arm`` of ``linux/arm/v7``
+    """
+    parts = docker_platform.strip().split("/")
+    return parts[1] if len(parts) > 1 else parts[0]
+
+
+def is_emulator_registered(
+    architecture: str, binfmt_misc_path: Path = BINFMT_MISC_PATH
+) -> bool:
+    """
+    Check if an emulator of an architecture is registered and enabled
+    """
+    entry = binfmt_misc_path / QEMU_EMULATORS.get(architecture, f"qemu-{architecture}")
+    try:
+        return entry.read_text().split("\n", 1)[0].strip() == "enabled"
+    except OSError:
+        return False
+
 
 class KolgaBinfmtPlugin(PluginBase):
     name = "binfmt"
@@ -15,21 +67,86 @@ class KolgaBinfmtPlugin(PluginBase):
     version = 0.1
 
     # Environment variables
+    BINFMT_CACHE_PATH: str = str(Path(tempfile.gettempdir()) / "kolga-binfmt.json")
     BINFMT_ENABLED: bool
     DOCKER_BUILD_PLATFORMS: List[str]
 
+    binfmt_misc_path = BINFMT_MISC_PATH
+    boot_id_path = BOOT_ID_PATH
+
     def __init__(self, env: Env) -> None:
         self.required_variables = [
             ("BINFMT_ENABLED", env.bool),
             ("DOCKER_BUILD_PLATFORMS", env.list),
         ]
+        self.optional_variables = [("BINFMT_CACHE_PATH", env.str)]
         self.configure(env)
 
         if not self.BINFMT_ENABLED or not self.DOCKER_BUILD_PLATFORMS:
             raise PluginMissingConfiguration("Binfmt not enabled")
 
+    def _get_boot_id(self) -> str:
+        try:
+            return self.boot_id_path.read_text().strip()
+        except OSError:
+            return ""
+
+    def _read_cache(self) -> Set[str]:
+        """
+        Read the architectures installed during the current boot
+        """
+        boot_id = self._get_boot_id()
+        if not boot_id or not self.BINFMT_CACHE_PATH:
+            return set()
+
+        try:
+            cache = json.loads(Path(self.BINFMT_CACHE_PATH).read_text())
+        except (OSError, ValueError):
+            return set()
+
+        if cache.get("boot_id") != boot_id:
+            return set()
+        return set(cache.get("architectures", []))
+
+    def _write_cache(self, architectures: Set[str]) -> None:
+        boot_id = self._get_boot_id()
+        if not boot_id or not self.BINFMT_CACHE_PATH:
+            return
+
+        cache = {"boot_id": boot_id, "architectures": sorted(architectures)}
+        try:
+            Path(self.BINFMT_CACHE_PATH).write_text(json.dumps(cache))
+        except OSError as e:
+            logger.warning(icon="🐳 ⚠️", message=f"Could not write binfmt cache: {e}")
+
+    def get_missing_platforms(self) -> List[str]:
+        """
+        Get the build platforms without a registered emulator
+
+        Platforms native to the machine, ones with an emulator registered in
+        binfmt_misc and ones installed earlier during the same boot are left
+        out, as registrations last until the machine is restarted.
+        """
+        native = NATIVE_ARCHITECTURES.get(platform.machine().lower())
+        cached = self._read_cache()
+
+        missing_platforms = []
+        for docker_platform in self.DOCKER_BUILD_PLATFORMS:
+            architecture = get_architecture(docker_platform)
+            if architecture == native or architecture in cached:
+                continue
+            if is_emulator_registered(architecture, self.binfmt_misc_path):
+                continue
+            missing_platforms.append(docker_platform.strip())
+        return missing_platforms
+
     def install_binfmt_platforms(self) -> None:
-        platforms = ",".join(self.DOCKER_BUILD_PLATFORMS)
+        missing_platforms = self.get_missing_platforms()
+        if not missing_platforms:
+            logger.info(icon="🐳 ℹ️", message="Platform support already installed")
+            return
+
+        platforms = ",".join(missing_platforms)
         logger.info(
             icon="🐳 ℹ️", message=f"Installing platform support for: {platforms}"
         )
@@ -47,6 +164,9 @@ class KolgaBinfmtPlugin(PluginBase):
         if result.return_code:
             logger.std(result, raise_exception=True)
 
+        installed = {get_architecture(p) for p in missing_platforms}
+        self._write_cache(self._read_cache() | installed)
+
     @hookimpl
     def buildx_setup_buildkit_begin(self) -> None:
         self.install_binfmt_platforms()
@@ -1,11 +1,15 @@
+from pathlib import Path
+from typing import Iterator
 from unittest import mock
 
 import pytest
+from environs import Env
 
+from kolga.utils.models import SubprocessResult
 from tests.testcase import load_plugin
 
 from ...exceptions import TestCouldNotLoadPlugin
-from ..binfmt import KolgaBinfmtPlugin
+from ..binfmt import KolgaBinfmtPlugin, get_architecture, is_emulator_registered
 
 
 @mock.patch.dict(
@@ -40,3 +44,67 @@ def test_load_plugin_no_platforms() -> None:
 def test_load_plugin_no_platforms_disabled_plugin() -> None:
     with pytest.raises(TestCouldNotLoadPlugin):
         load_plugin(KolgaBinfmtPlugin).enable()
+
+
+@pytest.fixture
+def plugin(tmp_path: Path) -> Iterator[KolgaBinfmtPlugin]:
+    binfmt_misc = tmp_path / "binfmt_misc"
+    binfmt_misc.mkdir()
+    (binfmt_misc / "qemu-aarch64").write_text(
+        "enabled\ninterpreter /usr/bin/qemu-aarch64\n"
+    )
+    (binfmt_misc / "qemu-riscv64").write_text(
+        "disabled\ninterpreter /usr/bin/qemu-riscv64\n"
+    )
+    boot_id = tmp_path / "boot_id"
+    boot_id.write_text("boot-1\n")
+
+    env = {
+        "BINFMT_CACHE_PATH": str(tmp_path / "cache.json"),
+        "BINFMT_ENABLED": "1",
+        "DOCKER_BUILD_PLATFORMS": "linux/amd64,linux/arm64,linux/riscv64,linux/arm/v7",
+    }
+    with mock.patch.dict("os.environ", env), mock.patch(
+        "platform.machine", return_value="x86_64"
+    ):
+        plugin = KolgaBinfmtPlugin(Env())
+        plugin.binfmt_misc_path = binfmt_misc
+        plugin.boot_id_path = boot_id
+        yield plugin
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("linux/arm64", "arm64"), ("linux/arm/v7", "arm"), ("riscv64", "riscv64")],
+)
+def test_get_architecture(value: str, expected: str) -> None:
+    assert get_architecture(value) == expected
+
+
+def test_is_emulator_registered(plugin: KolgaBinfmtPlugin) -> None:
+    assert is_emulator_registered("arm64", plugin.binfmt_misc_path)
+    assert not is_emulator_registered("riscv64", plugin.binfmt_misc_path)
+    assert not is_emulator_registered("s390x", plugin.binfmt_misc_path)
+
+
+def test_get_missing_platforms(plugin: KolgaBinfmtPlugin) -> None:
+    # amd64 is native and arm64 registered already
+    assert plugin.get_missing_platforms() == ["linux/riscv64", "linux/arm/v7"]
+
+
+def test_install_binfmt_platforms(plugin: KolgaBinfmtPlugin) -> None:
+    result = SubprocessResult(out="", err="", return_code=0, child=None, command="")
+
+    with mock.patch(
+        "kolga.plugins.binfmt.binfmt.run_os_command", return_value=result
+    ) as run_os_command:
+        plugin.install_binfmt_platforms()
+        assert run_os_command.call_args.args[0][-1] == "linux/riscv64,linux/arm/v7"
+
+        # Installed emulators are cached for the boot
+        plugin.install_binfmt_platforms()
+        assert run_os_command.call_count == 1
+
+        plugin.boot_id_path.write_text("boot-2\n")
+        plugin.install_binfmt_platforms()
+        assert run_os_command.call_count == 2
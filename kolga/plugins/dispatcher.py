@@ -0,0 +1,157 @@
+import queue
+import threading
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from kolga.utils.logger import logger
+
+T = TypeVar("T")
+
+SendFunction = Callable[[str, List[T]], None]
+RetryDelayFunction = Callable[[Exception, int], Optional[float]]
+
+
+def no_retry(error: Exception, attempt: int) -> Optional[float]:
+    return None
+
+
+class NotificationDispatcher(Generic[T]):
+    """
+    Deliver notifications of a plugin from a background thread
+
+    Notifications are queued with :func:`~NotificationDispatcher.dispatch` and
+    delivered by a worker thread, so that slow or rate limited APIs never
+    delay the pipeline itself. Notifications queued within ``batch_interval``
+    seconds of each other are delivered to their channel in batches of at
+    most ``batch_size`` notifications.
+
+    Failed deliveries are retried after the delay returned by ``retry_delay``,
+    at most ``max_attempts`` times in total. A delay of None gives up on the
+    batch right away.
+
+    Args:
+        send: Function delivering a batch of notifications to a channel
+        retry_delay: Function returning the seconds to wait before retrying a
+            delivery failed with an exception, on the given attempt
+        batch_size: Maximum number of notifications delivered at once
+        batch_interval: Seconds to wait for more notifications to batch
+        max_attempts: Maximum number of delivery attempts of a batch
+    """
+
+    def __init__(
+        self,
+        send: SendFunction[T],
+        retry_delay: RetryDelayFunction = no_retry,
+        batch_size: int = 10,
+        batch_interval: float = 1.0,
+        max_attempts: int = 5,
+    ) -> None:
+        self.send = send
+        self.retry_delay = retry_delay
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_attempts = max_attempts
+        self.failed = 0
+
+        # None tells the worker to stop
+        self._queue: "queue.Queue[Optional[Tuple[str, T]]]" = queue.Queue()
+        self._closing = threading.Event()
+        self._aborted = threading.Event()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def dispatch(self, channel: str, notification: T) -> None:
+        """
+        Queue a notification for delivery to a channel
+        """
+        with self._lock:
+            if self._closing.is_set():
+                raise RuntimeError("Dispatcher is closed")
+
+            if self._worker is None:
+                # Daemon thread, so that an unreachable API can never keep the
+                # process running after close() has given up
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self._queue.put((channel, notification))
+
+    def close(self, timeout: float) -> bool:
+        """
+        Deliver the queued notifications and stop the worker
+
+        Args:
+            timeout: Maximum number of seconds to wait for the deliveries
+
+        Returns:
+            True if all notifications were delivered
+        """
+        with self._lock:
+            self._closing.set()
+            worker = self._worker
+        if worker is None:
+            return True
+
+        self._queue.put(None)
+        worker.join(timeout)
+        if worker.is_alive():
+            self._aborted.set()
+            logger.warning(
+                icon="📣 ⚠️",
+                message=f"Notifications not delivered within {timeout} seconds",
+            )
+            return False
+        return not self.failed
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            # Wait for more notifications to batch, unless closing
+            self._closing.wait(self.batch_interval)
+            pending = [item]
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                pending.append(item)
+
+            for channel, batch in self._get_batches(pending):
+                if self._aborted.is_set():
+                    return
+                self._deliver(channel, batch)
+
+    def _get_batches(self, items: List[Tuple[str, T]]) -> List[Tuple[str, List[T]]]:
+        by_channel: Dict[str, List[T]] = {}
+        for channel, notification in items:
+            by_channel.setdefault(channel, []).append(notification)
+
+        return [
+            (channel, notifications[i : i + self.batch_size])
+            for channel, notifications in by_channel.items()
+            for i in range(0, len(notifications), self.batch_size)
+        ]
+
+    def _deliver(self, channel: str, batch: List[T]) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.send(channel, batch)
+                return
+            except Exception as e:
+                delay = self.retry_delay(e, attempt)
+                if delay is None or attempt == self.max_attempts:
+                    self.failed += len(batch)
+                    logger.warning(
+                        icon="📣 ⚠️",
+                        message=f"Could not deliver notifications to {channel}: {e}",
+                    )
+                    return
+
+                # Retrying stops as soon as close() has given up waiting
+                if self._aborted.wait(delay):
+                    return
@@ -0,0 +1,87 @@
+import os
+import tomllib
+from dataclasses import dataclass, field
+from importlib import import_module
+from pathlib import Path
+from typing import Any, List, Mapping, Set, Type
+
+from kolga.plugins.base import PluginBase
+
+MANIFEST_FILENAME = "plugin.toml"
+
+
+@dataclass
+class PluginManifest:
+    """
+    Declarative description of a plugin, read without importing the plugin
+
+    Core plugins describe themselves with a ``plugin.toml`` file in their
+    package. Third-party plugins can register a manifest through the
+    ``kolga.plugins`` entry point group, pointing the entry point to a
+    ``PluginManifest`` in a module that does not import the plugin itself.
+
+    Attributes:
+        name: Name of the plugin
+        module: Module holding the plugin class
+        attribute: Name of the plugin class in ``module``
+        verbose_name: Human readable name of the plugin
+        required_variables: Environment variables that must all be set for
+            the plugin to be imported
+        hooks: Hooks implemented by the plugin
+    """
+
+    name: str
+    module: str
+    attribute: str = "Plugin"
+    verbose_name: str = ""
+    required_variables: List[str] = field(default_factory=lambda: list())
+    hooks: List[str] = field(default_factory=lambda: list())
+
+    @classmethod
+    def from_file(cls, path: Path, package: str) -> "PluginManifest":
+        """
+        Read the manifest of a plugin package
+
+        Args:
+            path: Path of the manifest file
+            package: Package the plugin module defaults to
+        """
+        with path.open("rb") as f:
+            data: Mapping[str, Any] = tomllib.load(f)
+
+        return cls(
+            name=data["name"],
+            module=data.get("module", package),
+            attribute=data.get("attribute", "Plugin"),
+            verbose_name=data.get("verbose_name", ""),
+            required_variables=list(data.get("required_variables", [])),
+            hooks=list(data.get("hooks", [])),
+        )
+
+    def is_configured(self, environ: Mapping[str, str] = os.environ) -> bool:
+        """
+        Check that all required variables of the plugin have a value
+        """
+        return all(environ.get(variable) for variable in self.required_variables)
+
+    def load(self) -> Type[PluginBase]:
+        """
+        Import the plugin class
+
+        Raises:
+            ImportError: If the module or the class can not be imported
+        """
+        module = import_module(self.module)
+        try:
+            plugin: Type[PluginBase] = getattr(module, self.attribute)
+        except AttributeError:
+            raise ImportError(f"{self.module} has no attribute {self.attribute}")
+        return plugin
+
+    @staticmethod
+    def get_implemented_hooks(plugin: Type[PluginBase]) -> Set[str]:
+        return {
+            name
+            for name in dir(plugin)
+            if hasattr(getattr(plugin, name, None), "kolga_impl")
+        }
@@ -1,6 +1,19 @@
 import os
+import time
 from importlib import import_module
-from typing import TYPE_CHECKING, Any, List, Mapping, Optional, Sequence, Set, Union
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from environs import Env
 
@@ -27,6 +40,8 @@ if TYPE_CHECKING:
     from kolga.libs.service import Service
     from kolga.utils.models import DockerImage
 
+    from .spool import SpoolingSpanExporter
+
 
 EXPORTERS = {
     "console": "opentelemetry.sdk.trace.export.ConsoleSpanExporter",
@@ -57,11 +72,17 @@ class KolgaOpenTelemetryPlugin(PluginBase):
     version = 0.1
 
     OPENTELEMETRY_ENABLED: bool = False
+    OPENTELEMETRY_FLUSH_TIMEOUT: float = 5.0
+    OPENTELEMETRY_SPOOL_PATH: str = ""
+    OPENTELEMETRY_UPLOAD_ENDPOINT: str = ""
     OTEL_TRACES_EXPORTER: str = "otlp"
 
     def __init__(self, env: Env) -> None:
         self.optional_variables = [
             ("OPENTELEMETRY_ENABLED", env.bool),
+            ("OPENTELEMETRY_FLUSH_TIMEOUT", env.float),
+            ("OPENTELEMETRY_SPOOL_PATH", env.str),
+            ("OPENTELEMETRY_UPLOAD_ENDPOINT", env.str),
             ("OTEL_TRACES_EXPORTER", env.str),
         ]
         self.configure(env)
@@ -87,9 +108,15 @@ class KolgaOpenTelemetryPlugin(PluginBase):
             },
         )
 
-        tracer_provider = TracerProvider(resource=pipeline_resource)
-        span_processor = BatchSpanProcessor(self._get_exporter())
-        tracer_provider.add_span_processor(span_processor)
+        # The provider is shut down at application shutdown, within the flush
+        # timeout, instead of waiting for the exporter without a limit at exit
+        tracer_provider = TracerProvider(
+            resource=pipeline_resource, shutdown_on_exit=False
+        )
+        exporter = self._get_exporter()
+        self.spooling_exporter = self._get_spooling_exporter(exporter)
+        self.span_processor = BatchSpanProcessor(self.spooling_exporter or exporter)
+        tracer_provider.add_span_processor(self.span_processor)
         trace.set_tracer_provider(tracer_provider)
         tracer = trace.get_tracer(__name__)
 
@@ -98,6 +125,7 @@ class KolgaOpenTelemetryPlugin(PluginBase):
         self.known_exceptions: Set[int] = set()
         self.tracer = tracer
         self.tracer_provider = tracer_provider
+        self.upload_endpoint, self.upload_headers = self._get_upload_config()
 
         # FIXME: We would like to get sub-traces from buildkit but at the time of writing it
         #        segfaults when OTEL is detected: https://github.com/docker/buildx/pull/925.
@@ -105,6 +133,78 @@ class KolgaOpenTelemetryPlugin(PluginBase):
             if key.startswith("OTEL_"):
                 del os.environ[key]
 
+    def _get_spooling_exporter(self, exporter: Any) -> Optional["SpoolingSpanExporter"]:
+        """
+        Wrap an exporter to spool the spans it can not export in time
+
+        The spool writer needs the OTLP exporter packages, so it is only
+        imported when a spool path is configured.
+        """
+        spool_path = self.get_spool_path()
+        if not spool_path:
+            return None
+
+        try:
+            from .spool import SpoolingSpanExporter
+        except ImportError:
+            logger.warning(
+                icon="🔭 ⚠️",
+                message="Spooling spans requires the OTLP exporter, spans are not spooled",
+            )
+            return None
+
+        return SpoolingSpanExporter(
+            exporter, spool_path=spool_path, timeout=self.OPENTELEMETRY_FLUSH_TIMEOUT
+        )
+
+    def get_spool_path(self) -> Optional[Path]:
+        if self.OPENTELEMETRY_SPOOL_PATH:
+            return Path(self.OPENTELEMETRY_SPOOL_PATH)
+        if settings.BUILD_ARTIFACT_FOLDER:
+            return Path(settings.BUILD_ARTIFACT_FOLDER) / "otel-spans.spool"
+        return None
+
+    def _get_upload_config(self) -> Tuple[str, Dict[str, str]]:
+        """
+        Get the OTLP/HTTP endpoint and headers for uploading spooled spans
+
+        Read before the OTEL_ variables are removed from the environment.
+        """
+        headers = {}
+        for header in os.environ.get("OTEL_EXPORTER_OTLP_HEADERS", "").split(","):
+            key, _, value = header.partition("=")
+            if key.strip():
+                headers[key.strip()] = value.strip()
+
+        if self.OPENTELEMETRY_UPLOAD_ENDPOINT:
+            return self.OPENTELEMETRY_UPLOAD_ENDPOINT, headers
+        if endpoint := os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT"):
+            return endpoint, headers
+        endpoint = os.environ.get(
+            "OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"
+        )
+        return f"{endpoint.rstrip('/')}/v1/traces", headers
+
+    def upload_spool(self) -> Optional[int]:
+        """
+        Upload the spans spooled by this or earlier jobs
+
+        Returns:
+            Number of spans uploaded, or None if the upload failed
+        """
+        spool_path = self.get_spool_path()
+        if not spool_path:
+            return 0
+
+        from .spool import upload_spool
+
+        return upload_spool(
+            spool_path,
+            endpoint=self.upload_endpoint,
+            headers=self.upload_headers,
+            timeout=self.OPENTELEMETRY_FLUSH_TIMEOUT,
+        )
+
     def _get_exporter(self) -> Any:
         exporter_name = self.OTEL_TRACES_EXPORTER.lower()
         if exporter_name not in EXPORTERS:
@@ -121,8 +221,21 @@ class KolgaOpenTelemetryPlugin(PluginBase):
         status = self._handle_exception(exception)
         ret = self._span_end("kolga_run", status=status)
 
-        # Force flush just in case.
-        self.tracer_provider.force_flush()
+        if not self.spooling_exporter:
+            self.span_processor.force_flush(
+                timeout_millis=int(self.OPENTELEMETRY_FLUSH_TIMEOUT * 1000)
+            )
+            return ret
+
+        # Spans not exported within the flush timeout are spooled
+        exporter = self.spooling_exporter
+        exporter.deadline = time.monotonic() + self.OPENTELEMETRY_FLUSH_TIMEOUT
+        self.span_processor.shutdown()
+        if exporter.spooled:
+            logger.warning(
+                icon="🔭 ⚠️",
+                message=f"{exporter.spooled} spans spooled to {exporter.spool_path}",
+            )
 
         return ret
 
@@ -0,0 +1,177 @@
+import struct
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.error import URLError
+
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest,
+)
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from kolga.utils.logger import logger
+
+# Records are prefixed with their length as a big endian unsigned int
+RECORD_HEADER = struct.Struct(">I")
+
+
+def read_spool(spool_path: Path) -> Iterator[ExportTraceServiceRequest]:
+    """
+    Read the export requests written to a spool file
+
+    A record left partially written, for instance by a killed job, ends the
+    reading.
+    """
+    data = spool_path.read_bytes()
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        (length,) = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        if offset + length > len(data):
+            break
+        request = ExportTraceServiceRequest()
+        request.ParseFromString(data[offset : offset + length])
+        offset += length
+        yield request
+
+
+def upload_spool(
+    spool_path: Path,
+    endpoint: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 10.0,
+) -> Optional[int]:
+    """
+    Upload the spans of a spool file to an OTLP/HTTP endpoint in one request
+
+    The spool file is removed after a successful upload. If the upload fails,
+    the error is logged and the spool file is kept for a later upload.
+
+    Args:
+        spool_path: Path of the spool file
+        endpoint: URL of the OTLP/HTTP traces endpoint
+        headers: Additional headers of the request
+        timeout: Timeout of the request in seconds
+
+    Returns:
+        Number of spans uploaded, or None if the upload failed
+    """
+    if not spool_path.exists():
+        return 0
+
+    bulk_request = ExportTraceServiceRequest()
+    for request in read_spool(spool_path):
+        bulk_request.resource_spans.extend(request.resource_spans)
+
+    span_count = sum(
+        len(scope_spans.spans)
+        for resource_spans in bulk_request.resource_spans
+        for scope_spans in resource_spans.scope_spans
+    )
+    if span_count:
+        http_request = urllib.request.Request(
+            endpoint,
+            data=bulk_request.SerializeToString(),
+            headers={"Content-Type": "application/x-protobuf", **(headers or {})},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(http_request, timeout=timeout):  # nosec
+                pass
+        except (URLError, TimeoutError) as e:
+            reason = e.reason if isinstance(e, URLError) else e
+            logger.error(
+                icon="🔭",
+                message=f"Uploading {span_count} spooled spans failed: {reason}",
+                raise_exception=False,
+            )
+            return None
+
+    spool_path.unlink()
+    return span_count
+
+
+class SpoolingSpanExporter(SpanExporter):
+    """
+    Span exporter with bounded export time, spooling failed exports to a file
+
+    Every export of the wrapped exporter is given at most ``timeout`` seconds,
+    and no more than what is left until ``deadline`` once it has been set.
+    Spans that could not be exported in time, or at all, are appended to
+    ``spool_path`` as OTLP export requests to be uploaded later with
+    :func:`upload_spool`.
+
+    Args:
+        exporter: Exporter sending the spans to a collector
+        spool_path: Path of the spool file, spans are dropped if not set
+        timeout: Maximum number of seconds an export may take
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        spool_path: Optional[Path] = None,
+        timeout: float = 10.0,
+    ) -> None:
+        self.exporter = exporter
+        self.spool_path = spool_path
+        self.timeout = timeout
+        self.deadline: Optional[float] = None
+        self.spooled = 0
+        self._lock = threading.Lock()
+
+    def _get_timeout(self) -> float:
+        if self.deadline is None:
+            return self.timeout
+        return min(self.timeout, self.deadline - time.monotonic())
+
+    def _run_bounded(self, target: "threading.Thread") -> bool:
+        # Exporters retry unreachable collectors for a long time, so they are
+        # run in a daemon thread that is abandoned once the time is up
+        timeout = self._get_timeout()
+        if timeout <= 0:
+            return False
+        target.start()
+        target.join(timeout)
+        return not target.is_alive()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        results: List[SpanExportResult] = []
+
+        def export() -> None:
+            try:
+                results.append(self.exporter.export(spans))
+            except Exception as e:
+                logger.debug(f"Exporting spans failed: {e}")
+
+        thread = threading.Thread(target=export, daemon=True)
+        if self._run_bounded(thread) and results == [SpanExportResult.SUCCESS]:
+            return SpanExportResult.SUCCESS
+
+        self.spool(spans)
+        return SpanExportResult.FAILURE
+
+    def spool(self, spans: Sequence[ReadableSpan]) -> None:
+        if not self.spool_path or not spans:
+            return
+
+        data = encode_spans(spans).SerializeToString()
+        with self._lock:
+            try:
+                self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.spool_path.open("ab") as f:
+                    f.write(RECORD_HEADER.pack(len(data)) + data)
+            except OSError as e:
+                logger.debug(f"Spooling spans failed: {e}")
+                return
+            self.spooled += len(spans)
+
+    def shutdown(self) -> None:
+        self._run_bounded(threading.Thread(target=self.exporter.shutdown, daemon=True))
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
@@ -0,0 +1,162 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import pytest
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest,
+)
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+from ..spool import SpoolingSpanExporter, read_spool, upload_spool
+
+
+class FakeCollector(ThreadingHTTPServer):
+    """
+    Local OTLP/HTTP collector, optionally answering only after ``delay``
+    """
+
+    def __init__(self, delay: float = 0) -> None:
+        super().__init__(("127.0.0.1", 0), FakeCollectorHandler)
+        self.delay = delay
+        self.requests: List[ExportTraceServiceRequest] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/traces"
+
+    @property
+    def span_names(self) -> List[str]:
+        return [
+            span.name
+            for request in self.requests
+            for resource_spans in request.resource_spans
+            for scope_spans in resource_spans.scope_spans
+            for span in scope_spans.spans
+        ]
+
+
+class FakeCollectorHandler(BaseHTTPRequestHandler):
+    server: FakeCollector
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.server.delay)
+
+        request = ExportTraceServiceRequest()
+        request.ParseFromString(body)
+        self.server.requests.append(request)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-protobuf")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def _start(collector: FakeCollector) -> FakeCollector:
+    thread = threading.Thread(
+        target=collector.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    return collector
+
+
+@pytest.fixture
+def collector() -> Iterator[FakeCollector]:
+    collector = _start(FakeCollector())
+    yield collector
+    collector.shutdown()
+    collector.server_close()
+
+
+@pytest.fixture
+def slow_collector() -> Iterator[FakeCollector]:
+    collector = _start(FakeCollector(delay=2))
+    yield collector
+    collector.shutdown()
+
+
+def _trace(exporter: SpoolingSpanExporter, *names: str) -> float:
+    """
+    Record spans and shut down the provider
+
+    Returns:
+        Seconds the shutdown took
+    """
+    provider = TracerProvider(shutdown_on_exit=False)
+    span_processor = BatchSpanProcessor(exporter)
+    provider.add_span_processor(span_processor)
+    tracer = provider.get_tracer(__name__)
+    for name in names:
+        with tracer.start_as_current_span(name):
+            pass
+
+    exporter.deadline = time.monotonic() + exporter.timeout
+    started = time.monotonic()
+    span_processor.shutdown()
+    return time.monotonic() - started
+
+
+def test_export(collector: FakeCollector, tmp_path: Path) -> None:
+    spool_path = tmp_path / "spans.spool"
+    exporter = SpoolingSpanExporter(
+        OTLPSpanExporter(endpoint=collector.url), spool_path=spool_path, timeout=5
+    )
+
+    _trace(exporter, "build", "deploy")
+
+    assert collector.span_names == ["build", "deploy"]
+    assert not spool_path.exists()
+
+
+def test_export_timeout_spools(
+    slow_collector: FakeCollector, collector: FakeCollector, tmp_path: Path
+) -> None:
+    spool_path = tmp_path / "spans.spool"
+    exporter = SpoolingSpanExporter(
+        OTLPSpanExporter(endpoint=slow_collector.url),
+        spool_path=spool_path,
+        timeout=0.2,
+    )
+
+    assert _trace(exporter, "build", "deploy") < 1
+    assert exporter.spooled == 2
+
+    # The spool is uploaded in bulk to another collector later on
+    assert upload_spool(spool_path, endpoint=collector.url) == 2
+    assert len(collector.requests) == 1
+    assert collector.span_names == ["build", "deploy"]
+    assert not spool_path.exists()
+
+
+def test_upload_spool_failure(tmp_path: Path) -> None:
+    spool_path = tmp_path / "spans.spool"
+    exporter = SpoolingSpanExporter(
+        OTLPSpanExporter(endpoint="http://127.0.0.1:1/v1/traces"),
+        spool_path=spool_path,
+        timeout=0,
+    )
+    _trace(exporter, "build")
+
+    assert upload_spool(spool_path, endpoint="http://127.0.0.1:1/v1/traces") is None
+    assert len(list(read_spool(spool_path))) == 1
+
+
+def test_read_spool_partial_record(tmp_path: Path) -> None:
+    spool_path = tmp_path / "spans.spool"
+    exporter = SpoolingSpanExporter(
+        OTLPSpanExporter(endpoint="http://127.0.0.1:1/v1/traces"),
+        spool_path=spool_path,
+        timeout=0,
+    )
+    _trace(exporter, "build")
+    with spool_path.open("ab") as f:
+        f.write(b"\x00\x00\x01\x00partial")
+
+    assert len(list(read_spool(spool_path))) == 1
@@ -1,10 +1,61 @@
-import sentry_sdk
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
 from environs import Env
 
-from kolga.plugins.base import PluginBase
+from kolga.hooks import hookimpl
+from kolga.settings import settings
+from kolga.utils.logger import logger
+
+from ..base import PluginBase
+from ..exceptions import PluginMissingConfiguration
+
+if TYPE_CHECKING:
+    from sentry_sdk.tracing import Span
+
+    from kolga.libs.project import Project
+    from kolga.libs.service import Service
+    from kolga.utils.models import DockerImage
+
+
+def is_valid_dsn(dsn: str) -> bool:
+    """
+    Check a DSN the way the SDK parses it, without importing the SDK
+    """
+    try:
+        parts = urlsplit(dsn)
+        hostname = parts.hostname
+    except ValueError:
+        return False
+    project_id = parts.path.rstrip("/").rsplit("/", 1)[-1]
+    return (
+        parts.scheme in ("http", "https")
+        and bool(parts.username)
+        and bool(hostname)
+        and project_id.isdigit()
+    )
+
+
+def _utcnow() -> datetime:
+    # The SDK works with naive UTC timestamps
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class KolgaSentryPlugin(PluginBase):
+    """
+    Reports errors and the duration of lifecycle phases to Sentry
+
+    The SDK is imported and initialized only when it is first needed, that is
+    when a lifecycle phase other than the application itself begins or the
+    application exits with an exception. Commands that do neither, such as
+    ``docker_test_image``, do not pay for Sentry at all.
+
+    The run is reported as a transaction, starting from the application
+    startup, with a span for every lifecycle phase. Transactions are sampled
+    with ``SENTRY_TRACES_SAMPLE_RATE``.
+    """
+
     name = "sentry"
     verbose_name = "Kolga Sentry Plugin"
     version = 0.1
@@ -12,16 +63,207 @@ class KolgaSentryPlugin(PluginBase):
     # Environment variables
     SENTRY_DSN: str
     DISABLE_SENTRY: bool
+    SENTRY_FLUSH_TIMEOUT: float = 5.0
+    SENTRY_TRACES_SAMPLE_RATE: float = 1.0
 
     def __init__(self, env: Env) -> None:
         self.required_variables = [("SENTRY_DSN", env.str)]
-        self.optional_variables = [("DISABLE_SENTRY", env.bool)]
+        self.optional_variables = [
+            ("DISABLE_SENTRY", env.bool),
+            ("SENTRY_FLUSH_TIMEOUT", env.float),
+            ("SENTRY_TRACES_SAMPLE_RATE", env.float),
+        ]
         self.DISABLE_SENTRY = False
 
         self.configure(env)
 
-        self._setup_client()
+        if not is_valid_dsn(self.SENTRY_DSN):
+            raise PluginMissingConfiguration("Invalid SENTRY_DSN")
+
+        self.initialized = False
+        self.started_at: Optional[datetime] = None
+        # Open spans of lifecycle phases, innermost last
+        self.spans: List[Tuple[str, "Span"]] = []
+
+    def _setup_client(self) -> bool:
+        """
+        Initialize the SDK and start the transaction of the run on first use
+
+        Returns:
+            True if Sentry is enabled
+        """
+        if self.DISABLE_SENTRY:
+            return False
+        if self.initialized:
+            return True
+
+        import sentry_sdk
+
+        sentry_sdk.init(
+            dsn=self.SENTRY_DSN,
+            traces_sample_rate=self.SENTRY_TRACES_SAMPLE_RATE,
+        )
+        self.initialized = True
+
+        transaction = sentry_sdk.start_transaction(
+            op="kolga_run",
+            name=settings.JOB_NAME or "kolga_run",
+            start_timestamp=self.started_at or _utcnow(),
+        )
+        tags = {
+            "pipeline.ci": str(settings.active_ci),
+            "pipeline.commit_ref_name": settings.GIT_COMMIT_REF_NAME,
+            "pipeline.environment": settings.ENVIRONMENT_SLUG,
+            "pipeline.id": settings.JOB_PIPELINE_ID,
+            "pipeline.job_name": settings.JOB_NAME,
+            "pipeline.project_id": settings.PROJECT_ID,
+        }
+        for key, value in tags.items():
+            if value:
+                transaction.set_tag(key, value)
+        self.spans.append(("kolga_run", transaction))
+        return True
+
+    def _span_begin(
+        self, op: str, description: str = "", data: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        if not self._setup_client():
+            return False
+
+        parent = self.spans[-1][1]
+        span = parent.start_child(op=op, description=description or op)
+        for key, value in (data or {}).items():
+            span.set_data(key, value)
+        self.spans.append((op, span))
+        return True
+
+    def _span_end(self, op: str, exception: Optional[Exception]) -> bool:
+        if not self.initialized:
+            return False
+
+        ops = [span_op for span_op, _ in self.spans]
+        if op not in ops:
+            logger.warning(f"Requested span not active: {op}")
+            return False
+
+        # Spans left open within the phase are ended along with it
+        index = len(ops) - 1 - ops[::-1].index(op)
+        for _, span in reversed(self.spans[index:]):
+            span.set_status("internal_error" if exception else "ok")
+            # Spans are timed from their creation, which the transaction of
+            # the run is back-dated from
+            span.finish(end_timestamp=_utcnow() if op == "kolga_run" else None)
+        del self.spans[index:]
+        return True
+
+    @hookimpl
+    def application_startup(self) -> Optional[bool]:
+        self.started_at = _utcnow()
+        return True
+
+    @hookimpl
+    def application_shutdown(self, exception: Optional[Exception]) -> Optional[bool]:
+        if exception is not None and self._setup_client():
+            import sentry_sdk
+
+            sentry_sdk.capture_exception(exception)
+
+        if not self.initialized:
+            return None
+
+        ret = self._span_end("kolga_run", exception)
+
+        import sentry_sdk
+
+        sentry_sdk.flush(timeout=self.SENTRY_FLUSH_TIMEOUT)
+        return ret
+
+    @hookimpl
+    def buildx_setup_buildkit_begin(self) -> Optional[bool]:
+        return self._span_begin("buildx_setup_buildkit")
+
+    @hookimpl
+    def buildx_setup_buildkit_complete(self) -> Optional[bool]:
+        return self._span_end("buildx_setup_buildkit", None)
+
+    @hookimpl
+    def container_build_begin(self) -> Optional[bool]:
+        return self._span_begin(
+            "container_build",
+            data={
+                "build_context": settings.DOCKER_BUILD_CONTEXT,
+                "build_source": settings.DOCKER_BUILD_SOURCE,
+            },
+        )
+
+    @hookimpl
+    def container_build_complete(
+        self, exception: Optional[Exception]
+    ) -> Optional[bool]:
+        return self._span_end("container_build", exception)
+
+    @hookimpl
+    def container_build_stage_begin(
+        self, image: "DockerImage", stage: str
+    ) -> Optional[bool]:
+        return self._span_begin(
+            "container_build_stage",
+            description=stage,
+            data={"repository": image.repository, "tags": image.tags},
+        )
+
+    @hookimpl
+    def container_build_stage_complete(
+        self, exception: Optional[Exception], image: "DockerImage", stage: str
+    ) -> Optional[bool]:
+        return self._span_end("container_build_stage", exception)
+
+    @hookimpl
+    def git_submodule_update_begin(self) -> Optional[bool]:
+        return self._span_begin("git_submodule_update")
+
+    @hookimpl
+    def git_submodule_update_complete(
+        self, exception: Optional[Exception]
+    ) -> Optional[bool]:
+        return self._span_end("git_submodule_update", exception)
+
+    @hookimpl
+    def project_deployment_begin(
+        self, namespace: str, project: "Project", track: str
+    ) -> Optional[bool]:
+        return self._span_begin(
+            "project_deployment",
+            description=project.name,
+            data={"namespace": namespace, "track": track},
+        )
+
+    @hookimpl
+    def project_deployment_complete(
+        self,
+        exception: Optional[Exception],
+        namespace: str,
+        project: "Project",
+        track: str,
+    ) -> Optional[bool]:
+        return self._span_end("project_deployment", exception)
+
+    @hookimpl
+    def service_deployment_begin(
+        self, namespace: str, service: "Service", track: str
+    ) -> Optional[bool]:
+        return self._span_begin(
+            "service_deployment",
+            description=service.name,
+            data={"chart": service.chart, "namespace": namespace, "track": track},
+        )
 
-    def _setup_client(self) -> None:
-        if not self.DISABLE_SENTRY:
-            sentry_sdk.init(dsn=self.SENTRY_DSN)
+    @hookimpl
+    def service_deployment_complete(
+        self,
+        exception: Optional[Exception],
+        namespace: str,
+        service: "Service",
+        track: str,
+    ) -> Optional[bool]:
+        return self._span_end("service_deployment", exception)
@@ -1,17 +1,28 @@
-from typing import Any
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
 from unittest import mock
 
 import pytest
 import sentry_sdk
 from sentry_sdk import capture_message
-from sentry_sdk.utils import BadDsn
+from sentry_sdk.utils import BadDsn, Dsn
 
 from kolga.plugins.exceptions import TestCouldNotLoadPlugin
+from kolga.settings import settings
 from tests.testcase import load_plugin
 
 from ..sentry import KolgaSentryPlugin
 
 
+def _get_plugin() -> KolgaSentryPlugin:
+    plugin = settings.plugin_manager.get_plugin(KolgaSentryPlugin.name)
+    assert isinstance(plugin, KolgaSentryPlugin)
+    return plugin
+
+
 @mock.patch.dict(
     "os.environ",
     {
@@ -35,9 +46,13 @@ def test_load_without_env_vars_fail() -> None:
     },
 )
 def test_load_dsn_fail() -> None:
-    with pytest.raises(BadDsn):
+    with pytest.raises(TestCouldNotLoadPlugin):
         load_plugin(KolgaSentryPlugin).enable()
 
+    # The DSN is checked the same way as the SDK does it
+    with pytest.raises(BadDsn):
+        Dsn("test_dsn")
+
 
 @mock.patch.dict(
     "os.environ",
@@ -48,5 +63,107 @@ def test_load_dsn_fail() -> None:
 @load_plugin(KolgaSentryPlugin)
 @mock.patch.object(sentry_sdk.Hub, "capture_event", return_value=True)
 def test_send_message(capture_event: Any) -> None:
+    # The SDK is initialized on first use
+    assert _get_plugin()._setup_client()
     capture_message("Something went wrong")
     capture_event.assert_called_once()
+    sentry_sdk.Hub.current.bind_client(None)
+
+
+class FakeSentry(ThreadingHTTPServer):
+    """
+    Local Sentry endpoint collecting the envelopes sent to it
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakeSentryHandler)
+        self.items: List[Dict[str, Any]] = []
+
+    @property
+    def dsn(self) -> str:
+        return f"http://public@127.0.0.1:{self.server_address[1]}/1"
+
+    def get_items(self, item_type: str) -> List[Dict[str, Any]]:
+        return [item for item in self.items if item["type"] == item_type]
+
+
+class FakeSentryHandler(BaseHTTPRequestHandler):
+    server: FakeSentry
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        # An envelope is a header followed by pairs of item headers and items
+        lines = body.splitlines()[1:]
+        for header, payload in zip(lines[::2], lines[1::2]):
+            self.server.items.append(
+                {"type": json.loads(header)["type"], **json.loads(payload)}
+            )
+
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def sentry_server() -> Iterator[FakeSentry]:
+    server = FakeSentry()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    sentry_sdk.Hub.current.bind_client(None)
+
+
+def test_lazy_initialization(sentry_server: FakeSentry) -> None:
+    with mock.patch.dict("os.environ", {"SENTRY_DSN": sentry_server.dsn}):
+        with load_plugin(KolgaSentryPlugin):
+            with settings.plugin_manager.lifecycle.application():
+                pass
+            assert not _get_plugin().initialized
+
+    assert not sentry_server.items
+
+
+def test_lifecycle_transaction(sentry_server: FakeSentry) -> None:
+    with mock.patch.dict("os.environ", {"SENTRY_DSN": sentry_server.dsn}):
+        with load_plugin(KolgaSentryPlugin):
+            lifecycle = settings.plugin_manager.lifecycle
+            with lifecycle.application():
+                with lifecycle.container_build():
+                    with lifecycle.git_submodule_update():
+                        pass
+            assert _get_plugin().initialized
+
+    (transaction,) = sentry_server.get_items("transaction")
+    assert transaction["contexts"]["trace"]["op"] == "kolga_run"
+    assert transaction["contexts"]["trace"]["status"] == "ok"
+    spans = {span["op"]: span for span in transaction["spans"]}
+    assert sorted(spans) == ["container_build", "git_submodule_update"]
+    assert (
+        spans["git_submodule_update"]["parent_span_id"]
+        == spans["container_build"]["span_id"]
+    )
+
+
+def test_exception_is_captured(sentry_server: FakeSentry) -> None:
+    with mock.patch.dict(
+        "os.environ",
+        {"SENTRY_DSN": sentry_server.dsn, "SENTRY_TRACES_SAMPLE_RATE": "0"},
+    ):
+        with load_plugin(KolgaSentryPlugin):
+            with pytest.raises(ValueError):
+                with settings.plugin_manager.lifecycle.application():
+                    raise ValueError("Deployment failed")
+
+    (event,) = sentry_server.get_items("event")
+    assert event["exception"]["values"][0]["value"] == "Deployment failed"
+    # Transactions are not sampled
+    assert not sentry_server.get_items("transaction")
@@ -1,4 +1,5 @@
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, List, Optional
+from urllib.error import HTTPError, URLError
 
 from environs import Env
 from slack_sdk.errors import SlackApiError
@@ -6,7 +7,7 @@ from slack_sdk.web.client import WebClient
 
 from kolga.hooks import hookimpl
 from kolga.plugins.base import PluginBase
-from kolga.utils.logger import logger
+from kolga.plugins.dispatcher import NotificationDispatcher
 
 from .messages import new_environment_message
 
@@ -22,11 +23,97 @@ class KolgaSlackPlugin(PluginBase):
     # Environment variables
     SLACK_TOKEN: str
     SLACK_CHANNEL: str
+    SLACK_API_URL: str = WebClient.BASE_URL
+    SLACK_DRAIN_TIMEOUT: float = 10.0
+
+    # Slack allows at most 50 blocks per message
+    MAX_BLOCKS = 50
+    # Notification text of messages not starting with a text block
+    DEFAULT_TITLE = "Kolga deployment"
 
     def __init__(self, env: Env) -> None:
         self.required_variables = [("SLACK_TOKEN", env.str), ("SLACK_CHANNEL", env.str)]
+        self.optional_variables = [
+            ("SLACK_API_URL", env.str),
+            ("SLACK_DRAIN_TIMEOUT", env.float),
+        ]
         self.configure(env)
-        self.client = WebClient(self.SLACK_TOKEN)
+        self.client = WebClient(self.SLACK_TOKEN, base_url=self.SLACK_API_URL)
+        self.dispatcher: NotificationDispatcher[List[Any]] = NotificationDispatcher(
+            send=self.send_messages, retry_delay=self.get_retry_delay
+        )
+
+    def send_messages(self, channel: str, messages: List[List[Any]]) -> None:
+        """
+        Post messages to a channel as a single message, separated by dividers
+        """
+        blocks: List[Any] = []
+        titles: List[str] = []
+        for message in messages:
+            if blocks and len(blocks) + len(message) < self.MAX_BLOCKS:
+                blocks.append({"type": "divider"})
+            elif blocks:
+                self._post_blocks(channel, blocks, titles)
+                blocks, titles = [], []
+            blocks.extend(message)
+            titles.append(self.get_title(message))
+        self._post_blocks(channel, blocks, titles)
+
+    @classmethod
+    def get_title(cls, message: List[Any]) -> str:
+        """
+        Get the text of the first block of a message, if it has one
+        """
+        first_block = message[0] if message else {}
+        text = first_block.get("text") if isinstance(first_block, dict) else None
+        if isinstance(text, dict) and text.get("text"):
+            return str(text["text"])
+        return cls.DEFAULT_TITLE
+
+    def _post_blocks(self, channel: str, blocks: List[Any], titles: List[str]) -> None:
+        self.client.chat_postMessage(
+            channel=channel,
+            blocks=blocks,
+            # Shown where blocks can not be, such as in notifications
+            text="\n".join(titles),
+            username="Kolga Deployment",
+            icon_emoji=":rocket:",
+        )
+
+    @staticmethod
+    def get_retry_delay(error: Exception, attempt: int) -> Optional[float]:
+        """
+        Get the seconds to wait before retrying a failed delivery
+
+        Rate limited requests are retried after the time requested by Slack,
+        server errors and transport failures, such as timeouts and reset
+        connections, with an exponential backoff.
+        """
+        if isinstance(error, HTTPError):
+            status_code = error.code
+            headers = {key.lower(): value for key, value in error.headers.items()}
+        elif isinstance(error, (URLError, TimeoutError, ConnectionError)):
+            return float(2**attempt)
+        elif isinstance(error, SlackApiError):
+            status_code = error.response.status_code
+            headers = {
+                key.lower(): value for key, value in error.response.headers.items()
+            }
+        else:
+            return None
+
+        if status_code == 429:
+            return float(headers.get("retry-after", 2**attempt))
+        if status_code >= 500:
+            return float(2**attempt)
+        return None
+
+    @hookimpl
+    def application_shutdown(self, exception: Optional[Exception]) -> Optional[bool]:
+        if not self.configured:
+            return None
+
+        return self.dispatcher.close(timeout=self.SLACK_DRAIN_TIMEOUT)
 
     @hookimpl
     def project_deployment_complete(
@@ -40,17 +127,6 @@ class KolgaSlackPlugin(PluginBase):
             return None
 
         deployment_message = new_environment_message(track, project)
-
-        try:
-            self.client.chat_postMessage(
-                channel=self.SLACK_CHANNEL,
-                blocks=deployment_message,
-                username="Kolga Deployment",
-                icon_emoji=":rocket:",
-            )
-        except SlackApiError as e:
-            logger.error(
-                message=f"Could not send slack message -> {e.response['error']}"
-            )
+        self.dispatcher.dispatch(self.SLACK_CHANNEL, deployment_message)
 
         return True
@@ -1,15 +1,95 @@
-from typing import Any, List, Optional, cast
+import json
+import threading
+from email.message import Message
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, cast
 from unittest import mock
+from urllib.error import HTTPError, URLError
 
+import pytest
 import slack_sdk
 
 from kolga.libs.project import Project
+from kolga.plugins.dispatcher import NotificationDispatcher
 from kolga.settings import settings
 from tests.testcase import load_plugin
 
 from ..slack import KolgaSlackPlugin
 
 
+class FakeSlack(ThreadingHTTPServer):
+    """
+    Local Slack Web API answering with the queued HTTP statuses
+    """
+
+    def __init__(self, statuses: List[int]) -> None:
+        super().__init__(("127.0.0.1", 0), FakeSlackHandler)
+        self.statuses = statuses
+        self.requests: List[Dict[str, Any]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/"
+
+
+class FakeSlackHandler(BaseHTTPRequestHandler):
+    server: FakeSlack
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append({"path": self.path, **json.loads(body)})
+
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        response: Dict[str, Any] = {"ok": status == 200}
+        if status == 429:
+            response["error"] = "ratelimited"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(json.dumps(response).encode())
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def fake_slack(request: pytest.FixtureRequest) -> Iterator[FakeSlack]:
+    statuses = getattr(request, "param", [])
+    server = FakeSlack(statuses=list(statuses))
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+
+    env = {
+        "SLACK_TOKEN": "test_token",
+        "SLACK_CHANNEL": "kolga-test",
+        "SLACK_API_URL": server.url,
+    }
+    with mock.patch.dict("os.environ", env):
+        yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def _deployment_complete(track: str = "review") -> Any:
+    return settings.plugin_manager.hook.project_deployment_complete(
+        exception=None,
+        namespace=track,
+        project=Project(track=track, url=f"{track}.example.com"),
+        track=track,
+    )
+
+
+def _shutdown() -> List[Optional[bool]]:
+    results = settings.plugin_manager.hook.application_shutdown(exception=None)
+    return cast(List[Optional[bool]], results)
+
+
 @mock.patch.dict(
     "os.environ",
     {
@@ -22,12 +102,90 @@ from ..slack import KolgaSlackPlugin
     slack_sdk.web.client.WebClient, "chat_postMessage", return_value=True
 )
 def test_project_deployment_complete(mock_post_message: Any) -> None:
-    results: Any = settings.plugin_manager.hook.project_deployment_complete(
-        exception=None,
-        namespace="review",
-        project=Project(track="review", url="test.example.com"),
-        track="review",
-    )
+    results: Any = _deployment_complete()
     results = cast(List[Optional[bool]], results)
     assert len(results) == 1 and results[0] is True
+
+    assert _shutdown() == [True]
     mock_post_message.assert_called_once()
+
+
+def test_notifications_batched(fake_slack: FakeSlack) -> None:
+    with load_plugin(KolgaSlackPlugin):
+        for track in ("review", "staging", "stable"):
+            _deployment_complete(track)
+        # Nothing is sent on the critical path of the deployment
+        assert not fake_slack.requests
+
+        assert _shutdown() == [True]
+
+    assert len(fake_slack.requests) == 1
+    request = fake_slack.requests[0]
+    assert request["path"] == "/api/chat.postMessage"
+    assert request["channel"] == "kolga-test"
+    assert [block["type"] for block in request["blocks"]].count("divider") == 2
+
+
+@pytest.mark.parametrize("fake_slack", [[429, 429]], indirect=True)
+def test_notifications_rate_limited(fake_slack: FakeSlack) -> None:
+    with load_plugin(KolgaSlackPlugin):
+        _deployment_complete()
+        assert _shutdown() == [True]
+
+    assert len(fake_slack.requests) == 3
+
+
+@pytest.mark.parametrize("fake_slack", [[400]], indirect=True)
+def test_notifications_failed(fake_slack: FakeSlack) -> None:
+    with load_plugin(KolgaSlackPlugin):
+        _deployment_complete()
+        assert _shutdown() == [False]
+
+    assert len(fake_slack.requests) == 1
+
+
+def test_dispatcher_drain_timeout() -> None:
+    released = threading.Event()
+
+    def send(channel: str, batch: List[str]) -> None:
+        released.wait()
+
+    dispatcher = NotificationDispatcher(send=send, batch_interval=0)
+    dispatcher.dispatch("channel", "message")
+
+    assert not dispatcher.close(timeout=0.1)
+    released.set()
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (URLError("Connection refused"), 4.0),
+        (TimeoutError("The read operation timed out"), 4.0),
+        (ConnectionResetError("Connection reset by peer"), 4.0),
+        (HTTPError("https://slack.com", 503, "Unavailable", Message(), None), 4.0),
+        (HTTPError("https://slack.com", 404, "Not Found", Message(), None), None),
+        (ValueError("Invalid message"), None),
+    ],
+)
+def test_get_retry_delay(error: Exception, expected: Optional[float]) -> None:
+    assert KolgaSlackPlugin.get_retry_delay(error, attempt=2) == expected
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        (
+            [{"type": "section", "text": {"type": "mrkdwn", "text": "Deployed"}}],
+            "Deployed",
+        ),
+        ([{"type": "divider"}], KolgaSlackPlugin.DEFAULT_TITLE),
+        (
+            [{"type": "image", "image_url": "", "alt_text": ""}],
+            KolgaSlackPlugin.DEFAULT_TITLE,
+        ),
+        ([], KolgaSlackPlugin.DEFAULT_TITLE),
+    ],
+)
+def test_get_title(message: List[Any], expected: str) -> None:
+    assert KolgaSlackPlugin.get_title(message) == expected
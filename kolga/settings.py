@@ -2,31 +2,18 @@ import json
 import os
 import sys
 import tempfile
+import time
 import uuid
-from itertools import chain
 from pathlib import Path
-from typing import (
-    TYPE_CHECKING,
-    Any,
-    Callable,
-    Dict,
-    Generator,
-    ItemsView,
-    List,
-    Optional,
-    Tuple,
-    Type,
-    Union,
-    cast,
-)
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, Union, cast
 
-from dotenv import dotenv_values
 from environs import Env
 from pydantic import BaseConfig, BaseSettings, Extra, Field
 
-from kolga.plugins import KOLGA_CORE_PLUGINS
+from kolga.plugins import KOLGA_CORE_PLUGINS, get_entry_point_manifests
 from kolga.plugins.base import PluginBase
 from kolga.plugins.exceptions import PluginMissingConfiguration
+from kolga.plugins.manifest import PluginManifest
 from kolga.plugins.pluginmanager import KolgaPluginManager
 from kolga.utils.exceptions import ImproperlyConfigured, NoClusterConfigError
 from kolga.utils.fields import (
@@ -34,7 +21,12 @@ from kolga.utils.fields import (
     split_comma_separated_values,
     unescape_string_values,
 )
-from kolga.utils.general import deep_get, env_var_safe_key, kubernetes_safe_name
+from kolga.utils.general import (
+    deep_get,
+    env_var_safe_key,
+    kubernetes_safe_name,
+    read_artifact_env_dir,
+)
 from kolga.utils.logger import logger
 
 if TYPE_CHECKING:
@@ -65,21 +57,15 @@ def source_ci_mapper(settings: BaseSettings) -> Dict[str, Any]:
 
 
 def read_artifact_envfiles() -> Dict[str, str]:
-    def env_files() -> Generator[Path, None, None]:
-        if build_artifacts := env.path("BUILD_ARTIFACT_FOLDER", None):
-            yield from build_artifacts.glob("*.env")
+    values: Dict[str, str] = {}
 
-        if service_artifacts := env.path("SERVICE_ARTIFACT_FOLDER", None):
-            yield from service_artifacts.glob("*.env")
+    if build_artifacts := env.path("BUILD_ARTIFACT_FOLDER", None):
+        values.update(read_artifact_env_dir(build_artifacts))
 
-    def load_env_files() -> Generator[Dict[str, str], None, None]:
-        for env_file in env_files():
-            d = dotenv_values(env_file, interpolate=False)
-            yield {k: v for k, v in d.items() if v is not None}
+    if service_artifacts := env.path("SERVICE_ARTIFACT_FOLDER", None):
+        values.update(read_artifact_env_dir(service_artifacts))
 
-    # Merge dicts
-    dict_items = cast(Callable[[Dict[str, str]], ItemsView[str, str]], dict.items)
-    return dict(chain.from_iterable(map(dict_items, load_env_files())))
+    return values
 
 
 class ProjectNameSetting(BaseSettings):
@@ -106,9 +92,19 @@ class SettingsValues(BaseSettings):
     APP_INITIALIZE_COMMAND: str = ""
     APP_MIGRATE_COMMAND: str = ""
     BUILD_ARTIFACT_FOLDER: str = ""
+    BUILDKIT_BUILDER_ENDPOINT: str = ""
+    BUILDKIT_BUILDER_KEEP_STATE: bool = True
+    BUILDKIT_BUILDER_NAME: str = "kolgabk"
+    BUILDKIT_CACHE_BRANCH_EXPORT_MODE: str = ""
     BUILDKIT_CACHE_DISABLE: bool = False
+    BUILDKIT_CACHE_EXPORT_MODE: str = "max"
     BUILDKIT_CACHE_IMAGE_NAME: str = "cache"
+    BUILDKIT_CACHE_PRUNE_KEEP_STORAGE: str = ""
+    BUILDKIT_CACHE_PRUNE_UNTIL: str = ""
     BUILDKIT_CACHE_REPO: str = ""
+    BUILDKIT_CACHE_SHARED_EXPORT: bool = True
+    BUILDKIT_GC_KEEP_STORAGE: str = ""
+    BUILDKIT_PLATFORM_NODES: List[str] = []
     BUILT_DOCKER_TEST_IMAGE: str = ""
     CONTAINER_REGISTRY: str = ""
     CONTAINER_REGISTRY_PASSWORD: str = ""
@@ -116,22 +112,30 @@ class SettingsValues(BaseSettings):
     CONTAINER_REGISTRY_USER: str = ""
     DATABASE_DB: str = "appdb"
     DATABASE_PASSWORD: str = Field(default_factory=lambda: f"{uuid.uuid4()}")
+    DATABASE_SHARED_SERVER: bool = False
+    DATABASE_SHARED_SERVER_NAMESPACE: str = "kolga-shared-databases"
     DATABASE_USER: str = "user"
     DEFAULT_TRACK: str = "stable"
     DEPENDS_ON_PROJECTS: str = ""
+    DEPLOY_JOURNAL: str = ""
     DOCKER_BUILD_ARG_PREFIX: str = "DOCKER_BUILD_ARG_"
     DOCKER_BUILD_CONTEXT: str = "."
+    DOCKER_BUILD_CONTEXT_ANALYZE: bool = False
+    DOCKER_BUILD_CONTEXT_MINIMIZE: bool = False
     DOCKER_BUILD_PLATFORMS: Optional[List[str]] = None
     DOCKER_BUILD_SOURCE: str = "Dockerfile"
     DOCKER_HOST: str = ""
     DOCKER_IMAGE_NAME: str = ""
     DOCKER_IMAGE_TAGS: Optional[List[str]] = None
+    DOCKER_PULL_CONCURRENCY: int = 4
     DOCKER_TEST_IMAGE_STAGE: str = "development"
     ENVIRONMENT_SLUG: str = ""
     ENVIRONMENT_URL: str = ""
     GIT_COMMIT_REF_NAME: str = ""
     GIT_COMMIT_SHA: str = ""
     GIT_DEFAULT_TARGET_BRANCH: str = "master"
+    GIT_SUBMODULE_FILTER: str = ""
+    GIT_SUBMODULE_REFERENCE_CACHE: str = ""
     GIT_TARGET_BRANCH: str = ""
     HELM_BUFFER_TIME: int = 120
     JOB_ACTOR: str = ""
@@ -141,6 +145,8 @@ class SettingsValues(BaseSettings):
     K8S_ADDITIONAL_HOSTNAMES: List[str] = []
     K8S_CERTMANAGER_USE_OLD_API: bool = False
     K8S_CLUSTER_ISSUER: str = ""
+    K8S_CLUSTER_METADATA_CACHE: str = ""
+    K8S_CLUSTER_METADATA_CACHE_TTL: int = 300
     K8S_FILE_SECRET_MOUNTPATH: str = "/tmp/secrets"  # nosec
     K8S_FILE_SECRET_PREFIX: str = "K8S_FILE_SECRET_"
     K8S_HPA_ENABLED: bool = False
@@ -161,6 +167,7 @@ class SettingsValues(BaseSettings):
     K8S_LIMIT_RAM: str = ""
     K8S_LIVENESS_FILE: str = ""
     K8S_LIVENESS_PATH: str = "/healthz"
+    K8S_METRICS_PROMETHEUS_URL: str = ""
     K8S_MONITORING_ENABLED: bool = False
     K8S_MONITORING_NAMESPACE: str = "monitoring"
     K8S_MONITORING_PATH: str = "/metrics"
@@ -184,8 +191,17 @@ class SettingsValues(BaseSettings):
     K8S_REQUEST_RAM: str = "128Mi"
     K8S_SECRET_PREFIX: str = "K8S_SECRET_"
     K8S_TEMP_STORAGE_PATH: str = ""
+    KOLGA_COMMAND_RETRY_ATTEMPTS: int = 3
+    KOLGA_COMMAND_RETRY_BUDGET: float = 300.0
+    KOLGA_COMMAND_RETRY_DELAY: float = 2.0
+    KOLGA_COMMAND_RETRY_MAX_DELAY: float = 30.0
     KOLGA_DEBUG: bool = False
     KOLGA_JOBS_ONLY: bool = False
+    KOLGA_LOG_BUFFER_SIZE: int = 65536
+    KOLGA_LOG_FLUSH_INTERVAL: float = 0.2
+    KOLGA_LOG_FORMAT: str = "text"
+    KOLGA_LOG_OUTPUT_HEAD_LINES: int = 50
+    KOLGA_LOG_OUTPUT_TAIL_LINES: int = 150
     KUBECONFIG: str = ""
     MYSQL_VERSION_TAG: str = "5.7"
     POSTGRES_IMAGE: str = "docker.io/bitnami/postgresql:9.6"
@@ -200,6 +216,8 @@ class SettingsValues(BaseSettings):
     RABBITMQ_VERSION_TAG: str = "3.8.5"
     SERVICE_ARTIFACT_FOLDER: str = ""
     SERVICE_PORT: int = 8000
+    SERVICE_WARM_POOL_NAMESPACE: str = "kolga-warm-pool"
+    SERVICE_WARM_POOL_SIZE: int = 0
     TRACK: str = ""
     VAULT_ADDR: str = ""
     VAULT_JWT_AUTH_PATH: str = "jwt"
@@ -215,6 +233,7 @@ class SettingsValues(BaseSettings):
 class Settings(SettingsValues):
     _active_ci: Optional["BaseCI"]
     _devops_root_path: Path
+    _plugin_load_times: Dict[str, float]
     _plugin_manager: KolgaPluginManager
 
     @property
@@ -233,6 +252,15 @@ class Settings(SettingsValues):
             self._devops_root_path = Path(sys.argv[0]).resolve().parent
         return self._devops_root_path
 
+    @property
+    def plugin_load_times(self) -> Dict[str, float]:
+        """
+        Seconds taken to import and set up each loaded plugin
+        """
+        if not hasattr(self, "_plugin_load_times"):
+            self._plugin_load_times = {}
+        return self._plugin_load_times
+
     @property
     def plugin_manager(self) -> KolgaPluginManager:
         if not hasattr(self, "_plugin_manager"):
@@ -263,10 +291,23 @@ class Settings(SettingsValues):
         return pm
 
     def load_plugins(self) -> None:
+        """
+        Load the core plugins and the plugins registered through entry points
+
+        Plugins whose required variables are not set are skipped without
+        importing them. The time taken to import and set up each plugin is
+        recorded in ``plugin_load_times``.
+        """
         loading_plugins = False
 
-        for plugin in KOLGA_CORE_PLUGINS:
-            plugin_loaded, message = self._load_plugin(plugin)
+        for manifest in [*KOLGA_CORE_PLUGINS, *get_entry_point_manifests()]:
+            if not manifest.is_configured():
+                continue
+
+            started = time.monotonic()
+            plugin_loaded, message = self._load_plugin_manifest(manifest)
+            self.plugin_load_times[manifest.name] = time.monotonic() - started
+
             if not loading_plugins and plugin_loaded:
                 logger.info(
                     icon="🔌",
@@ -274,9 +315,27 @@ class Settings(SettingsValues):
                 )
                 loading_plugins = True
             if plugin_loaded:
-                logger.info(f"\t{plugin.verbose_name}: {message}")
+                duration_ms = self.plugin_load_times[manifest.name] * 1000
+                logger.info(
+                    f"\t{manifest.verbose_name or manifest.name}: {message}"
+                    f" ({duration_ms:.0f} ms)"
+                )
             # TODO: Implement verbose logging where the plugin loading error would be shown
 
+    def _load_plugin_manifest(self, manifest: PluginManifest) -> Tuple[bool, str]:
+        try:
+            plugin = manifest.load()
+        except ImportError as e:
+            return False, f"⚠️  {e}"
+
+        implemented = PluginManifest.get_implemented_hooks(plugin)
+        if manifest.hooks and implemented != set(manifest.hooks):
+            logger.debug(
+                f"Hooks of plugin {manifest.name} do not match its manifest: "
+                f"{sorted(implemented ^ set(manifest.hooks))}"
+            )
+        return self._load_plugin(plugin)
+
     def _load_plugin(self, plugin: Type[PluginBase]) -> Tuple[bool, str]:
         try:
             self.plugin_manager.register(plugin(env), name=plugin.name)
@@ -613,3 +672,11 @@ class GitHubActionsMapper(BaseCI):
 
 
 settings = Settings()
+logger.configure(
+    debug=settings.KOLGA_DEBUG,
+    log_format=settings.KOLGA_LOG_FORMAT,
+    buffer_size=settings.KOLGA_LOG_BUFFER_SIZE,
+    flush_interval=settings.KOLGA_LOG_FLUSH_INTERVAL,
+    output_head_lines=settings.KOLGA_LOG_OUTPUT_HEAD_LINES,
+    output_tail_lines=settings.KOLGA_LOG_OUTPUT_TAIL_LINES,
+)
@@ -0,0 +1,246 @@
+import os
+import posixpath
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+from kolga.utils.models import BuildContextReport
+
+DOCKERIGNORE_FILENAME = ".dockerignore"
+
+
+def _pattern_to_regex(pattern: str) -> Pattern[str]:
+    """
+    Convert a ``.dockerignore`` pattern into a regular expression
+
+    ``*`` and ``?`` do not match path separators, ``**`` matches any number
+    of directories, including none.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 2
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 1
+        elif char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            regex += f"[{pattern[i + 1 : end].replace('/', '')}]"
+            i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile(f"^{regex}$")
+
+
+def _clean_pattern(pattern: str) -> str:
+    return posixpath.normpath(pattern.strip()).lstrip("/")
+
+
+def _parent_paths(path: str) -> Iterable[str]:
+    """
+    Yield the path and each of its parent directories, shortest first
+    """
+    parts = path.split("/")
+    for i in range(1, len(parts) + 1):
+        yield "/".join(parts[:i])
+
+
+class DockerIgnore:
+    """
+    Matcher of the paths left out of a build context by a ``.dockerignore``
+
+    Follows the semantics of BuildKit: patterns are matched against the path
+    and all of its parent directories, the last matching pattern wins and
+    patterns prefixed with ``!`` add paths back to the context.
+
+    Args:
+        patterns: Lines of the ``.dockerignore`` file
+    """
+
+    def __init__(self, patterns: List[str]) -> None:
+        self.patterns: List[Tuple[bool, Pattern[str]]] = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+
+            exclusion = pattern.startswith("!")
+            pattern = _clean_pattern(pattern[1:] if exclusion else pattern)
+            if pattern and pattern != ".":
+                self.patterns.append((exclusion, _pattern_to_regex(pattern)))
+
+        self.has_exclusions = any(exclusion for exclusion, _ in self.patterns)
+
+    @classmethod
+    def from_context(
+        cls, context: Path, dockerfile: Optional[Path] = None
+    ) -> "DockerIgnore":
+        """
+        Read the ignore file of a build context
+
+        Like BuildKit, an ignore file named after the Dockerfile, such as
+        ``Dockerfile.dockerignore``, is preferred over ``.dockerignore``.
+        """
+        candidates = [context / DOCKERIGNORE_FILENAME]
+        if dockerfile:
+            candidates.insert(
+                0, dockerfile.with_name(f"{dockerfile.name}.dockerignore")
+            )
+
+        for path in candidates:
+            if path.is_file():
+                return cls(path.read_text(encoding="UTF-8").splitlines())
+        return cls([])
+
+    def is_ignored(self, path: str) -> bool:
+        """
+        Check if a path, relative to the context, is left out of it
+        """
+        ignored = False
+        for exclusion, regex in self.patterns:
+            # Only patterns that could change the outcome are evaluated
+            if exclusion != ignored:
+                continue
+            if any(regex.match(parent) for parent in _parent_paths(path)):
+                ignored = not exclusion
+        return ignored
+
+
+def _get_source_matcher(sources: List[str]) -> Optional[List[Pattern[str]]]:
+    """
+    Get patterns of the context paths read by the Dockerfile
+
+    Returns:
+        None if the whole context is read
+    """
+    patterns = []
+    for source in sources:
+        source = _clean_pattern(source)
+        if not source or source == ".":
+            return None
+        patterns.append(_pattern_to_regex(source))
+    return patterns
+
+
+def _get_largest(sizes: Dict[str, int], top: int) -> List[Tuple[str, int]]:
+    return sorted(sizes.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+
+def analyze_build_context(
+    context: Path,
+    sources: List[str],
+    dockerfile: Optional[Path] = None,
+    top: int = 10,
+) -> BuildContextReport:
+    """
+    Walk a build context the way BuildKit sends it and report its size
+
+    Files of the context are cross-referenced with the ``sources`` read by
+    the Dockerfile, so that content sent to BuildKit for nothing can be
+    pointed out.
+
+    Args:
+        context: Path of the build context
+        sources: Context paths and patterns read by ``ADD``, ``COPY`` and
+            ``RUN --mount`` instructions of the Dockerfile
+        dockerfile: Path of the Dockerfile
+        top: Number of largest paths to report
+
+    Returns:
+        Report of the build context
+    """
+    ignore = DockerIgnore.from_context(context, dockerfile)
+    source_patterns = _get_source_matcher(sources)
+
+    always_used = {DOCKERIGNORE_FILENAME}
+    if dockerfile and context in dockerfile.absolute().parents:
+        always_used.add(dockerfile.absolute().relative_to(context).as_posix())
+
+    report = BuildContextReport(path=str(context))
+    sizes: Dict[str, int] = {}
+    unused_sizes: Dict[str, int] = {}
+
+    for root, dirs, files in os.walk(context):
+        relative_root = Path(root).relative_to(context).as_posix()
+        prefix = "" if relative_root == "." else f"{relative_root}/"
+
+        # Symbolic links to directories are sent as links, like files
+        links = [d for d in dirs if os.path.islink(os.path.join(root, d))]
+        dirs[:] = [d for d in dirs if d not in links]
+        files = [*files, *links]
+
+        # Ignored directories can be skipped unless a pattern adds paths back
+        if not ignore.has_exclusions:
+            dirs[:] = [d for d in dirs if not ignore.is_ignored(f"{prefix}{d}")]
+        dirs.sort()
+
+        for name in sorted(files):
+            path = f"{prefix}{name}"
+            if ignore.is_ignored(path):
+                continue
+
+            try:
+                size = os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+
+            top_level = path.split("/", 1)[0]
+            report.total_bytes += size
+            report.file_count += 1
+            sizes[top_level] = sizes.get(top_level, 0) + size
+
+            used = (
+                source_patterns is None
+                or path in always_used
+                or any(
+                    pattern.match(parent)
+                    for pattern in source_patterns
+                    for parent in _parent_paths(path)
+                )
+            )
+            if used:
+                report.used_files.append(path)
+            else:
+                report.unused_bytes += size
+                unused_sizes[top_level] = unused_sizes.get(top_level, 0) + size
+
+    report.largest_paths = _get_largest(sizes, top)
+    report.unused_paths = _get_largest(unused_sizes, top)
+    return report
+
+
+def create_minimal_context(context: Path, files: List[str], destination: Path) -> None:
+    """
+    Create a build context holding only the given files of another context
+
+    Files are hard linked when possible and copied otherwise. Symbolic links
+    are recreated as they are.
+
+    Args:
+        context: Path of the original build context
+        files: Paths of the files to include, relative to ``context``
+        destination: Path of the directory to create the context in
+    """
+    for path in files:
+        source = context / path
+        target = destination / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not source.is_symlink():
+            try:
+                os.link(source, target)
+                continue
+            except OSError:
+                pass
+        shutil.copy2(source, target, follow_symlinks=False)
@@ -0,0 +1,218 @@
+import json
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from kolga.utils.models import Dockerfile, DockerfileStage
+
+DEFAULT_ESCAPE = "\\"
+
+PARSER_DIRECTIVE_REGEX = re.compile(r"^#\s*(?P<name>[a-z]+)\s*=\s*(?P<value>\S+)\s*$")
+REMOTE_SOURCE_REGEX = re.compile(r"^(?:[a-z][a-z0-9+.-]*://|git@)", re.IGNORECASE)
+VARIABLE_REGEX = re.compile(
+    r"\$(?:(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)(?::(?P<modifier>[-+])(?P<word>[^}]*))?\})"
+)
+
+
+def _get_escape_character(lines: List[str]) -> str:
+    # Parser directives are only recognized before any other line
+    for line in lines:
+        match = PARSER_DIRECTIVE_REGEX.match(line.strip())
+        if not match:
+            break
+        if match.group("name").lower() == "escape":
+            return match.group("value")
+    return DEFAULT_ESCAPE
+
+
+def _get_instructions(content: str) -> List[Tuple[str, str]]:
+    """
+    Split Dockerfile content into instructions and their arguments
+
+    Line continuations are joined and comments are dropped, also from
+    within continued instructions.
+    """
+    lines = content.splitlines()
+    escape = _get_escape_character(lines)
+
+    instructions: List[Tuple[str, str]] = []
+    current: List[str] = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+
+        if stripped.endswith(escape):
+            current.append(stripped[: -len(escape)])
+            continue
+
+        current.append(stripped)
+        instruction, _, arguments = " ".join(current).strip().partition(" ")
+        instructions.append((instruction.upper(), arguments.strip()))
+        current = []
+
+    if current:
+        instruction, _, arguments = " ".join(current).strip().partition(" ")
+        instructions.append((instruction.upper(), arguments.strip()))
+    return instructions
+
+
+def _parse_args(
+    arguments: str,
+    declared: Mapping[str, Optional[str]],
+    build_args: Mapping[str, str],
+) -> Dict[str, Optional[str]]:
+    # Defaults may refer to earlier arguments, which are substituted right away
+    args: Dict[str, Optional[str]] = {}
+    for declaration in arguments.split():
+        name, separator, default = declaration.partition("=")
+        variables = {**declared, **args, **build_args}
+        args[name] = (
+            substitute_variables(default.strip("\"'"), variables) if separator else None
+        )
+    return args
+
+
+def _split_flags(arguments: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    flags: List[Tuple[str, str]] = []
+    words = arguments.split()
+    while words and words[0].startswith("--"):
+        name, _, value = words.pop(0)[2:].partition("=")
+        flags.append((name.lower(), value))
+    return flags, words
+
+
+def _parse_mount(value: str) -> Dict[str, str]:
+    mount = {}
+    for option in value.split(","):
+        key, _, option_value = option.partition("=")
+        mount[key.strip().lower()] = option_value.strip()
+    return mount
+
+
+def _get_copy_sources(arguments: str) -> List[str]:
+    """
+    Get the build context sources of ``ADD`` and ``COPY`` arguments
+
+    Remote sources and here-documents are not read from the build context and
+    are left out.
+    """
+    words: List[str]
+    if arguments.startswith("["):
+        try:
+            words = [str(word) for word in json.loads(arguments)]
+        except ValueError:
+            words = arguments.split()
+    else:
+        words = arguments.split()
+
+    return [
+        source
+        for source in words[:-1]
+        if not source.startswith("<<") and not REMOTE_SOURCE_REGEX.match(source)
+    ]
+
+
+def substitute_variables(value: str, variables: Mapping[str, Optional[str]]) -> str:
+    """
+    Substitute ``$VAR`` and ``${VAR}`` references the way Docker does
+
+    The ``${VAR:-default}`` and ``${VAR:+alternative}`` forms are supported.
+    Variables without a value are replaced with an empty string.
+    """
+
+    def replace(match: "re.Match[str]") -> str:
+        name = match.group("name") or match.group("braced")
+        current = variables.get(name) or ""
+        modifier = match.group("modifier")
+        if modifier == "-":
+            return current or match.group("word")
+        if modifier == "+":
+            return match.group("word") if current else ""
+        return current
+
+    return VARIABLE_REGEX.sub(replace, value)
+
+
+def parse_dockerfile(
+    content: str, build_args: Optional[Mapping[str, str]] = None
+) -> Dockerfile:
+    """
+    Parse the stages of a Dockerfile and the dependencies between them
+
+    Args:
+        content: Content of the Dockerfile
+        build_args: Build arguments given to the build, used for resolving
+            arguments referenced in ``FROM`` instructions
+
+    Returns:
+        Model of the Dockerfile
+    """
+    build_args = build_args or {}
+    dockerfile = Dockerfile()
+
+    for instruction, arguments in _get_instructions(content):
+        stage = dockerfile.stages[-1] if dockerfile.stages else None
+
+        if instruction == "ARG":
+            if stage is None:
+                args = _parse_args(arguments, dockerfile.args, build_args)
+                dockerfile.args.update(args)
+            else:
+                declared = {**dockerfile.args, **stage.args}
+                stage.args.update(_parse_args(arguments, declared, build_args))
+
+        elif instruction == "FROM":
+            flags, words = _split_flags(arguments)
+            if not words:
+                continue
+
+            variables = {**dockerfile.args, **build_args}
+            image = substitute_variables(words[0], variables)
+            name = words[2] if len(words) > 2 and words[1].upper() == "AS" else ""
+
+            parent = dockerfile.get_stage(image) if not image.isdigit() else None
+            dockerfile.stages.append(
+                DockerfileStage(
+                    index=len(dockerfile.stages),
+                    name=name,
+                    image=image,
+                    platform=substitute_variables(
+                        dict(flags).get("platform", ""), variables
+                    ),
+                    parent=parent.index if parent else None,
+                )
+            )
+
+        elif stage is not None and instruction in ("ADD", "COPY", "RUN"):
+            flags, words = _split_flags(arguments)
+            references = [value for name, value in flags if name == "from"]
+            mounts = [_parse_mount(value) for name, value in flags if name == "mount"]
+            # RUN --mount=type=bind,from=<stage> depends on the stage as well
+            references += [mount["from"] for mount in mounts if "from" in mount]
+
+            for reference in references:
+                source = dockerfile.get_stage(reference)
+                if (
+                    source
+                    and source.index != stage.index
+                    and source.index not in stage.copy_from
+                ):
+                    stage.copy_from.append(source.index)
+
+            variables = {**dockerfile.args, **stage.args, **build_args}
+            if instruction == "RUN":
+                sources = [
+                    mount.get("source", mount.get("src", "."))
+                    for mount in mounts
+                    if mount.get("type", "bind") == "bind" and "from" not in mount
+                ]
+            elif not references:
+                sources = _get_copy_sources(" ".join(words))
+            else:
+                sources = []
+            stage.context_sources.extend(
+                substitute_variables(source, variables) for source in sources
+            )
+
+    return dockerfile
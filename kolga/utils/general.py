@@ -2,15 +2,24 @@ import json
 import os
 import re
 import subprocess
+import tempfile
+import threading
+import time
 from datetime import datetime, timezone
 from functools import reduce
 from hashlib import sha256
+from io import StringIO
 from pathlib import Path
 from shlex import quote
-from typing import Any, Dict, List, Mapping, Optional, Union
+from typing import IO, Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import yaml
+from dotenv import dotenv_values
 
 from kolga.utils.exceptions import ImproperlyConfigured
+from kolga.utils.log_artifacts import LogArtifact
 from kolga.utils.models import SubprocessResult
+from kolga.utils.retry import get_retry_delay, get_retry_reason
 
 AMQP = "amqp"
 MYSQL = "mysql"
@@ -23,6 +32,8 @@ DATABASE_DEFAULT_PORT_MAPPING = {
     POSTGRES: 5432,
 }
 
+ARTIFACT_INDEX_FILENAME = ".artifact-index.json"
+
 BUILT_DOCKER_TEST_IMAGE = "BUILT_DOCKER_TEST_IMAGE"
 
 DEPLOY_NAME_MAX_ENV_SLUG_LENGTH = 30
@@ -30,6 +41,11 @@ DEPLOY_NAME_MAX_HELM_NAME_LENGTH = 53
 DEPLOY_NAME_MAX_TRACK_LENGTH = 10
 CN_MAX_LENGTH = 64
 
+KUBERNETES_LABEL_DATETIME_FORMAT = "%Y-%m-%d_%H-%M-%S.%fZ"
+
+# Use the libyaml based dumper when PyYAML has been built with it
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def get_project_secret_var(project_name: str, value: str = "") -> str:
     from kolga.settings import settings
@@ -65,12 +81,121 @@ def create_artifact_file_from_dict(
         for key, value in data.items():
             f.write(f"{key}={value}\n")
 
+    update_artifact_index(env_file)
     return env_file  # type: ignore
 
 
+def parse_env_file_content(content: bytes) -> Dict[str, str]:
+    values = dotenv_values(stream=StringIO(content.decode("utf-8")), interpolate=False)
+    return {key: value for key, value in values.items() if value is not None}
+
+
+def update_artifact_index(env_file: Path) -> None:
+    """
+    Bring the artifact index of the directory of a dotenv file up to date
+    """
+    read_artifact_env_dir(env_file.parent)
+
+
+def list_artifact_env_files(env_dir: Path) -> Dict[str, List[int]]:
+    """
+    List the artifact dotenv files in a directory with their modification
+    times and sizes
+    """
+    listing: Dict[str, List[int]] = {}
+    try:
+        entries = list(os.scandir(env_dir))
+    except OSError:
+        return listing
+
+    for entry in entries:
+        if entry.name.endswith(".env") and entry.is_file():
+            stat = entry.stat()
+            listing[entry.name] = [stat.st_mtime_ns, stat.st_size]
+    return listing
+
+
+def read_artifact_index(env_dir: Path) -> Dict[str, Any]:
+    """
+    Read the artifact index of a directory, or an empty one if it is missing
+    or can not be read
+    """
+    try:
+        index: Dict[str, Any] = json.loads(
+            (env_dir / ARTIFACT_INDEX_FILENAME).read_text()
+        )
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def write_artifact_index(env_dir: Path, index: Dict[str, Any]) -> None:
+    """
+    Replace the artifact index of a directory
+
+    The index is written to a temporary file first, so that concurrent readers
+    never see a partially written index.
+    """
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=env_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, sort_keys=True)
+        os.replace(temp_path, env_dir / ARTIFACT_INDEX_FILENAME)
+    except OSError:
+        # The index is only a cache, values are parsed again without it
+        pass
+
+
+def read_artifact_env_dir(env_dir: Path) -> Dict[str, str]:
+    """
+    Read the values of the artifact dotenv files in a directory
+
+    The merged values of all dotenv files are kept in an index next to them,
+    along with the modification time and size of every file they were parsed
+    from. As long as the listed files match the index, its values are used as
+    they are. Otherwise only the files that are new or have changed are
+    parsed, and the index is rewritten.
+    """
+    listing = list_artifact_env_files(env_dir)
+    index = read_artifact_index(env_dir)
+    indexed: Dict[str, Any] = index.get("files", {})
+
+    stats = {name: entry["stat"] for name, entry in indexed.items()}
+    if "values" in index and stats == listing:
+        values: Dict[str, str] = index["values"]
+        return values
+
+    files = {}
+    values = {}
+    for name, stat in sorted(listing.items()):
+        entry = indexed.get(name)
+        if not entry or entry["stat"] != stat:
+            content = (env_dir / name).read_bytes()
+            entry = {"stat": stat, "values": parse_env_file_content(content)}
+        files[name] = entry
+        values.update(entry["values"])
+
+    write_artifact_index(env_dir, {"files": files, "values": values})
+    return values
+
+
 def current_datetime_kubernetes_label_safe() -> str:
     utcnow = datetime.now(timezone.utc)
-    return utcnow.strftime("%Y-%m-%d_%H-%M-%S.%fZ")
+    return utcnow.strftime(KUBERNETES_LABEL_DATETIME_FORMAT)
+
+
+def parse_kubernetes_label_datetime(value: str) -> Optional[datetime]:
+    """
+    Parse a timestamp made by :func:`current_datetime_kubernetes_label_safe`
+
+    Returns:
+        The timestamp in UTC, or None if the value is not such a timestamp
+    """
+    try:
+        parsed = datetime.strptime(value, KUBERNETES_LABEL_DATETIME_FORMAT)
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc)
 
 
 def env_var_safe_key(key: str) -> str:
@@ -184,27 +309,215 @@ def get_environment_vars_by_prefix(prefix: str) -> Dict[str, str]:
     return get_and_strip_prefixed_items(env_vars, prefix)
 
 
-def run_os_command(command_list: List[str], shell: bool = False) -> SubprocessResult:
+def _run_streamed(
+    command: Union[str, Sequence[str]],
+    shell: bool,
+    artifact: LogArtifact,
+    input: Optional[str] = None,
+) -> Tuple[str, str, int, "subprocess.Popen[str]"]:
+    """
+    Run a command, writing its output to a log artifact while it runs
+    """
+    outputs: Dict[str, str] = {}
+
+    def read(name: str, stream: Optional[IO[str]]) -> None:
+        lines = []
+        for line in stream or []:
+            lines.append(line)
+            artifact.write(line)
+        outputs[name] = "".join(lines)
+
+    with artifact, subprocess.Popen(  # nosec
+        command,
+        encoding="UTF-8",
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        shell=shell,
+    ) as child:
+        readers = [
+            threading.Thread(target=read, args=("out", child.stdout)),
+            threading.Thread(target=read, args=("err", child.stderr)),
+        ]
+        for reader in readers:
+            reader.start()
+        if child.stdin is not None:
+            # Written after starting the readers so that a command filling up
+            # its output pipes while reading its input can not block
+            child.stdin.write(input or "")
+            child.stdin.close()
+        for reader in readers:
+            reader.join()
+        return_code = child.wait()
+
+    return outputs["out"], outputs["err"], return_code, child
+
+
+def _run_os_command_once(
+    command_list: List[str],
+    shell: bool = False,
+    log_artifact: str = "",
+    input: Optional[str] = None,
+) -> SubprocessResult:
+    from kolga.settings import settings
     from kolga.utils.logger import logger
 
     command = command_list if not shell else " ".join(map(quote, command_list))
-
-    result = subprocess.run(  # nosec
-        command, encoding="UTF-8", capture_output=True, shell=shell
+    artifact = (
+        LogArtifact.create(settings.BUILD_ARTIFACT_FOLDER, log_artifact)
+        if log_artifact
+        else None
     )
 
+    child: Any
+    if artifact:
+        out, err, return_code, child = _run_streamed(command, shell, artifact, input)
+    else:
+        child = subprocess.run(  # nosec
+            command, encoding="UTF-8", capture_output=True, shell=shell, input=input
+        )
+        out, err, return_code = child.stdout, child.stderr, child.returncode
+
     string_command = command if isinstance(command, str) else " ".join(command)
     subprocess_result = SubprocessResult(
-        out=result.stdout,
-        err=result.stderr,
-        return_code=result.returncode,
-        child=result,
+        out=out,
+        err=err,
+        return_code=return_code,
+        child=child,
         command=string_command,
+        log_file=str(artifact.path) if artifact else "",
     )
     logger.debug_std(subprocess_result)
     return subprocess_result
 
 
+def run_os_command(
+    command_list: List[str],
+    shell: bool = False,
+    log_artifact: str = "",
+    input: Optional[str] = None,
+    retry: bool = False,
+) -> SubprocessResult:
+    """
+    Run a command and capture its output
+
+    With ``retry``, failures that the classifier of the tool deems transient,
+    such as network errors or overloaded registries, are retried with
+    exponential backoff. Only commands that are safe to run again, such as
+    pulls and reads, should be retried.
+    At most ``KOLGA_COMMAND_RETRY_ATTEMPTS`` attempts are made, and retrying
+    stops once ``KOLGA_COMMAND_RETRY_BUDGET`` seconds would be exceeded.
+    Every retry is reported to plugins with the ``command_retry`` hook.
+
+    Args:
+        command_list: Command and its arguments
+        shell: If True, run the command through the shell
+        log_artifact: If set, the full output is also streamed to a compressed
+            log file with this name in ``BUILD_ARTIFACT_FOLDER``. The output
+            of retries goes to files suffixed with the number of the attempt.
+        input: Data written to the standard input of the command
+        retry: Retry transient failures, the command has to be idempotent
+    """
+    from kolga.settings import settings
+    from kolga.utils.logger import logger
+
+    started = time.monotonic()
+    attempt = 1
+    while True:
+        attempt_started = time.monotonic()
+        attempt_log_artifact = log_artifact
+        if log_artifact and attempt > 1:
+            attempt_log_artifact = f"{log_artifact}-attempt-{attempt}"
+        result = _run_os_command_once(command_list, shell, attempt_log_artifact, input)
+        if not retry or attempt >= settings.KOLGA_COMMAND_RETRY_ATTEMPTS:
+            break
+
+        reason = get_retry_reason(command_list, result)
+        if reason is None:
+            break
+
+        delay = get_retry_delay(
+            attempt,
+            base_delay=settings.KOLGA_COMMAND_RETRY_DELAY,
+            max_delay=settings.KOLGA_COMMAND_RETRY_MAX_DELAY,
+        )
+        elapsed = time.monotonic() - started
+        if elapsed + delay > settings.KOLGA_COMMAND_RETRY_BUDGET:
+            break
+
+        logger.warning(
+            icon="🔁",
+            message=(
+                f"{command_list[0]} failed with '{reason}', retrying in "
+                f"{delay:.1f}s (attempt {attempt + 1}/"
+                f"{settings.KOLGA_COMMAND_RETRY_ATTEMPTS})"
+            ),
+        )
+        settings.plugin_manager.hook.command_retry(
+            command=result.command,
+            attempt=attempt,
+            delay=delay,
+            elapsed=elapsed,
+            reason=reason,
+        )
+        time.sleep(delay)
+        attempt += 1
+
+    result.attempts = attempt
+    # Time spent on the failed attempts and waiting between them
+    result.retry_seconds = attempt_started - started
+    return result
+
+
+def format_bytes(size: float) -> str:
+    """
+    Format a number of bytes to a human readable string
+
+    Example:
+        1536 --> 1.5 KiB
+
+    Args:
+        size: Number of bytes
+
+    Returns:
+        The size in the largest binary unit where it is at least one
+    """
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TiB"
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+def parse_size(size: str) -> int:
+    """
+    Parse a size printed by Docker to a number of bytes
+
+    Both decimal (kB, MB, ...) and binary (KiB, MiB, ...) units are supported.
+
+    Example:
+        1.5kB --> 1500
+
+    Args:
+        size: Size with an optional unit
+
+    Returns:
+        The size in bytes
+    """
+    match = re.fullmatch(
+        r"(?P<value>[0-9.]+)\s*(?P<unit>[kmgtp]?i?)b?", size.strip(), re.IGNORECASE
+    )
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+
+    unit = match.group("unit").upper()
+    base = 1024 if unit.endswith("I") else 1000
+    exponent = "KMGTP".find(unit[:1]) + 1 if unit else 0
+    return int(float(match.group("value")) * base**exponent)
+
+
 def limit_url_length(url: str) -> str:
     """
     Certificate's common name field (CN) can have max 64 characters.
@@ -233,27 +546,14 @@ def validate_file_secret_path(path: Path, valid_prefixes: List[str]) -> bool:
     )
 
 
-def string_to_yaml(string: str, indentation: int = 0, strip: bool = True) -> bytes:
-    if strip:
-        string = string.strip()
-
-    # If we have any new lines inside the string,
-    # then we have a multi line string and will indent
-    if "\n" in string:
-        split_sting = string.split("\n")
-
-        # As we have a multi line string, let YAML know it should be
-        # interpreted as such
-        string = "|-"
-
-        for line in split_sting:
-            if strip:
-                line = line.strip()
-            string += f"\n{indentation * ' '}{line}"
-    else:
-        string = indentation * " " + string
+def dump_yaml(data: Any) -> str:
+    """
+    Serialize data to YAML
 
-    return string.encode("utf-8")
+    Only plain data types are supported. The libyaml based dumper is used if
+    it is available, as it is considerably faster with large values.
+    """
+    return yaml.dump(data, Dumper=YamlDumper)
 
 
 def truncate_with_hash(
@@ -0,0 +1,95 @@
+import gzip
+import re
+import threading
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Optional, Type
+
+LOG_ARTIFACT_FOLDER = "logs"
+LOG_ARTIFACT_SUFFIX = ".log.gz"
+
+UNSAFE_NAME_REGEX = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def bound_output(output: str, head_lines: int, tail_lines: int) -> str:
+    """
+    Bound output to its first and last lines
+
+    The omitted lines are replaced with a single line telling how many
+    lines were left out. Output is returned as is if both ``head_lines``
+    and ``tail_lines`` are zero.
+
+    Args:
+        output: Output to bound
+        head_lines: Number of lines kept from the beginning
+        tail_lines: Number of lines kept from the end
+
+    Returns:
+        The bounded output
+    """
+    if not head_lines and not tail_lines:
+        return output
+
+    lines = output.splitlines()
+    omitted = len(lines) - head_lines - tail_lines
+    if omitted <= 0:
+        return output
+
+    head = lines[:head_lines]
+    tail = lines[len(lines) - tail_lines :] if tail_lines else []
+    return "\n".join([*head, f"... {omitted} lines omitted ...", *tail])
+
+
+class LogArtifact:
+    """
+    Full output of a command, written to a gzip compressed file
+
+    Lines are compressed as they are written, so that the output never needs
+    to be held in memory for writing it. Writes are serialized, which allows
+    streaming stdout and stderr from separate threads.
+
+    Args:
+        path: Path of the compressed log file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, folder: str, name: str) -> Optional["LogArtifact"]:
+        """
+        Create a log artifact named after ``name`` in the logs of ``folder``
+
+        Returns:
+            None if no artifact folder is set
+        """
+        if not folder:
+            return None
+
+        safe_name = UNSAFE_NAME_REGEX.sub("-", name).strip("-") or "output"
+        return cls(
+            Path(folder) / LOG_ARTIFACT_FOLDER / f"{safe_name}{LOG_ARTIFACT_SUFFIX}"
+        )
+
+    def __enter__(self) -> "LogArtifact":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, "wt", encoding="UTF-8")
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def write(self, text: str) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.write(text)
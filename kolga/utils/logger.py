@@ -1,19 +1,160 @@
+import atexit
+import json
+import re
 import sys
+import threading
 import time
 from contextlib import contextmanager
+from datetime import datetime, timezone
 from functools import partial
-from typing import Callable, Generator, Optional
+from typing import Any, Callable, Generator, List, Optional
 
 import colorful as cf
 
+from kolga.utils.log_artifacts import bound_output
 from kolga.utils.models import SubprocessResult
 
+ANSI_ESCAPE_REGEX = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+LOG_FORMAT_JSON = "json"
+LOG_FORMAT_TEXT = "text"
+
+
+class BufferedWriter:
+    """
+    Buffer writes to stderr and flush them in batches
+
+    The buffer is flushed once it holds ``max_size`` characters, or at the
+    latest ``flush_interval`` seconds after the first buffered write. A
+    ``max_size`` of zero disables buffering.
+
+    The stream is looked up at flush time, so that replacing ``sys.stderr``
+    (for instance when capturing output in tests) is respected.
+
+    Args:
+        max_size: Number of characters buffered before flushing
+        flush_interval: Maximum number of seconds a write stays in the buffer
+    """
+
+    def __init__(self, max_size: int = 65536, flush_interval: float = 0.2) -> None:
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._size = 0
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    def write(self, text: str) -> None:
+        with self._lock:
+            self._buffer.append(text)
+            self._size += len(text)
+
+            if self._size >= self.max_size or self.flush_interval <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            if not self._buffer:
+                return
+
+            output = "".join(self._buffer)
+            self._buffer.clear()
+            self._size = 0
+            sys.stderr.write(output)
+            sys.stderr.flush()
+
 
 class Logger:
     """
     Class for logging of events in the DevOps pipeline
+
+    Events are written to stderr through a :class:`BufferedWriter`, either as
+    colored text or, in the JSON format, as one JSON object per line.
+
+    Command output logged with :func:`~Logger.std` is bounded to its first
+    ``output_head_lines`` and last ``output_tail_lines`` lines when the full
+    output was written to a log artifact.
+
+    Args:
+        debug: Whether debug messages are logged
+        log_format: Either ``text`` or ``json``
+        writer: Writer for the formatted events
+        output_head_lines: Number of lines logged from the start of an output
+        output_tail_lines: Number of lines logged from the end of an output
     """
 
+    def __init__(
+        self,
+        debug: bool = False,
+        log_format: str = LOG_FORMAT_TEXT,
+        writer: Optional[BufferedWriter] = None,
+        output_head_lines: int = 50,
+        output_tail_lines: int = 150,
+    ) -> None:
+        self.debug_enabled = debug
+        self.log_format = log_format
+        self.writer = writer or BufferedWriter()
+        self.output_head_lines = output_head_lines
+        self.output_tail_lines = output_tail_lines
+
+    def configure(
+        self,
+        debug: bool,
+        log_format: str = LOG_FORMAT_TEXT,
+        buffer_size: int = 65536,
+        flush_interval: float = 0.2,
+        output_head_lines: int = 50,
+        output_tail_lines: int = 150,
+    ) -> None:
+        """
+        Set the log level, format, buffering and output bounds
+
+        The settings are read once here, instead of on every log call.
+        """
+        self.flush()
+        self.debug_enabled = debug
+        self.log_format = log_format
+        self.writer.max_size = buffer_size
+        self.writer.flush_interval = flush_interval
+        self.output_head_lines = output_head_lines
+        self.output_tail_lines = output_tail_lines
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def _emit(
+        self,
+        level: str,
+        message: str,
+        icon: Optional[str] = None,
+        color: str = "",
+        end: str = "\n",
+        **fields: Any,
+    ) -> None:
+        if self.log_format == LOG_FORMAT_JSON:
+            record = {
+                "time": datetime.now(timezone.utc).isoformat(),
+                "level": level,
+                "message": ANSI_ESCAPE_REGEX.sub("", message),
+                **({"icon": icon} if icon else {}),
+                **fields,
+            }
+            self.writer.write(f"{json.dumps(record, ensure_ascii=False)}\n")
+            return
+
+        _message = self._create_message(message, icon)
+        if color:
+            _message = f"{color}{_message}{cf.reset}"
+        self.writer.write(f"{_message}{end}")
+
     def _create_message(self, message: str, icon: Optional[str] = None) -> str:
         icon_string = f"{icon} " if icon else ""
         return f"{icon_string}{message}"
@@ -27,18 +168,25 @@ class Logger:
     def start_section(
         self, section_title: str, section_name: str, collapsed: bool = False
     ) -> Callable[[], None]:
-        section_data = self.__create_section_data(section_name, collapsed)
-        section_message = f"section_start:{section_data}{section_title}"
-
-        print(section_message, file=sys.stderr)  # noqa: T201
+        if self.log_format == LOG_FORMAT_JSON:
+            self._emit(
+                "section_start",
+                section_title,
+                section=section_name,
+                collapsed=collapsed,
+            )
+        else:
+            section_data = self.__create_section_data(section_name, collapsed)
+            self.writer.write(f"section_start:{section_data}{section_title}\n")
 
         return partial(self.end_section, section_name=section_name, collapsed=collapsed)
 
     def end_section(self, section_name: str, collapsed: bool = False) -> None:
-        section_data = self.__create_section_data(section_name, collapsed)
-        section_message = f"section_end:{section_data}"
-
-        print(section_message, file=sys.stderr)  # noqa: T201
+        if self.log_format == LOG_FORMAT_JSON:
+            self._emit("section_end", "", section=section_name)
+        else:
+            section_data = self.__create_section_data(section_name, collapsed)
+            self.writer.write(f"section_end:{section_data}\n")
 
     @contextmanager
     def do_section(
@@ -65,11 +213,8 @@ class Logger:
             message: Debug message
             icon: Icon to place as before the output
         """
-        from kolga.settings import settings
-
-        if settings.KOLGA_DEBUG:
-            _message = self._create_message(message, icon)
-            print(f"{cf.purple}{_message}{cf.reset}", file=sys.stderr)  # noqa: T201
+        if self.debug_enabled:
+            self._emit("debug", message, icon=icon, color=cf.purple)
 
     def debug_std(
         self,
@@ -103,13 +248,14 @@ class Logger:
             raise_exception: If True, raise `error` if passed, otherwise raise `Exception`
         """
         message_string = message if message else "An error occured"
-        _message = self._create_message(message_string, icon)
+        _message = message_string
 
         if error and not raise_exception:
             _message += f"{error}"
 
-        print(f"{cf.red}{_message}{cf.reset}", file=sys.stderr)  # noqa: T201
+        self._emit("error", _message, icon=icon, color=cf.red)
         if raise_exception:
+            self.flush()
             error = error or Exception(message_string)
             raise error
 
@@ -121,8 +267,7 @@ class Logger:
             message: Verbose/Custom error message of the exception
             icon: Icon to place as before the output
         """
-        _message = self._create_message(message, icon)
-        print(f"{cf.yellow}{_message}{cf.reset}", file=sys.stderr)  # noqa: T201
+        self._emit("warning", message, icon=icon, color=cf.yellow)
 
     def success(self, message: str = "", icon: Optional[str] = None) -> None:
         """
@@ -133,8 +278,7 @@ class Logger:
             icon: Icon to place as before the output
         """
         message_string = message if message else "Done"
-        _message = self._create_message(message_string, icon)
-        print(f"{cf.green}{_message}{cf.reset}", file=sys.stderr)  # noqa: T201
+        self._emit("success", message_string, icon=icon, color=cf.green)
 
     def info(
         self,
@@ -155,8 +299,7 @@ class Logger:
         message_string = (
             f"{cf.bold}{title}{cf.reset}{message}" if title else f"{message}"
         )
-        _message = self._create_message(message_string, icon)
-        print(f"{_message}", end=end, file=sys.stderr, flush=True)  # noqa: T201
+        self._emit("info", message_string, icon=icon, end=end)
 
     def std(
         self,
@@ -167,19 +310,42 @@ class Logger:
         """
         Log results of :class:`SubprocessResult` warnings to stderr
 
+        If the full output was written to a log artifact, long outputs are
+        bounded to their first and last lines and the path of the artifact is
+        logged instead. Otherwise the output is logged as is.
+
         Args:
             std: Result from a subprocess call
             raise_exception: If True, raise `Exception`
             log_error: If True, log the error part of the result with :func:`~Logger.error`
         """
+        out, err = std.out, std.err
+        if std.log_file:
+            out = bound_output(out, self.output_head_lines, self.output_tail_lines)
+            err = bound_output(err, self.output_head_lines, self.output_tail_lines)
+
         if log_error:
-            logger.error(message=std.err, raise_exception=False)
-        output_string = f"\n{cf.green}stdout:\n{cf.reset}{std.out}\n{cf.red}stderr:\n{cf.reset}{std.err}"
+            logger.error(message=err, raise_exception=False)
+        output_string = (
+            f"\n{cf.green}stdout:\n{cf.reset}{out}\n{cf.red}stderr:\n{cf.reset}{err}"
+        )
+        if std.log_file:
+            output_string += f"\n📄 Full output: {std.log_file}"
 
         if raise_exception:
+            self.flush()
             raise Exception(output_string)
+        elif self.log_format == LOG_FORMAT_JSON:
+            self._emit(
+                "output",
+                std.command,
+                stdout=out,
+                stderr=err,
+                **({"log_file": std.log_file} if std.log_file else {}),
+            )
         else:
-            print(output_string, file=sys.stderr)  # noqa: T201
+            self.writer.write(f"{output_string}\n")
 
 
 logger = Logger()
+atexit.register(logger.flush)
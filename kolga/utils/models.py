@@ -1,6 +1,9 @@
 import re
 from dataclasses import dataclass, field
-from typing import Any, List, Optional, TypedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple, TypedDict
+
+from tabulate import tabulate
 
 
 @dataclass
@@ -11,12 +14,103 @@ class ImageStage:
     development: bool = False
 
 
+@dataclass
+class DockerfileStage:
+    index: int
+    name: str
+    # Base image with build arguments substituted
+    image: str
+    platform: str = ""
+    # Index of the stage this stage is built on top of
+    parent: Optional[int] = None
+    # Indexes of the stages that files are copied or mounted from
+    copy_from: List[int] = field(default_factory=lambda: list())
+    # Paths and patterns read from the build context by ADD, COPY and RUN
+    context_sources: List[str] = field(default_factory=lambda: list())
+    args: Dict[str, Optional[str]] = field(default_factory=lambda: dict())
+
+    @property
+    def dependencies(self) -> List[int]:
+        parent = [] if self.parent is None else [self.parent]
+        return sorted({*parent, *self.copy_from})
+
+
+@dataclass
+class Dockerfile:
+    stages: List[DockerfileStage] = field(default_factory=lambda: list())
+    # Arguments declared before the first stage
+    args: Dict[str, Optional[str]] = field(default_factory=lambda: dict())
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for stage in self.stages]
+
+    @property
+    def context_sources(self) -> List[str]:
+        return [source for stage in self.stages for source in stage.context_sources]
+
+    def get_stage(self, reference: str) -> Optional[DockerfileStage]:
+        """
+        Get a stage by its name or index, like in ``COPY --from``
+        """
+        if reference.isdigit():
+            index = int(reference)
+            return self.stages[index] if index < len(self.stages) else None
+
+        for stage in self.stages:
+            if stage.name and stage.name.lower() == reference.lower():
+                return stage
+        return None
+
+    def get_required_stages(self, index: int) -> List[DockerfileStage]:
+        """
+        Get the stages needed for building a stage, including the stage itself
+        """
+        required: Set[int] = set()
+        pending = [index]
+        while pending:
+            current = pending.pop()
+            if current in required:
+                continue
+            required.add(current)
+            pending.extend(self.stages[current].dependencies)
+        return [self.stages[i] for i in sorted(required)]
+
+
+@dataclass
+class BuildContextReport:
+    path: str
+    total_bytes: int = 0
+    file_count: int = 0
+    # Bytes of the largest top level paths, largest first
+    largest_paths: List[Tuple[str, int]] = field(default_factory=lambda: list())
+    # Bytes not read by any ADD, COPY or RUN --mount of the Dockerfile
+    unused_bytes: int = 0
+    unused_paths: List[Tuple[str, int]] = field(default_factory=lambda: list())
+    # Files read by the Dockerfile, relative to the context
+    used_files: List[str] = field(default_factory=lambda: list())
+
+
 @dataclass
 class DockerImage:
     repository: str
     tags: List[str] = field(default_factory=lambda: list())
 
 
+@dataclass
+class BuildxBuilder:
+    name: str
+    driver: str = ""
+    endpoints: List[str] = field(default_factory=list)
+    statuses: List[str] = field(default_factory=list)
+
+    @property
+    def running(self) -> bool:
+        return bool(self.statuses) and all(
+            status == "running" for status in self.statuses
+        )
+
+
 @dataclass
 class DockerImageRef:
     registry: Optional[str]
@@ -54,19 +148,143 @@ class SubprocessResult:
     return_code: int
     child: Any
     command: str
+    log_file: str = ""
+    attempts: int = 1
+    retry_seconds: float = 0.0
+
+
+@dataclass
+class ImagePullResult:
+    image: str
+    success: bool
+    skipped: bool = False
+    digest: Optional[str] = None
+    bytes_transferred: Optional[int] = None
+    result: Optional[SubprocessResult] = None
+
+
+@dataclass
+class DeploymentStatus:
+    name: str
+    replicas: int = 0
+    ready_replicas: int = 0
+    updated_replicas: int = 0
+    available_replicas: int = 0
+
+
+@dataclass
+class ReplicaSetStatus:
+    name: str
+    revision: str = ""
+    replicas: int = 0
+    ready_replicas: int = 0
+
+
+@dataclass
+class PodStatus:
+    name: str
+    phase: str = ""
+    ready_containers: int = 0
+    containers: int = 0
+    restarts: int = 0
+    # Reasons of containers waiting to start, such as CrashLoopBackOff
+    waiting_reasons: List[str] = field(default_factory=lambda: list())
+    # Containers whose last run was killed for running out of memory
+    oom_killed: List[str] = field(default_factory=lambda: list())
+
+    @property
+    def ready(self) -> bool:
+        return self.containers > 0 and self.ready_containers == self.containers
+
+
+@dataclass
+class EnvironmentStatus:
+    namespace: str
+    # Latest deploymentTime of the Deployments in the namespace
+    last_deployment: Optional[datetime] = None
+    tracks: List[str] = field(default_factory=lambda: list())
+    stale: bool = False
+    # Why the environment is or is not removed
+    reason: str = ""
+
+
+@dataclass
+class ResourceUsage:
+    # Samples of the usage of the pods of a release
+    cpu_cores: List[float] = field(default_factory=lambda: list())
+    memory_bytes: List[float] = field(default_factory=lambda: list())
+
+
+@dataclass
+class ResourceRecommendation:
+    request_cpu: str
+    request_ram: str
+    limit_cpu: str
+    limit_ram: str
+    # Number of CPU and memory samples the recommendation is based on
+    samples: int = 0
+
+    def as_settings(self) -> Dict[str, str]:
+        return {
+            "K8S_REQUEST_CPU": self.request_cpu,
+            "K8S_REQUEST_RAM": self.request_ram,
+            "K8S_LIMIT_CPU": self.limit_cpu,
+            "K8S_LIMIT_RAM": self.limit_ram,
+        }
 
 
 @dataclass
 class ReleaseStatus:
-    pods: str = ""
-    deployment: str = ""
+    deployments: List[DeploymentStatus] = field(default_factory=lambda: list())
+    replica_sets: List[ReplicaSetStatus] = field(default_factory=lambda: list())
+    pods: List[PodStatus] = field(default_factory=lambda: list())
+
+    @property
+    def restarts(self) -> int:
+        return sum(pod.restarts for pod in self.pods)
+
+    @property
+    def oom_killed_pods(self) -> List[PodStatus]:
+        return [pod for pod in self.pods if pod.oom_killed]
 
     def __str__(self) -> str:
-        result = "==== POD STATUSES ====\n"
-        result += self.pods
-        result += "==== DEPLOYMENT STATUS ====\n"
-        result += self.deployment
-        return result
+        deployments = tabulate(
+            [
+                [
+                    d.name,
+                    f"{d.ready_replicas}/{d.replicas}",
+                    d.updated_replicas,
+                    d.available_replicas,
+                ]
+                for d in self.deployments
+            ],
+            headers=["Deployment", "Ready", "Up-to-date", "Available"],
+            tablefmt="orgtbl",
+        )
+        replica_sets = tabulate(
+            [
+                [rs.name, rs.revision, f"{rs.ready_replicas}/{rs.replicas}"]
+                for rs in self.replica_sets
+            ],
+            headers=["ReplicaSet", "Revision", "Ready"],
+            tablefmt="orgtbl",
+        )
+        pods = tabulate(
+            [
+                [
+                    pod.name,
+                    pod.phase,
+                    f"{pod.ready_containers}/{pod.containers}",
+                    pod.restarts,
+                    ", ".join(pod.waiting_reasons),
+                    ", ".join(pod.oom_killed),
+                ]
+                for pod in self.pods
+            ],
+            headers=["Pod", "Phase", "Ready", "Restarts", "Waiting", "OOMKilled"],
+            tablefmt="orgtbl",
+        )
+        return f"{deployments}\n\n{replica_sets}\n\n{pods}\n"
 
 
 @dataclass
@@ -0,0 +1,140 @@
+import os
+import random
+import re
+from typing import Dict, Iterable, List, Optional
+
+from kolga.utils.models import SubprocessResult
+
+# Failures of the network between any of the tools and their servers
+NETWORK_ERRORS = [
+    r"connection reset by peer",
+    r"connection refused",
+    r"i/o timeout",
+    r"TLS handshake timeout",
+    r"net/http: request canceled",
+    r"unexpected EOF",
+    r"no such host",
+    r"temporary failure in name resolution",
+]
+
+# Overloaded or unavailable servers answering over HTTP
+SERVER_ERRORS = [
+    r"\b50[234] (?:Bad Gateway|Service Unavailable|Gateway Time-?out)\b",
+    r"\b429 Too Many Requests\b",
+    r"toomanyrequests",
+]
+
+
+class RetryClassifier:
+    """
+    Tell transient failures of a tool apart from permanent ones
+
+    A failure is transient if the command exited with one of ``exit_codes``
+    or its output matches one of ``patterns``.
+
+    Args:
+        patterns: Regular expressions matching transient errors, case
+            insensitively
+        exit_codes: Exit codes of transient failures
+    """
+
+    def __init__(self, patterns: List[str], exit_codes: Iterable[int] = ()) -> None:
+        self.pattern = re.compile(
+            "|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE
+        )
+        self.exit_codes = set(exit_codes)
+
+    def classify(self, result: SubprocessResult) -> Optional[str]:
+        """
+        Get the reason a failed command can be retried
+
+        Returns:
+            The matched error, or None if the failure is not transient
+        """
+        if not result.return_code:
+            return None
+        if result.return_code in self.exit_codes:
+            return f"exit code {result.return_code}"
+
+        match = self.pattern.search(result.err) or self.pattern.search(result.out)
+        return match.group(0) if match else None
+
+
+RETRY_CLASSIFIERS: Dict[str, RetryClassifier] = {
+    "docker": RetryClassifier(
+        [
+            *NETWORK_ERRORS,
+            *SERVER_ERRORS,
+            r"failed to do request",
+            r"error pushing cache",
+            r"failed to copy: httpReadSeeker",
+        ]
+    ),
+    "git": RetryClassifier(
+        [
+            *NETWORK_ERRORS,
+            *SERVER_ERRORS,
+            r"could not resolve host",
+            r"the remote end hung up unexpectedly",
+            r"early EOF",
+            r"RPC failed",
+            r"connection timed out",
+        ]
+    ),
+    "helm": RetryClassifier(
+        [
+            *NETWORK_ERRORS,
+            *SERVER_ERRORS,
+            r"Kubernetes cluster unreachable",
+            r"the server is currently unable to handle the request",
+            r"failed to fetch .* : 5\d\d",
+            r"etcdserver: (?:request timed out|leader changed)",
+        ]
+    ),
+    "kubectl": RetryClassifier(
+        [
+            *NETWORK_ERRORS,
+            *SERVER_ERRORS,
+            r"Unable to connect to the server",
+            r"the server is currently unable to handle the request",
+            r"the server has received too many requests",
+            r"etcdserver: (?:request timed out|leader changed)",
+        ]
+    ),
+}
+
+
+def get_retry_reason(
+    command_list: List[str], result: SubprocessResult
+) -> Optional[str]:
+    """
+    Get the reason a failed command can be retried, using the classifier of
+    the tool that was run
+
+    Returns:
+        The reason, or None if the failure is not transient or the tool has no
+        classifier
+    """
+    executable = command_list[0].split() if command_list else []
+    if not executable:
+        return None
+
+    tool = os.path.basename(executable[0])
+    classifier = RETRY_CLASSIFIERS.get(tool)
+    return classifier.classify(result) if classifier else None
+
+
+def get_retry_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Get the delay before retrying, with exponential backoff and jitter
+
+    The delay doubles with every attempt up to ``max_delay``, and a random
+    half of it is left out so that concurrent jobs do not retry in lockstep.
+
+    Args:
+        attempt: Number of the failed attempt, starting from 1
+        base_delay: Delay after the first attempt in seconds
+        max_delay: Maximum delay in seconds
+    """
+    delay = min(max_delay, base_delay * 2.0 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)  # nosec
@@ -0,0 +1,12 @@
+from typing import Iterator
+
+import pytest
+
+from kolga.utils.logger import logger
+
+
+@pytest.fixture(autouse=True)
+def flush_logger() -> Iterator[None]:
+    # Keep buffered log output within the test that produced it
+    yield
+    logger.flush()
@@ -0,0 +1,124 @@
+import json
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+from unittest import mock
+
+import pytest
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.libs.cluster_metadata import ClusterMetadata
+
+
+def _names(*names: str) -> mock.MagicMock:
+    items = [k8s_client.V1ObjectMeta(name=name) for name in names]
+    return mock.MagicMock(items=[mock.MagicMock(metadata=item) for item in items])
+
+
+@pytest.fixture
+def apis() -> Iterator[mock.MagicMock]:
+    apis = mock.MagicMock()
+    apis.custom_objects.list_cluster_custom_object.return_value = {
+        "items": [{"metadata": {"name": "certificate-letsencrypt-stable"}}]
+    }
+    apis.storage_v1.list_storage_class.return_value = _names("standard", "fast")
+    apis.networking_v1.list_ingress_class.return_value = _names("nginx")
+
+    with mock.patch.multiple(
+        "kolga.libs.cluster_metadata.k8s_client",
+        CustomObjectsApi=mock.MagicMock(return_value=apis.custom_objects),
+        StorageV1Api=mock.MagicMock(return_value=apis.storage_v1),
+        NetworkingV1Api=mock.MagicMock(return_value=apis.networking_v1),
+    ):
+        yield apis
+
+
+def _api_client(host: str = "https://cluster.example.com") -> mock.MagicMock:
+    return mock.MagicMock(**{"configuration.host": host})
+
+
+def test_lookups(apis: mock.MagicMock) -> None:
+    metadata = ClusterMetadata(_api_client())
+
+    for _ in range(3):
+        assert metadata.has_cluster_issuer("certificate-letsencrypt-stable")
+        assert not metadata.has_cluster_issuer("certificate-letsencrypt-review")
+        assert metadata.has_storage_class("fast")
+        assert not metadata.has_storage_class("slow")
+        assert metadata.has_ingress_class("nginx")
+
+    # Every resource type is listed only once
+    assert apis.custom_objects.list_cluster_custom_object.call_count == 1
+    assert apis.storage_v1.list_storage_class.call_count == 1
+    assert apis.networking_v1.list_ingress_class.call_count == 1
+
+
+@pytest.mark.parametrize("status, expected", [(404, False), (403, None)])
+def test_list_errors(apis: mock.MagicMock, status: int, expected: bool) -> None:
+    apis.custom_objects.list_cluster_custom_object.side_effect = ApiException(
+        status=status
+    )
+    apis.custom_objects.get_cluster_custom_object.side_effect = ApiException(
+        status=status
+    )
+    metadata = ClusterMetadata(_api_client())
+
+    assert metadata.has_cluster_issuer("certificate-letsencrypt-stable") is expected
+    assert metadata.has_storage_class("standard")
+
+
+@pytest.mark.parametrize("get_status, expected", [(None, True), (404, False)])
+def test_cluster_issuer_lookup_without_list_permission(
+    apis: mock.MagicMock, get_status: Optional[int], expected: bool
+) -> None:
+    apis.custom_objects.list_cluster_custom_object.side_effect = ApiException(
+        status=403
+    )
+    if get_status:
+        apis.custom_objects.get_cluster_custom_object.side_effect = ApiException(
+            status=get_status
+        )
+    metadata = ClusterMetadata(_api_client())
+
+    for _ in range(2):
+        assert metadata.has_cluster_issuer("certificate-letsencrypt-stable") is expected
+
+    get_cluster_custom_object = apis.custom_objects.get_cluster_custom_object
+    get_cluster_custom_object.assert_called_once_with(
+        group="cert-manager.io",
+        version="v1",
+        plural="clusterissuers",
+        name="certificate-letsencrypt-stable",
+    )
+
+
+def test_disk_cache(apis: mock.MagicMock, tmp_path: Path) -> None:
+    cache_path = tmp_path / "cache" / "cluster.json"
+
+    ClusterMetadata(_api_client(), cache_path=str(cache_path)).metadata
+    assert json.loads(cache_path.read_text())["server"] == "https://cluster.example.com"
+
+    metadata = ClusterMetadata(_api_client(), cache_path=str(cache_path))
+    assert metadata.has_storage_class("standard")
+    assert apis.storage_v1.list_storage_class.call_count == 1
+
+
+def test_disk_cache_expired(apis: mock.MagicMock, tmp_path: Path) -> None:
+    cache_path = tmp_path / "cluster.json"
+    ClusterMetadata(_api_client(), cache_path=str(cache_path)).metadata
+
+    with mock.patch("time.time", return_value=time.time() + 301):
+        ClusterMetadata(_api_client(), cache_path=str(cache_path)).metadata
+    assert apis.storage_v1.list_storage_class.call_count == 2
+
+
+def test_disk_cache_other_cluster(apis: mock.MagicMock, tmp_path: Path) -> None:
+    cache_path = tmp_path / "cluster.json"
+    ClusterMetadata(_api_client(), cache_path=str(cache_path)).metadata
+
+    other = ClusterMetadata(
+        _api_client("https://other.example.com"), cache_path=str(cache_path)
+    )
+    other.metadata
+    assert apis.storage_v1.list_storage_class.call_count == 2
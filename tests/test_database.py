@@ -5,6 +5,15 @@ from kolga.utils.general import DATABASE_DEFAULT_PORT_MAPPING, MYSQL, POSTGRES
 from kolga.utils.url import URL  # type: ignore
 
 
+def line_checker(data: str, expected_data: str) -> None:
+    split_data = data.strip().split("\n")
+    split_expected_data = expected_data.strip().split("\n")
+
+    assert len(split_data) == len(split_expected_data)
+    for i, line in enumerate(split_data):
+        assert line.strip() == split_expected_data[i].strip()
+
+
 @pytest.mark.parametrize(
     "driver, database, hostname",
     [(MYSQL, "test", "localhost"), (POSTGRES, "test", "localhost")],
@@ -45,13 +54,6 @@ def test_get_database_creation_sql_from_url() -> None:
         "database": "testdb",
     }
 
-    def line_checker(data: str, expected_data: str) -> None:
-        split_data = data.strip().split("\n")
-        split_expected_data = expected_data.strip().split("\n")
-
-        for i, line in enumerate(split_data):
-            assert line.strip() == split_expected_data[i].strip()
-
     url = URL(
         drivername=url_args["drivername"],
         host=url_args["host"],
@@ -62,8 +64,9 @@ def test_get_database_creation_sql_from_url() -> None:
     creation_query = Database.get_database_creation_sql_from_url(url)
 
     expected_query = f"""
-        CREATE DATABASE `{url_args["database"]}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci;
+        CREATE DATABASE IF NOT EXISTS `{url_args["database"]}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci;
         CREATE USER IF NOT EXISTS '{url_args["username"]}'@'%' IDENTIFIED BY '{url_args["password"]}';
+        ALTER USER '{url_args["username"]}'@'%' IDENTIFIED BY '{url_args["password"]}';
         GRANT ALL PRIVILEGES ON `{url_args["database"]}`.* TO '{url_args["username"]}'@'%';
         FLUSH PRIVILEGES;
         """
@@ -91,8 +94,59 @@ def test_get_database_creation_sql_from_url_postgres() -> None:
         drivername=POSTGRES,
         host="localhost",
         username="test",
-        password="test",
-        database="test",
+        password="testpassword",
+        database="testdb",
     )
+
+    expected_query = """
+        SELECT 'CREATE ROLE "test"' WHERE NOT EXISTS (SELECT FROM pg_roles WHERE rolname = 'test')\\gexec
+        ALTER ROLE "test" WITH LOGIN PASSWORD 'testpassword';
+        SELECT 'CREATE DATABASE "testdb" OWNER "test"' WHERE NOT EXISTS (SELECT FROM pg_database WHERE datname = 'testdb')\\gexec
+        """
+
+    line_checker(Database(url=url).creation_sql, expected_query)
+
+
+@pytest.mark.parametrize(
+    "driver, expected_query",
+    [
+        (
+            MYSQL,
+            """
+            DROP DATABASE IF EXISTS `testdb`;
+            DROP USER IF EXISTS 'test'@'%';
+            """,
+        ),
+        (
+            POSTGRES,
+            """
+            SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = 'testdb';
+            DROP DATABASE IF EXISTS "testdb";
+            DROP ROLE IF EXISTS "test";
+            """,
+        ),
+    ],
+)
+def test_get_database_deletion_sql_from_url(driver: str, expected_query: str) -> None:
+    url = URL(drivername=driver, username="test", database="testdb")
+
+    line_checker(Database.get_database_deletion_sql_from_url(url), expected_query)
+    line_checker(Database(url=url).deletion_sql, expected_query)
+
+
+def test_get_database_deletion_sql_from_url_value_error() -> None:
+    url = URL(drivername="monsterdb", username="test", database="test")
     with pytest.raises(ValueError):
-        Database.get_database_creation_sql_from_url(url)
+        Database.get_database_deletion_sql_from_url(url)
+
+
+def test_get_random_auth_database_url_username() -> None:
+    url = Database.get_random_auth_database_url(
+        database_driver=POSTGRES,
+        database_name="test",
+        database_hostname="localhost",
+        username="fixeduser",
+    )
+
+    assert url.username == "fixeduser"
+    assert len(url.password) == 32
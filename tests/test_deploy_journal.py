@@ -0,0 +1,160 @@
+import copy
+from base64 import b64encode
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.libs.deploy_journal import (
+    DEPLOY_JOURNAL_KEY,
+    DEPLOY_JOURNAL_NAME,
+    DeployJournal,
+)
+
+NAMESPACE = "testing"
+
+
+class FakeCoreV1Api:
+    """
+    In-memory stand-in for the parts of ``CoreV1Api`` used by the deploy journal
+    """
+
+    def __init__(self) -> None:
+        self.secrets: Dict[str, k8s_client.V1Secret] = {}
+        self.fail = False
+
+    def _check(self) -> None:
+        if self.fail:
+            raise ApiException(status=503)
+
+    def read_namespaced_secret(self, name: str, namespace: str) -> k8s_client.V1Secret:
+        self._check()
+        if name not in self.secrets:
+            raise ApiException(status=404)
+        return copy.deepcopy(self.secrets[name])
+
+    def _store(self, body: k8s_client.V1Secret) -> None:
+        # The API server encodes string data into data
+        secret = copy.deepcopy(body)
+        secret.data = {
+            key: b64encode(value.encode()).decode()
+            for key, value in (secret.string_data or {}).items()
+        }
+        secret.string_data = None
+        self.secrets[body.metadata.name] = secret
+
+    def create_namespaced_secret(
+        self, namespace: str, body: k8s_client.V1Secret
+    ) -> k8s_client.V1Secret:
+        self._check()
+        if body.metadata.name in self.secrets:
+            raise ApiException(status=409)
+        self._store(body)
+        return body
+
+    def replace_namespaced_secret(
+        self, name: str, namespace: str, body: k8s_client.V1Secret
+    ) -> k8s_client.V1Secret:
+        self._check()
+        if name not in self.secrets:
+            raise ApiException(status=404)
+        self._store(body)
+        return body
+
+    def delete_namespaced_secret(self, name: str, namespace: str) -> None:
+        self._check()
+        if name not in self.secrets:
+            raise ApiException(status=404)
+        del self.secrets[name]
+
+
+def _deploy(journal: DeployJournal, calls: List[str], fail_on: str = "") -> None:
+    """
+    Run the steps of a deployment of two projects
+    """
+
+    def step(name: str) -> None:
+        if name == fail_on:
+            raise Exception(f"{name} failed")
+        calls.append(name)
+
+    for project in ("backend", "frontend"):
+        for kind in ("secrets", "deployment"):
+            name = f"{kind}/{project}"
+            journal.run(name, inputs={"project": project}, function=lambda: step(name))
+    journal.clear()
+
+
+def _journal(core_v1: FakeCoreV1Api, run_id: str = "abc:1:deploy") -> DeployJournal:
+    journal = DeployJournal(run_id=run_id, core_v1=core_v1, namespace=NAMESPACE)
+    journal.load()
+    return journal
+
+
+def test_retry_resumes_from_failed_step() -> None:
+    core_v1 = FakeCoreV1Api()
+    calls: List[str] = []
+
+    with pytest.raises(Exception):
+        _deploy(_journal(core_v1), calls, fail_on="deployment/frontend")
+    assert calls == ["secrets/backend", "deployment/backend", "secrets/frontend"]
+    assert DEPLOY_JOURNAL_KEY in core_v1.secrets[DEPLOY_JOURNAL_NAME].data
+
+    calls.clear()
+    _deploy(_journal(core_v1), calls)
+    assert calls == ["deployment/frontend"]
+    # A completed deployment leaves no journal behind
+    assert not core_v1.secrets
+
+
+def test_changed_inputs_are_not_skipped() -> None:
+    core_v1 = FakeCoreV1Api()
+    journal = _journal(core_v1)
+    journal.complete("secrets/backend", {"password": "old"})
+
+    journal = _journal(core_v1)
+    assert journal.is_completed("secrets/backend", {"password": "old"})
+    assert not journal.is_completed("secrets/backend", {"password": "new"})
+
+
+def test_journal_of_another_run_is_ignored() -> None:
+    core_v1 = FakeCoreV1Api()
+    _journal(core_v1, run_id="abc:1:deploy").complete("secrets/backend", {})
+
+    journal = _journal(core_v1, run_id="def:2:deploy")
+    assert not journal.steps
+
+    # The stale journal is replaced by the one of the new run
+    journal.complete("deployment/backend", {})
+    assert list(_journal(core_v1, run_id="def:2:deploy").steps) == [
+        "deployment/backend"
+    ]
+
+
+def test_unavailable_api_does_not_fail_deployment() -> None:
+    core_v1 = FakeCoreV1Api()
+    core_v1.fail = True
+    calls: List[str] = []
+
+    _deploy(_journal(core_v1), calls)
+
+    assert len(calls) == 4
+
+
+def test_artifact_journal(tmp_path: Path) -> None:
+    path = tmp_path / "deploy-journal-stable.json"
+    calls: List[str] = []
+
+    journal = DeployJournal(run_id="abc:1:deploy", path=path)
+    with pytest.raises(Exception):
+        _deploy(journal, calls, fail_on="secrets/frontend")
+    assert path.exists()
+
+    journal = DeployJournal(run_id="abc:1:deploy", path=path)
+    journal.load()
+    calls.clear()
+    _deploy(journal, calls)
+    assert calls == ["secrets/frontend", "deployment/frontend"]
+    assert not path.exists()
@@ -1,12 +1,15 @@
 import tempfile
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 from unittest import mock
 
 import pytest
 
 from kolga.libs.docker import Docker
 from kolga.settings import Settings, settings
+from kolga.utils.dockerfile import parse_dockerfile
+from kolga.utils.models import DockerImage, SubprocessResult
+from tests.testcase import override_settings
 
 
 def test_incorrect_dockerfile_path() -> None:
@@ -66,6 +69,66 @@ def test_get_stages_names(value: str, expected: List[str]) -> None:
         assert stage_names == expected
 
 
+DOCKERFILE = """\
+# escape=\\
+ARG PYTHON_VERSION=3.11
+ARG BASE_IMAGE=python:${PYTHON_VERSION}-slim
+
+FROM --platform=$BUILDPLATFORM ${BASE_IMAGE} AS base
+ARG APP_USER
+
+FROM base \\
+    # Comments are allowed within continued lines
+    AS builder
+RUN pip wheel --wheel-dir=/wheels -r requirements.txt
+
+FROM node:20 AS assets
+RUN --mount=type=cache,target=/root/.npm --mount=type=bind,from=base,target=/src \\
+    npm run build
+
+FROM base
+COPY --from=builder /wheels /wheels
+COPY --from=assets /app/static /app/static
+COPY --from=1 /wheels /wheels
+"""
+
+
+def test_parse_dockerfile() -> None:
+    dockerfile = parse_dockerfile(DOCKERFILE, build_args={"PYTHON_VERSION": "3.12"})
+
+    assert dockerfile.args == {
+        "PYTHON_VERSION": "3.11",
+        "BASE_IMAGE": "python:3.12-slim",
+    }
+    assert dockerfile.stage_names == ["base", "builder", "assets", ""]
+
+    base, builder, assets, final = dockerfile.stages
+    assert base.image == "python:3.12-slim"
+    assert base.platform == ""
+    assert base.args == {"APP_USER": None}
+    assert builder.parent == 0
+    assert assets.parent is None
+    assert assets.copy_from == [0]
+    assert final.dependencies == [0, 1, 2]
+    assert [stage.name for stage in dockerfile.get_required_stages(1)] == [
+        "base",
+        "builder",
+    ]
+
+
+def test_dockerfile_parsed_once() -> None:
+    d = Docker()
+
+    with mock.patch(
+        "kolga.libs.docker.parse_dockerfile", wraps=parse_dockerfile
+    ) as mock_parse:
+        d.get_stages()
+        d.get_cache_tags()
+        d.get_stages()
+
+    mock_parse.assert_called_once()
+
+
 @pytest.mark.parametrize(
     "value, expected",
     [
@@ -184,6 +247,461 @@ def test_get_image_tags(env_tags: Optional[str], expected: List[str]) -> None:
     assert stage_tags == [f"{tag}-{intermediate_stage}" for tag in expected]
 
 
+def test_delete_images() -> None:
+    images = [
+        DockerImage(repository="registry/project", tags=["sha", "sha-dev"]),
+        DockerImage(repository="registry/other", tags=["latest"]),
+    ]
+    commands: List[List[str]] = []
+
+    def run_os_command(command: List[str], shell: bool = False) -> SubprocessResult:
+        commands.append(command)
+        out = ""
+        if command[:3] == ["docker", "image", "inspect"]:
+            out = "sha256:aaa 1000\nsha256:aaa 1000\nsha256:bbb 500\n"
+        elif command[1] == "rmi":
+            # "other" is still tagged elsewhere, so it is only untagged
+            out = (
+                "Untagged: registry/project:sha\n"
+                "Untagged: registry/project:sha-dev\n"
+                "Deleted: sha256:aaa\n"
+                "Deleted: sha256:layer\n"
+                "Untagged: registry/other:latest\n"
+            )
+        return SubprocessResult(out=out, err="", return_code=0, child=None, command="")
+
+    with mock.patch("kolga.libs.docker.run_os_command", run_os_command):
+        reclaimed = Docker().delete_images(images)
+
+    rmi_commands = [command for command in commands if command[1] == "rmi"]
+    assert rmi_commands == [
+        [
+            "docker",
+            "rmi",
+            "registry/project:sha",
+            "registry/project:sha-dev",
+            "registry/other:latest",
+        ]
+    ]
+    assert reclaimed == 1000
+
+
+def test_delete_images_failure() -> None:
+    images = [DockerImage(repository="registry/project", tags=["sha"])]
+    inspect_result = SubprocessResult(
+        out="sha256:aaa 1000\n", err="", return_code=0, child=None, command=""
+    )
+    rmi_result = SubprocessResult(
+        out="",
+        err="Error response from daemon: conflict: unable to remove repository",
+        return_code=1,
+        child=None,
+        command="",
+    )
+
+    with mock.patch(
+        "kolga.libs.docker.run_os_command", side_effect=[inspect_result, rmi_result]
+    ), mock.patch("kolga.libs.docker.logger") as logger:
+        reclaimed = Docker().delete_images(images)
+
+    assert reclaimed == 0
+    logger.success.assert_not_called()
+
+
+def test_prune_build_cache() -> None:
+    result = SubprocessResult(
+        out="ID\tRECLAIMABLE\tSIZE\nabc\ttrue\t1.5GB\nTotal:\t1.5GB\n",
+        err="",
+        return_code=0,
+        child=None,
+        command="",
+    )
+    with mock.patch(
+        "kolga.libs.docker.run_os_command", return_value=result
+    ) as run_os_command:
+        reclaimed = Docker().prune_build_cache(until="72h", keep_storage="10gb")
+
+    assert reclaimed == 1_500_000_000
+    assert run_os_command.call_args.args[0] == [
+        "docker",
+        "buildx",
+        "prune",
+        "--force",
+        "--filter",
+        "until=72h",
+        "--keep-storage",
+        "10gb",
+    ]
+
+
+BUILDER_INSPECT = """Name:          kolgabk
+Driver:        {driver}
+Last Activity: 2023-10-01 12:00:00 +0000 UTC
+
+Nodes:
+Name:      kolgabk0
+Endpoint:  {endpoint}
+Status:    {status}
+Buildkit:  v0.12.2
+"""
+
+
+class FakeBuildx:
+    """
+    Answers the ``docker buildx`` commands of the builder setup
+    """
+
+    def __init__(self, builder: Optional[Dict[str, str]] = None) -> None:
+        self.builder = builder
+        self.commands: List[List[str]] = []
+
+    def __call__(
+        self, command: List[str], shell: bool = False, retry: bool = False
+    ) -> SubprocessResult:
+        self.commands.append(command)
+        out, return_code = "", 0
+        if command[2] == "inspect":
+            if self.builder:
+                out = BUILDER_INSPECT.format(**self.builder)
+            else:
+                return_code = 1
+        return SubprocessResult(
+            out=out, err="", return_code=return_code, child=None, command=""
+        )
+
+    @property
+    def subcommands(self) -> List[str]:
+        return [command[2] for command in self.commands]
+
+
+@pytest.fixture
+def docker_config(tmp_path: Path) -> Iterator[Path]:
+    with mock.patch.dict("os.environ", {"DOCKER_CONFIG": str(tmp_path)}):
+        yield tmp_path
+
+
+def test_parse_builder() -> None:
+    builder = Docker.parse_builder(
+        BUILDER_INSPECT.format(
+            driver="remote", endpoint="tcp://buildkitd:1234", status="running"
+        )
+    )
+
+    assert builder.name == "kolgabk"
+    assert builder.driver == "remote"
+    assert builder.endpoints == ["tcp://buildkitd:1234"]
+    assert builder.running
+
+
+def test_setup_buildkit_reuses_builder(docker_config: Path) -> None:
+    fake_buildx = FakeBuildx(
+        {
+            "driver": "docker-container",
+            "endpoint": "unix:///var/run/docker.sock",
+            "status": "running",
+        }
+    )
+    with mock.patch("kolga.libs.docker.run_os_command", fake_buildx):
+        Docker().setup_buildkit(name="kolgabk", endpoint="")
+
+    assert fake_buildx.subcommands == ["inspect", "use"]
+
+
+def test_setup_buildkit_creates_builder(docker_config: Path) -> None:
+    fake_buildx = FakeBuildx()
+    with mock.patch("kolga.libs.docker.run_os_command", fake_buildx):
+        Docker().setup_buildkit(name="kolgabk", endpoint="", gc_keep_storage="1GiB")
+
+    config_path = docker_config / "buildx" / "kolga" / "kolgabk.toml"
+    assert "keepBytes = 1073741824" in config_path.read_text()
+    assert fake_buildx.subcommands == ["inspect", "create"]
+    assert fake_buildx.commands[-1] == [
+        "docker",
+        "buildx",
+        "create",
+        "--name",
+        "kolgabk",
+        "--use",
+        "--config",
+        str(config_path),
+    ]
+
+
+@pytest.mark.parametrize(
+    "builder, endpoint",
+    [
+        # Not running
+        ({"driver": "docker-container", "endpoint": "default", "status": "error"}, ""),
+        # Local builder, remote daemon wanted
+        (
+            {"driver": "docker-container", "endpoint": "default", "status": "running"},
+            "tcp://buildkitd:1234",
+        ),
+    ],
+)
+def test_setup_buildkit_recreates_builder(
+    docker_config: Path, builder: Dict[str, str], endpoint: str
+) -> None:
+    fake_buildx = FakeBuildx(builder)
+    with mock.patch("kolga.libs.docker.run_os_command", fake_buildx):
+        Docker().setup_buildkit(name="kolgabk", endpoint=endpoint)
+
+    assert fake_buildx.subcommands == ["inspect", "rm", "create"]
+    assert fake_buildx.commands[1] == [
+        "docker",
+        "buildx",
+        "rm",
+        "--keep-state",
+        "kolgabk",
+    ]
+    if endpoint:
+        assert fake_buildx.commands[2][-3:] == ["--driver", "remote", endpoint]
+
+
+def test_setup_buildkit_config_changed(docker_config: Path) -> None:
+    fake_buildx = FakeBuildx(
+        {"driver": "docker-container", "endpoint": "default", "status": "running"}
+    )
+    with mock.patch("kolga.libs.docker.run_os_command", fake_buildx):
+        Docker().setup_buildkit(name="kolgabk", endpoint="", gc_keep_storage="1GiB")
+        Docker().setup_buildkit(name="kolgabk", endpoint="", gc_keep_storage="1GiB")
+
+    assert fake_buildx.subcommands == ["inspect", "rm", "create", "inspect", "use"]
+
+
+def test_get_platform_builders() -> None:
+    builders = Docker().get_platform_builders(
+        ["linux/amd64", "linux/arm64", "linux/arm/v7", "linux/s390x"],
+        nodes=["linux/amd64=tcp://amd64-buildkitd:1234", "linux/arm64=arm-builder"],
+        name="kolgabk",
+    )
+
+    assert builders == {
+        "kolgabk-linux-amd64": ["linux/amd64"],
+        "arm-builder": ["linux/arm64"],
+        # Platforms without a native node are emulated on the default builder
+        "kolgabk": ["linux/arm/v7", "linux/s390x"],
+    }
+
+
+def test_get_platform_nodes_invalid() -> None:
+    with pytest.raises(ValueError):
+        Docker.get_platform_nodes(["linux/arm64"])
+
+
+def test_build_stage_fan_out() -> None:
+    commands: List[List[str]] = []
+
+    def fake_run(
+        command: List[str],
+        shell: bool = False,
+        log_artifact: str = "",
+        retry: bool = False,
+    ) -> SubprocessResult:
+        commands.append(command)
+        for arg in command:
+            if arg.startswith("--metadata-file="):
+                builder = next(a for a in command if a.startswith("--builder="))
+                digest = f"sha256:{builder.replace('=', '-').split('-')[-1]}"
+                Path(arg.split("=", 1)[1]).write_text(
+                    f'{{"containerimage.digest": "{digest}"}}'
+                )
+        return SubprocessResult(out="", err="", return_code=0, child=None, command="")
+
+    platforms = ["linux/amd64", "linux/arm64"]
+    nodes = ["linux/arm64=tcp://arm64-buildkitd:1234"]
+    with override_settings(
+        DOCKER_BUILD_PLATFORMS=platforms, BUILDKIT_PLATFORM_NODES=nodes
+    ), mock.patch("kolga.libs.docker.run_os_command", fake_run):
+        d = Docker()
+        image = d.build_stage(stage="", final_image=True, disable_cache=True)
+
+    builds = [command for command in commands if command[2] == "build"]
+    assert len(builds) == 2
+    assert {
+        next(a for a in build if a.startswith("--platform=")) for build in builds
+    } == {"--platform=linux/amd64", "--platform=linux/arm64"}
+
+    merge_command = commands[-1]
+    assert merge_command[:4] == ["docker", "buildx", "imagetools", "create"]
+    assert merge_command[-2:] == [
+        f"{d.image_repo}@sha256:kolgabk",
+        f"{d.image_repo}@sha256:arm64",
+    ]
+    assert [f"--tag={d.image_repo}:{tag}" for tag in image.tags] == merge_command[4:-2]
+
+
+def test_build_stage_single_native_node() -> None:
+    commands: List[List[str]] = []
+
+    def fake_run(
+        command: List[str],
+        shell: bool = False,
+        log_artifact: str = "",
+        retry: bool = False,
+    ) -> SubprocessResult:
+        commands.append(command)
+        return SubprocessResult(out="", err="", return_code=0, child=None, command="")
+
+    nodes = ["linux/arm64=tcp://arm64-buildkitd:1234"]
+    with override_settings(
+        DOCKER_BUILD_PLATFORMS=["linux/arm64"], BUILDKIT_PLATFORM_NODES=nodes
+    ), mock.patch("kolga.libs.docker.run_os_command", fake_run):
+        d = Docker()
+        d.build_stage(stage="", final_image=True, disable_cache=True)
+
+    # The only platform is built on its native node instead of being emulated
+    (build,) = [command for command in commands if command[2] == "build"]
+    assert "--builder=kolgabk-linux-arm64" in build
+    assert "--platform=linux/arm64" in build
+
+
+def test_get_build_command_log_lines() -> None:
+    d = Docker()
+    log_lines: List[str] = []
+    with mock.patch("kolga.libs.docker.logger") as mock_logger:
+        d._get_build_command("", "", disable_cache=False, log_lines=log_lines)
+
+    # Parallel builds log the lines themselves after the builds are done
+    mock_logger.info.assert_not_called()
+    assert any("Cache from" in line for line in log_lines)
+
+
+@pytest.mark.parametrize(
+    "ref, export_mode, branch_export_mode, expected",
+    [
+        ("master", "max", "", "max"),
+        ("feature/x", "max", "", "max"),
+        ("master", "max", "min", "max"),
+        ("feature/x", "max", "min", "min"),
+        ("feature/x", "max", "NONE", "none"),
+    ],
+)
+def test_get_cache_export_mode(
+    ref: str, export_mode: str, branch_export_mode: str, expected: str
+) -> None:
+    with override_settings(
+        GIT_DEFAULT_TARGET_BRANCH="master",
+        BUILDKIT_CACHE_EXPORT_MODE=export_mode,
+        BUILDKIT_CACHE_BRANCH_EXPORT_MODE=branch_export_mode,
+    ):
+        assert Docker.get_cache_export_mode(ref) == expected
+
+
+def test_get_cache_export_mode_invalid() -> None:
+    with override_settings(BUILDKIT_CACHE_EXPORT_MODE="maximum"):
+        with pytest.raises(ValueError):
+            Docker.get_cache_export_mode("master")
+
+
+CACHE_MANIFEST = """{
+  "schemaVersion": 2,
+  "mediaType": "application/vnd.oci.image.manifest.v1+json",
+  "layers": [
+    {"mediaType": "application/vnd.oci.image.layer.v1.tar+gzip", "size": 1024},
+    {"mediaType": "application/vnd.oci.image.layer.v1.tar+gzip", "size": 2048}
+  ]
+}"""
+
+
+@pytest.mark.parametrize(
+    "branch_export_mode, shared_export, expected_exports",
+    [
+        # The development stage is covered by the export of the final stage
+        ("", True, {"development": None, "": "max"}),
+        ("", False, {"development": "max", "": "max"}),
+        ("min", True, {"development": "min", "": "min"}),
+        ("none", True, {"development": None, "": None}),
+    ],
+)
+def test_cache_export_policy(
+    branch_export_mode: str,
+    shared_export: bool,
+    expected_exports: Dict[str, Optional[str]],
+) -> None:
+    commands: List[List[str]] = []
+
+    def fake_run(
+        command: List[str],
+        shell: bool = False,
+        log_artifact: str = "",
+        retry: bool = False,
+    ) -> SubprocessResult:
+        commands.append(command)
+        out = CACHE_MANIFEST if "imagetools" in command else ""
+        return SubprocessResult(out=out, err="", return_code=0, child=None, command="")
+
+    with tempfile.NamedTemporaryFile() as f, override_settings(
+        GIT_COMMIT_REF_NAME="feature/x",
+        GIT_DEFAULT_TARGET_BRANCH="master",
+        BUILDKIT_CACHE_BRANCH_EXPORT_MODE=branch_export_mode,
+        BUILDKIT_CACHE_SHARED_EXPORT=shared_export,
+        DOCKER_TEST_IMAGE_STAGE="development",
+        DOCKER_BUILD_CONTEXT_ANALYZE=False,
+    ), mock.patch("kolga.libs.docker.run_os_command", fake_run):
+        f.write(b"FROM python AS base\nFROM base AS development\nFROM development\n")
+        f.flush()
+        d = Docker()
+        d.dockerfile = Path(f.name)
+        d.build_stages(push_images=False)
+
+    builds = [command for command in commands if command[2] == "build"]
+    exports = {}
+    for build in builds:
+        stage = next(a for a in build if a.startswith("--target="))[len("--target=") :]
+        cache_to = [a for a in build if a.startswith("--cache-to=")]
+        exports[stage] = (
+            cache_to[0].split("mode=")[1].split(",")[0] if cache_to else None
+        )
+    assert exports == expected_exports
+
+    inspections = [command for command in commands if "imagetools" in command]
+    assert len(inspections) == len([mode for mode in exports.values() if mode])
+
+
+@pytest.mark.parametrize("shared_export", [True, False])
+def test_platform_build_imports_shared_cache(shared_export: bool) -> None:
+    with tempfile.NamedTemporaryFile() as f, override_settings(
+        GIT_COMMIT_REF_NAME="feature/x",
+        GIT_DEFAULT_TARGET_BRANCH="master",
+        BUILDKIT_CACHE_SHARED_EXPORT=shared_export,
+        DOCKER_TEST_IMAGE_STAGE="development",
+    ):
+        f.write(b"FROM python AS base\nFROM base AS development\nFROM development\n")
+        f.flush()
+        d = Docker()
+        d.dockerfile = Path(f.name)
+        build_command = d._get_build_command(
+            "development",
+            "development-linux-arm64",
+            disable_cache=False,
+            platforms=["linux/arm64"],
+        )
+
+    cache_from = [
+        a[len("--cache-from=type=registry,ref=") :]
+        for a in build_command
+        if a.startswith("--cache-from=")
+    ]
+    cache_to = [a for a in build_command if a.startswith("--cache-to=")]
+    assert bool(cache_to) != shared_export
+    for ref in (None, "master"):
+        assert d.create_cache_tag("development-linux-arm64", ref=ref) in cache_from
+        # The final stage exports the cache of the development stage
+        shared_tag = d.create_cache_tag("linux-arm64", ref=ref)
+        assert (shared_tag in cache_from) == shared_export
+
+
+def test_get_cache_export_size() -> None:
+    with mock.patch(
+        "kolga.libs.docker.run_os_command",
+        return_value=SubprocessResult(
+            out=CACHE_MANIFEST, err="", return_code=0, child=None, command=""
+        ),
+    ):
+        assert Docker.get_cache_export_size("registry/cache:master") == (2, 3072)
+
+
 # =====================================================
 # DOCKER REGISTRY REQUIRED FROM THIS POINT FORWARD
 # =====================================================
@@ -0,0 +1,166 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import pytest
+from kubernetes import client as k8s_client
+
+from kolga.libs.environment_reaper import EnvironmentReaper, RateLimiter
+from kolga.utils.general import KUBERNETES_LABEL_DATETIME_FORMAT
+
+NOW = datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+LABELS = {"app": "kubed", "kolga.io/project_id": "1"}
+
+
+def _deployment(track: str, age: timedelta) -> k8s_client.V1Deployment:
+    deployed = (NOW - age).strftime(KUBERNETES_LABEL_DATETIME_FORMAT)
+    return k8s_client.V1Deployment(
+        metadata=k8s_client.V1ObjectMeta(name=f"app-{track}"),
+        spec=k8s_client.V1DeploymentSpec(
+            selector=k8s_client.V1LabelSelector(),
+            template=k8s_client.V1PodTemplateSpec(
+                metadata=k8s_client.V1ObjectMeta(
+                    labels={"track": track, "deploymentTime": deployed}
+                )
+            ),
+        ),
+    )
+
+
+class FakeKubernetesApi:
+    """
+    In-memory stand-in for the parts of ``CoreV1Api`` and ``AppsV1Api`` used by
+    the environment reaper
+    """
+
+    def __init__(self) -> None:
+        self.namespaces: Dict[str, Dict[str, str]] = {}
+        self.deployments: Dict[str, List[k8s_client.V1Deployment]] = {}
+
+    def add(
+        self,
+        namespace: str,
+        deployments: List[k8s_client.V1Deployment],
+        labels: Dict[str, str] = LABELS,
+    ) -> None:
+        self.namespaces[namespace] = labels
+        self.deployments[namespace] = deployments
+
+    def list_namespace(self, label_selector: str) -> k8s_client.V1NamespaceList:
+        selector = dict(item.split("=") for item in label_selector.split(","))
+        items = [
+            k8s_client.V1Namespace(metadata=k8s_client.V1ObjectMeta(name=name))
+            for name, labels in self.namespaces.items()
+            if all(labels.get(key) == value for key, value in selector.items())
+        ]
+        return k8s_client.V1NamespaceList(items=items)
+
+    def list_namespaced_deployment(self, namespace: str) -> k8s_client.V1DeploymentList:
+        return k8s_client.V1DeploymentList(items=self.deployments[namespace])
+
+
+@pytest.fixture
+def api() -> FakeKubernetesApi:
+    api = FakeKubernetesApi()
+    api.add("review-stale", [_deployment("review", timedelta(days=20))])
+    api.add(
+        "review-active",
+        [
+            _deployment("review", timedelta(days=20)),
+            _deployment("review", timedelta(days=1)),
+        ],
+    )
+    api.add("production", [_deployment("stable", timedelta(days=60))])
+    api.add("empty", [])
+    api.add(
+        "other-project",
+        [_deployment("review", timedelta(days=20))],
+        labels={"app": "kubed", "kolga.io/project_id": "2"},
+    )
+    return api
+
+
+def _reaper(api: FakeKubernetesApi) -> EnvironmentReaper:
+    return EnvironmentReaper(
+        core_v1=api,
+        apps_v1=api,
+        labels=LABELS,
+        max_age=timedelta(days=14),
+        tracks=["review"],
+    )
+
+
+def test_list_environments(api: FakeKubernetesApi) -> None:
+    environments = {
+        environment.namespace: environment
+        for environment in _reaper(api).list_environments(now=NOW)
+    }
+
+    assert sorted(environments) == [
+        "empty",
+        "production",
+        "review-active",
+        "review-stale",
+    ]
+    assert [name for name, env in environments.items() if env.stale] == ["review-stale"]
+    assert environments["review-active"].last_deployment == NOW - timedelta(days=1)
+    assert environments["production"].tracks == ["stable"]
+
+
+def test_reap(api: FakeKubernetesApi) -> None:
+    deleted: List[str] = []
+    _reaper(api).reap(delete=deleted.append, now=NOW)
+
+    assert deleted == ["review-stale"]
+
+
+def test_reap_dry_run(api: FakeKubernetesApi) -> None:
+    deleted: List[str] = []
+    environments = _reaper(api).reap(delete=deleted.append, dry_run=True, now=NOW)
+
+    assert not deleted
+    assert [
+        environment.namespace for environment in environments if environment.stale
+    ] == ["review-stale"]
+
+
+def test_reap_failure_does_not_stop_others(api: FakeKubernetesApi) -> None:
+    api.add("review-broken", [_deployment("review", timedelta(days=30))])
+    deleted: List[str] = []
+
+    def delete(namespace: str) -> None:
+        if namespace == "review-broken":
+            raise Exception("Namespace deletion failed")
+        deleted.append(namespace)
+
+    _reaper(api).reap(delete=delete, now=NOW)
+
+    assert deleted == ["review-stale"]
+
+
+def test_reap_concurrently(api: FakeKubernetesApi) -> None:
+    for i in range(4):
+        api.add(f"review-{i}", [_deployment("review", timedelta(days=30))])
+    barrier = threading.Barrier(4, timeout=5)
+    deleted: List[str] = []
+
+    def delete(namespace: str) -> None:
+        if namespace != "review-stale":
+            # Blocks unless four removals run at the same time
+            barrier.wait()
+        deleted.append(namespace)
+
+    _reaper(api).reap(delete=delete, concurrency=4, now=NOW)
+
+    assert len(deleted) == 5
+
+
+def test_rate_limiter() -> None:
+    rate_limiter = RateLimiter(rate=60 * 20)
+    started = time.monotonic()
+    for _ in range(4):
+        rate_limiter.wait()
+
+    # Calls are spaced 50 ms apart, the first one going through right away
+    assert time.monotonic() - started >= 0.15
@@ -0,0 +1,118 @@
+import subprocess
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+import pytest
+
+from kolga.libs.git import Git
+
+STATUS = (
+    " 1111111111111111111111111111111111111111 current (heads/main)\n"
+    " 2222222222222222222222222222222222222222 parent (heads/main)\n"
+    "+3333333333333333333333333333333333333333 parent/nested (heads/main)\n"
+    "-4444444444444444444444444444444444444444 uninitialized\n"
+)
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, encoding="UTF-8"
+    ).stdout
+
+
+@pytest.fixture
+def superproject(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """
+    A clone of a repository with a submodule, using a global config of its own
+    """
+    global_config = tmp_path / "gitconfig"
+    global_config.write_text(
+        "[protocol]\n\tallow = always\n[user]\n\tname = Test\n\temail = test@example.com\n"
+    )
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", str(global_config))
+
+    submodule = tmp_path / "submodule"
+    submodule.mkdir()
+    _git(submodule, "init", "--quiet")
+    (submodule / "README").write_text("submodule")
+    _git(submodule, "add", "README")
+    _git(submodule, "commit", "--quiet", "-m", "Initial commit")
+
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    _git(upstream, "init", "--quiet")
+    _git(upstream, "submodule", "--quiet", "add", str(submodule), "lib")
+    _git(upstream, "commit", "--quiet", "-m", "Add submodule")
+
+    _git(tmp_path, "clone", "--quiet", str(upstream), "clone")
+    clone = tmp_path / "clone"
+    monkeypatch.chdir(clone)
+    return clone
+
+
+def test_parse_submodule_status() -> None:
+    submodules = Git.parse_submodule_status(STATUS)
+
+    assert submodules["current"] == (" ", "1" * 40)
+    assert submodules["parent/nested"] == ("+", "3" * 40)
+    assert submodules["uninitialized"] == ("-", "4" * 40)
+
+
+def test_get_paths_to_update() -> None:
+    submodules = Git.parse_submodule_status(STATUS)
+
+    assert Git.get_paths_to_update(submodules) == ["parent", "uninitialized"]
+
+
+@pytest.mark.parametrize(
+    "safe_directories, expected_calls",
+    [("", 2), ("/elsewhere\n", 2), ("/elsewhere\n/project\n", 1)],
+)
+def test_safe_directory_added_once(
+    safe_directories: str, expected_calls: int, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("os.getcwd", lambda: "/project")
+    run_os_command = mock.MagicMock(
+        **{"return_value.return_code": 0, "return_value.out": safe_directories}
+    )
+    with mock.patch("kolga.libs.git.run_os_command", run_os_command):
+        Git()
+
+    assert run_os_command.call_count == expected_calls
+
+
+def test_update_submodules(superproject: Path) -> None:
+    g = Git()
+    g.update_submodules(depth=1)
+
+    assert (superproject / "lib" / "README").read_text() == "submodule"
+    assert not Git.get_paths_to_update(g.get_submodule_status())
+    assert _git(superproject, "config", "--global", "--get-all", "safe.directory") == (
+        f"{superproject}\n"
+    )
+
+    # Nothing is run besides the status check when everything is up to date
+    commands: List[List[str]] = []
+
+    def run_os_command(command: List[str]) -> mock.MagicMock:
+        commands.append(command)
+        return mock.MagicMock(return_code=0, out="")
+
+    with mock.patch("kolga.libs.git.run_os_command", side_effect=run_os_command):
+        Git().update_submodules()
+    assert all("update" not in command for command in commands)
+
+
+def test_update_submodules_reference_cache(superproject: Path, tmp_path: Path) -> None:
+    cache = tmp_path / "cache"
+    _, sha = Git.parse_submodule_status(_git(superproject, "submodule", "status"))[
+        "lib"
+    ]
+
+    Git().update_submodules(reference_cache=str(cache))
+
+    assert (superproject / "lib" / "README").read_text() == "submodule"
+    assert _git(cache, "cat-file", "-t", sha) == "commit\n"
+    # The objects are copied from the cache
+    assert not list(superproject.glob(".git/modules/lib/objects/info/alternates"))
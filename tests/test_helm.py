@@ -1,8 +1,12 @@
 import os
+from typing import cast
+from unittest import mock
 
 import pytest
+import yaml
 
 from kolga.libs.helm import Helm
+from kolga.utils.models import HelmValues, SubprocessResult
 
 
 @pytest.mark.parametrize(
@@ -48,6 +52,24 @@ def test_get_chart_params() -> None:
     assert Helm.get_chart_params("--set", values) == expected
 
 
+def test_upgrade_chart_values_stdin() -> None:
+    values = cast(
+        HelmValues, {"image": {"tag": "8.0"}, "initdbScripts": {"api.sql": "A;\nB;"}}
+    )
+    result = SubprocessResult(out="", err="", return_code=0, child=None, command="")
+
+    with mock.patch(
+        "kolga.libs.helm.run_os_command", return_value=result
+    ) as run_os_command:
+        Helm().upgrade_chart(
+            name="mysql", values=values, namespace="testing", chart="testing/mysql"
+        )
+
+    args, kwargs = run_os_command.call_args
+    assert args[0][-4:] == ["--values", "-", "mysql", "testing/mysql"]
+    assert yaml.safe_load(kwargs["input"]) == values
+
+
 class TestHelmRegistryFunctions:
     helm_repo_name = "localhelm"
     helm_repo_url = os.environ.get("TEST_HELM_REGISTRY", "http://localhost:8080")
@@ -13,7 +13,7 @@ from kolga.libs.kubernetes import Kubernetes
 from kolga.libs.project import Project
 from kolga.plugins.base import PluginBase
 from kolga.settings import settings
-from tests.testcase import load_plugin
+from tests.testcase import load_plugin, override_settings
 
 
 class _TestPlugin(PluginBase):
@@ -76,6 +76,10 @@ def call_tracking_plugin_factory() -> Tuple[Type[PluginBase], OrderedDict[str, b
         ) -> Optional[bool]:
             return append_hook_call(exception is None)
 
+        @hookimpl
+        def container_build_context_analyzed(self) -> Optional[bool]:
+            return append_hook_call()
+
         @hookimpl
         def container_build_stage_begin(self) -> Optional[bool]:
             return append_hook_call()
@@ -123,6 +127,7 @@ def test_lifecycle_hook_calls() -> None:
     image = mock.MagicMock()
     ns = track = "testing"
     project = mock.MagicMock()
+    report = mock.MagicMock()
     service = mock.MagicMock()
     stage = mock.MagicMock()
 
@@ -131,6 +136,7 @@ def test_lifecycle_hook_calls() -> None:
         # Container build hooks
         settings.plugin_manager.hook.container_build_begin()
         settings.plugin_manager.hook.container_build_complete(exception=None)
+        settings.plugin_manager.hook.container_build_context_analyzed(report=report)
         settings.plugin_manager.hook.container_build_stage_begin(
             image=image, stage=stage
         )
@@ -162,6 +168,7 @@ def test_lifecycle_hook_calls() -> None:
     assert [*hook_calls.keys()] == [
         "container_build_begin",
         "container_build_complete",
+        "container_build_context_analyzed",
         "container_build_stage_begin",
         "container_build_stage_complete",
         "git_submodule_update_begin",
@@ -178,11 +185,12 @@ def test_lifecycle_hooks_build(_: mock.MagicMock) -> None:
     d = Docker()
 
     Plugin, hook_calls = call_tracking_plugin_factory()
-    with load_plugin(Plugin):
+    with load_plugin(Plugin), override_settings(DOCKER_BUILD_CONTEXT_ANALYZE=True):
         d.build_stages()
 
     assert [*hook_calls.keys()] == [
         "container_build_begin",
+        "container_build_context_analyzed",
         "container_build_stage_begin",
         "container_build_stage_complete",
         "container_build_complete",
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from typing import Dict, List
+from unittest import mock
+
+import pytest
+
+from kolga.libs.image_puller import ImagePuller
+from kolga.utils.models import SubprocessResult
+
+IMAGE = "registry.example.com:5000/project:abc123"
+INDEX_DIGEST = "sha256:" + "a" * 64
+MANIFEST_DIGEST = "sha256:" + "b" * 64
+LAYERS = {
+    "sha256:" + "1" * 64: 1000,
+    "sha256:" + "2" * 64: 2000,
+    "sha256:" + "3" * 64: 4000,
+}
+
+
+class FakeDocker:
+    """
+    Answers the ``docker`` commands run by :class:`ImagePuller`
+    """
+
+    def __init__(self, local_digests: Dict[str, List[str]]) -> None:
+        self.local_digests = local_digests
+        self.pulled: List[str] = []
+        self.active_pulls = 0
+        self.max_active_pulls = 0
+        self.lock = threading.Lock()
+
+    def _pull(self, image: str) -> str:
+        with self.lock:
+            self.active_pulls += 1
+            self.max_active_pulls = max(self.max_active_pulls, self.active_pulls)
+        time.sleep(0.05)
+        with self.lock:
+            self.active_pulls -= 1
+            self.pulled.append(image)
+        return (
+            f"abc123: Pulling from project\n"
+            f"{'1' * 12}: Already exists\n"
+            f"{'2' * 12}: Pull complete\n"
+            f"{'3' * 12}: Pull complete\n"
+            f"Digest: {INDEX_DIGEST}\n"
+        )
+
+    def _manifest(self, image: str) -> Dict[str, object]:
+        if image.endswith(f"@{MANIFEST_DIGEST}"):
+            return {
+                "digest": MANIFEST_DIGEST,
+                "layers": [
+                    {"digest": digest, "size": size} for digest, size in LAYERS.items()
+                ],
+            }
+        return {
+            "digest": INDEX_DIGEST,
+            "manifests": [
+                {
+                    "digest": "sha256:" + "c" * 64,
+                    "platform": {"os": "linux", "architecture": "arm64"},
+                },
+                {
+                    "digest": MANIFEST_DIGEST,
+                    "platform": {"os": "linux", "architecture": "amd64"},
+                },
+            ],
+        }
+
+    def __call__(self, command: List[str], retry: bool = False) -> SubprocessResult:
+        image = command[-1]
+        out, return_code = "", 0
+        if command[1:3] == ["buildx", "imagetools"]:
+            out = json.dumps(self._manifest(image))
+        elif command[1:3] == ["image", "inspect"]:
+            if image in self.local_digests:
+                digests = [f"{image}@{d}" for d in self.local_digests[image]]
+                out = json.dumps(digests)
+            else:
+                return_code = 1
+        elif command[1] == "version":
+            out = "linux/amd64\n"
+        elif command[1] == "pull":
+            if "missing" in image:
+                return_code = 1
+            else:
+                out = self._pull(image)
+        return SubprocessResult(
+            out=out, err="", return_code=return_code, child=None, command=""
+        )
+
+
+@pytest.mark.parametrize(
+    "image, expected",
+    [
+        ("project", "project"),
+        ("project:tag", "project"),
+        ("registry.example.com:5000/project", "registry.example.com:5000/project"),
+        (IMAGE, "registry.example.com:5000/project"),
+        (f"project@{INDEX_DIGEST}", "project"),
+    ],
+)
+def test_get_repository(image: str, expected: str) -> None:
+    assert ImagePuller.get_repository(image) == expected
+
+
+def test_pull_image() -> None:
+    fake_docker = FakeDocker(local_digests={})
+    with mock.patch("kolga.libs.image_puller.run_os_command", fake_docker):
+        result = ImagePuller().pull_image(IMAGE)
+
+    assert result.success
+    assert not result.skipped
+    assert result.digest == INDEX_DIGEST
+    # The first layer already existed locally
+    assert result.bytes_transferred == 6000
+    assert fake_docker.pulled == [IMAGE]
+
+
+def test_pull_image_skips_current_digest() -> None:
+    fake_docker = FakeDocker(local_digests={IMAGE: [INDEX_DIGEST]})
+    with mock.patch("kolga.libs.image_puller.run_os_command", fake_docker):
+        result = ImagePuller().pull_image(IMAGE)
+
+    assert result.success
+    assert result.skipped
+    assert result.bytes_transferred == 0
+    assert not fake_docker.pulled
+
+
+def test_pull_image_outdated_digest() -> None:
+    fake_docker = FakeDocker(local_digests={IMAGE: ["sha256:" + "0" * 64]})
+    with mock.patch("kolga.libs.image_puller.run_os_command", fake_docker):
+        result = ImagePuller().pull_image(IMAGE)
+
+    assert not result.skipped
+    assert fake_docker.pulled == [IMAGE]
+
+
+def test_pull_images() -> None:
+    images = [f"registry.example.com/project-{i}:latest" for i in range(6)]
+    fake_docker = FakeDocker(local_digests={images[0]: [INDEX_DIGEST]})
+
+    with mock.patch("kolga.libs.image_puller.run_os_command", fake_docker):
+        results = ImagePuller(concurrency=2).pull_images(
+            [*images, images[1], "registry.example.com/missing:latest"]
+        )
+
+    assert [result.image for result in results] == [
+        *images,
+        "registry.example.com/missing:latest",
+    ]
+    assert results[0].skipped
+    assert not results[-1].success
+    assert sorted(fake_docker.pulled) == images[1:]
+    assert fake_docker.max_active_pulls == 2
@@ -2,14 +2,24 @@ import base64
 import os
 import tempfile
 from pathlib import Path
+from unittest import mock
 
 import pytest
 from kubernetes.client.rest import ApiException
 
-from kolga.libs.kubernetes import Kubernetes
+from kolga.libs.kubernetes import (
+    SHARED_DATABASE_ENVIRONMENT_LABEL,
+    SHARED_DATABASE_RELEASE_LABEL,
+    SHARED_DATABASE_SERVICE_LABEL,
+    Kubernetes,
+)
 from kolga.libs.project import Project
+from kolga.libs.service import Service
+from kolga.libs.services.postresql import PostgresqlService
+from kolga.utils.exceptions import ImproperlyConfigured
 from kolga.utils.general import get_deploy_name
 from kolga.utils.models import BasicAuthUser
+from tests.testcase import override_settings
 
 DEFAULT_TRACK = os.environ.get("DEFAULT_TRACK", "stable")
 K8S_NAMESPACE = os.environ.get("K8S_NAMESPACE", "testing")
@@ -62,6 +72,171 @@ def test__b64_encode_file() -> None:
         assert Kubernetes._b64_encode_file(path=path) == expected
 
 
+@mock.patch("kolga.libs.kubernetes.Kubernetes.create_client")
+def test_get_certification_issuer(_: mock.MagicMock) -> None:
+    k = Kubernetes(track=DEFAULT_TRACK)
+    k.cluster_metadata = mock.MagicMock(
+        **{"has_cluster_issuer.side_effect": lambda name: name.endswith("stable")}
+    )
+
+    assert k.get_certification_issuer(track="stable") == (
+        "certificate-letsencrypt-stable"
+    )
+    assert k.get_certification_issuer(track="review") is None
+
+
+@mock.patch("kolga.libs.kubernetes.PrometheusSource")
+@mock.patch("kolga.libs.kubernetes.k8s_client.AppsV1Api")
+@mock.patch("kolga.libs.kubernetes.Kubernetes.create_client")
+def test_get_resource_usage_prometheus(
+    _: mock.MagicMock, mock_apps_v1: mock.MagicMock, mock_source: mock.MagicMock
+) -> None:
+    deployment = mock.MagicMock()
+    deployment.metadata.name = "review-1-review"
+    list_namespaced_deployment = mock_apps_v1.return_value.list_namespaced_deployment
+    list_namespaced_deployment.return_value.items = [deployment]
+    k = Kubernetes(track=DEFAULT_TRACK)
+    project = Project(track=DEFAULT_TRACK, deploy_name="review-1")
+
+    with override_settings(K8S_METRICS_PROMETHEUS_URL="http://prometheus:9090"):
+        k.get_resource_usage(project=project, namespace=K8S_NAMESPACE)
+
+    list_namespaced_deployment.assert_called_once_with(
+        K8S_NAMESPACE, label_selector="release=review-1"
+    )
+    pod_regex = mock_source.call_args.kwargs["pod_regex"]
+    assert pod_regex.startswith("(review\\-1\\-review)-")
+
+    # Nothing is read without Deployments of the release
+    list_namespaced_deployment.return_value.items = []
+    mock_source.reset_mock()
+    with override_settings(K8S_METRICS_PROMETHEUS_URL="http://prometheus:9090"):
+        usage = k.get_resource_usage(project=project, namespace=K8S_NAMESPACE)
+    assert not usage.cpu_cores
+    mock_source.assert_not_called()
+
+
+@mock.patch("kolga.libs.kubernetes.Kubernetes.create_client")
+def test_persistent_storage_class_validation(_: mock.MagicMock) -> None:
+    k = Kubernetes(track=DEFAULT_TRACK)
+    k.cluster_metadata = mock.MagicMock(
+        **{
+            "has_cluster_issuer.return_value": False,
+            "has_storage_class.return_value": False,
+        }
+    )
+    project = Project(track=DEFAULT_TRACK, url="example.com")
+
+    with override_settings(K8S_PERSISTENT_STORAGE=True):
+        with pytest.raises(ImproperlyConfigured):
+            k.get_application_deployment_values(
+                namespace=K8S_NAMESPACE, project=project, track=DEFAULT_TRACK
+            )
+
+        # Validation is skipped when the StorageClasses can not be listed
+        k.cluster_metadata.has_storage_class.return_value = None
+        values = k.get_application_deployment_values(
+            namespace=K8S_NAMESPACE, project=project, track=DEFAULT_TRACK
+        )
+    assert values["application"]["pvc"]["storageClass"] == "standard"
+
+
+@mock.patch("kolga.libs.kubernetes.run_os_command", **{"return_value.return_code": 0})  # type: ignore
+@mock.patch("kolga.libs.kubernetes.k8s_client.CoreV1Api")
+@mock.patch("kolga.libs.kubernetes.Kubernetes.create_client")
+def test_deploy_shared_database_service(
+    _: mock.MagicMock, core_v1_api: mock.MagicMock, run_os_command: mock.MagicMock
+) -> None:
+    core_v1_api.return_value.read_namespaced_config_map.side_effect = ApiException(
+        status=404
+    )
+    k = Kubernetes(track=DEFAULT_TRACK)
+    k.helm = mock.MagicMock(**{"release_exists.return_value": False})
+
+    service = PostgresqlService(track=DEFAULT_TRACK, shared_server=True)
+    service.add_prerequisite(
+        Service(name="api", track=DEFAULT_TRACK, chart="testing/project")
+    )
+    service.setup_prerequisites()
+
+    k.deploy_service(service=service, namespace=K8S_NAMESPACE, track=DEFAULT_TRACK)
+
+    upgrade_kwargs = k.helm.upgrade_chart.call_args.kwargs
+    assert upgrade_kwargs["name"] == service.shared_release_name
+    assert upgrade_kwargs["values"] == service.get_shared_server_values()
+
+    config_map = core_v1_api.return_value.create_namespaced_config_map.call_args.kwargs[
+        "body"
+    ]
+    assert config_map.metadata.labels[SHARED_DATABASE_ENVIRONMENT_LABEL] == (
+        K8S_NAMESPACE
+    )
+    assert config_map.data == {
+        database.url.database: database.url.username
+        for database in service.databases.values()
+    }
+
+    exec_command = run_os_command.call_args.args[0]
+    assert exec_command[:2] == ["kubectl", "exec"]
+    assert f"service/{service.shared_release_name}" in exec_command
+
+
+@override_settings(SERVICE_WARM_POOL_SIZE=1)
+@mock.patch("kolga.libs.kubernetes.Kubernetes.deploy_warm_pool_service")
+@mock.patch("kolga.libs.kubernetes.Kubernetes.create_client")
+def test_deploy_service_warm_pool_multiple_dependents(
+    _: mock.MagicMock, deploy_warm_pool_service: mock.MagicMock
+) -> None:
+    k = Kubernetes(track=DEFAULT_TRACK)
+    k.helm = mock.MagicMock()
+
+    service = PostgresqlService(track=DEFAULT_TRACK)
+    for name in ("api", "worker"):
+        service.add_prerequisite(
+            Service(name=name, track=DEFAULT_TRACK, chart="testing/project")
+        )
+
+    k.deploy_service(service=service, namespace=K8S_NAMESPACE, track=DEFAULT_TRACK)
+
+    # Every dependent needs a database of its own
+    deploy_warm_pool_service.assert_not_called()
+    k.helm.upgrade_chart.assert_called_once()
+
+    service._prerequisite_of.pop()
+    k.deploy_service(service=service, namespace=K8S_NAMESPACE, track=DEFAULT_TRACK)
+
+    deploy_warm_pool_service.assert_called_once()
+
+
+@mock.patch("kolga.libs.kubernetes.run_os_command", **{"return_value.return_code": 0})  # type: ignore
+@mock.patch("kolga.libs.kubernetes.k8s_client.CoreV1Api")
+@mock.patch("kolga.libs.kubernetes.Kubernetes.create_client")
+def test_delete_shared_databases(
+    _: mock.MagicMock, core_v1_api: mock.MagicMock, run_os_command: mock.MagicMock
+) -> None:
+    config_map = mock.MagicMock(
+        data={"testing_api": "u1234"},
+        metadata=mock.MagicMock(
+            labels={
+                SHARED_DATABASE_ENVIRONMENT_LABEL: K8S_NAMESPACE,
+                SHARED_DATABASE_RELEASE_LABEL: "shared-stable-postgresql",
+                SHARED_DATABASE_SERVICE_LABEL: "postgresql",
+            }
+        ),
+    )
+    core_v1_api.return_value.list_namespaced_config_map.return_value.items = [
+        config_map
+    ]
+
+    k = Kubernetes(track=DEFAULT_TRACK)
+    k.delete_shared_databases(namespace=K8S_NAMESPACE)
+
+    exec_command = run_os_command.call_args.args[0]
+    assert "service/shared-stable-postgresql" in exec_command
+    assert 'DROP DATABASE IF EXISTS "testing_api";' in exec_command[-1]
+    core_v1_api.return_value.delete_namespaced_config_map.assert_called_once()
+
+
 @pytest.mark.k8s
 def test__create_basic_auth_data(kubernetes: Kubernetes) -> None:
     basic_auth_users = [
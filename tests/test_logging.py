@@ -1,10 +1,13 @@
+import json
+import re
+import time
 from typing import Any
 from unittest import mock
 
 import pytest
 
 from kolga.settings import settings
-from kolga.utils.logger import logger
+from kolga.utils.logger import LOG_FORMAT_JSON, BufferedWriter, Logger, logger
 from kolga.utils.models import SubprocessResult
 
 
@@ -18,8 +21,9 @@ from kolga.utils.models import SubprocessResult
 def test_debug_logging(debug: int, has_output: bool, capsys: Any) -> None:
     message = "Debug Test Message"
 
-    with mock.patch.object(settings, "KOLGA_DEBUG", debug):
+    with mock.patch.object(logger, "debug_enabled", bool(debug)):
         logger.debug(message=message)
+        logger.flush()
         captured = capsys.readouterr()
         if has_output:
             assert message in captured.err
@@ -47,8 +51,9 @@ def test_debug_std_logging(debug: int, has_output: bool, capsys: Any) -> None:
         command=command,
     )
 
-    with mock.patch.object(settings, "KOLGA_DEBUG", debug):
+    with mock.patch.object(logger, "debug_enabled", bool(debug)):
         logger.debug_std(result=result)
+        logger.flush()
         captured = capsys.readouterr()
         if has_output:
             assert out_message in captured.err
@@ -58,3 +63,125 @@ def test_debug_std_logging(debug: int, has_output: bool, capsys: Any) -> None:
             assert out_message not in captured.err
             assert err_message not in captured.err
             assert captured.err[2:9] != f"{command}: {return_code}"
+
+
+def test_debug_level_cached() -> None:
+    test_logger = Logger(debug=False)
+
+    with mock.patch.object(settings, "KOLGA_DEBUG", True):
+        assert not test_logger.debug_enabled
+
+    test_logger.configure(debug=True)
+    assert test_logger.debug_enabled
+
+
+def test_buffered_writer_size(capsys: Any) -> None:
+    writer = BufferedWriter(max_size=10, flush_interval=60)
+
+    writer.write("12345")
+    assert capsys.readouterr().err == ""
+
+    writer.write("67890")
+    assert capsys.readouterr().err == "1234567890"
+
+
+def test_buffered_writer_interval(capsys: Any) -> None:
+    writer = BufferedWriter(max_size=1000, flush_interval=0.01)
+
+    writer.write("message")
+    time.sleep(0.1)
+
+    assert capsys.readouterr().err == "message"
+
+
+def test_buffered_writer_unbuffered(capsys: Any) -> None:
+    writer = BufferedWriter(max_size=0)
+
+    writer.write("message")
+
+    assert capsys.readouterr().err == "message"
+
+
+def test_sections(capsys: Any) -> None:
+    test_logger = Logger()
+
+    with test_logger.do_section("Title", "section_name", collapsed=True):
+        test_logger.info("Inside")
+    test_logger.flush()
+
+    # GitLab section markers contain a carriage return
+    lines = capsys.readouterr().err.split("\n")
+    assert re.fullmatch(
+        r"section_start:\d+:section_name\[collapsed=true\]\r\x1b\[0KTitle", lines[0]
+    )
+    assert lines[1] == "Inside"
+    assert re.fullmatch(
+        r"section_end:\d+:section_name\[collapsed=true\]\r\x1b\[0K", lines[2]
+    )
+
+
+def test_json_format(capsys: Any) -> None:
+    test_logger = Logger(log_format=LOG_FORMAT_JSON)
+
+    with test_logger.do_section("Title", "section_name"):
+        test_logger.info(title="Checking: ", message="something", icon="🔨", end="")
+        test_logger.success()
+    with pytest.raises(Exception):
+        test_logger.error("Failed")
+
+    records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert [record["level"] for record in records] == [
+        "section_start",
+        "info",
+        "success",
+        "section_end",
+        "error",
+    ]
+    assert records[0]["section"] == "section_name"
+    assert records[1]["message"] == "Checking: something"
+    assert records[1]["icon"] == "🔨"
+    assert records[2]["message"] == "Done"
+
+
+def test_std_bounded_output(capsys: Any) -> None:
+    result = SubprocessResult(
+        out="\n".join(f"line {i}" for i in range(100)),
+        err="",
+        return_code=1,
+        child=None,
+        command="test",
+        log_file="/artifacts/logs/test.log.gz",
+    )
+    bounded_logger = Logger(output_head_lines=2, output_tail_lines=2)
+
+    bounded_logger.std(result, log_error=False)
+    bounded_logger.flush()
+    output = capsys.readouterr().err
+
+    assert "line 1\n... 96 lines omitted ...\nline 98" in output
+    assert "line 50" not in output
+    assert "Full output: /artifacts/logs/test.log.gz" in output
+
+    with pytest.raises(Exception) as exc_info:
+        bounded_logger.std(result, raise_exception=True, log_error=False)
+    assert "line 50" not in str(exc_info.value)
+
+
+def test_std_unbounded_output_without_log_file(capsys: Any) -> None:
+    result = SubprocessResult(
+        out="\n".join(f"line {i}" for i in range(100)),
+        err="",
+        return_code=1,
+        child=None,
+        command="test",
+    )
+    bounded_logger = Logger(output_head_lines=2, output_tail_lines=2)
+
+    bounded_logger.std(result, log_error=False)
+    bounded_logger.flush()
+    output = capsys.readouterr().err
+
+    # Without a log artifact the output would be lost if it was bounded
+    assert "line 50" in output
+    assert "lines omitted" not in output
+    assert "Full output" not in output
@@ -5,10 +5,40 @@ import pytest
 
 from kolga.libs.helm import Helm
 from kolga.libs.kubernetes import Kubernetes
+from kolga.libs.service import Service
 from kolga.libs.services.mysql import MysqlService
 
 DEFAULT_TRACK = os.environ.get("DEFAULT_TRACK", "stable")
 
+
+def test_shared_server_setup_prerequisites() -> None:
+    track = DEFAULT_TRACK
+    mysql_service = MysqlService(track=track, shared_server=True)
+    project = Service(name="api", track=track, chart="testing/project")
+    mysql_service.add_prerequisite(project)
+
+    mysql_service.setup_prerequisites()
+
+    # No init scripts are needed as databases are created with SQL
+    assert not mysql_service.values_files
+    url = mysql_service.databases[project].url
+    assert url.host.startswith(f"shared-{track}-mysql.")
+    assert len(url.username) <= 32
+
+
+def test_setup_prerequisites_initdb_scripts() -> None:
+    track = DEFAULT_TRACK
+    mysql_service = MysqlService(track=track)
+    project = Service(name="api", track=track, chart="testing/project")
+    mysql_service.add_prerequisite(project)
+
+    mysql_service.setup_prerequisites()
+
+    database = mysql_service.databases[project]
+    assert mysql_service.values["initdbScripts"] == {"api.sql": database.creation_sql}
+    assert not mysql_service.values_files
+
+
 # ======================================================================
 # KUBERNETES CLUSTER _AND_ HELM SERVER REQUIRED FROM THIS POINT FORWARD
 # ======================================================================
@@ -5,10 +5,46 @@ import pytest
 
 from kolga.libs.helm import Helm
 from kolga.libs.kubernetes import Kubernetes
+from kolga.libs.service import Service
 from kolga.libs.services.postresql import PostgresqlService
+from kolga.settings import settings
 
 DEFAULT_TRACK = os.environ.get("DEFAULT_TRACK", "stable")
 
+
+def test_shared_server_artifacts() -> None:
+    track = DEFAULT_TRACK
+    postgresql_service = PostgresqlService(track=track, shared_server=True)
+    for name in ("api", "backend"):
+        postgresql_service.add_prerequisite(
+            Service(name=name, track=track, chart="testing/project")
+        )
+
+    postgresql_service.setup_prerequisites()
+    artifacts = postgresql_service.get_artifacts()
+
+    assert artifacts["API_K8S_SECRET_DATABASE_DB"] == f"{settings.K8S_NAMESPACE}_api"
+    assert (
+        artifacts["BACKEND_K8S_SECRET_DATABASE_DB"]
+        == f"{settings.K8S_NAMESPACE}_backend"
+    )
+    assert artifacts["API_K8S_SECRET_DATABASE_HOST"] == (
+        f"shared-{track}-postgresql.{settings.DATABASE_SHARED_SERVER_NAMESPACE}.svc"
+    )
+    assert (
+        artifacts["API_K8S_SECRET_DATABASE_USERNAME"]
+        != artifacts["BACKEND_K8S_SECRET_DATABASE_USERNAME"]
+    )
+    assert "auth" not in postgresql_service.get_shared_server_values()
+
+
+def test_shared_server_username_is_stable() -> None:
+    username = PostgresqlService.get_shared_database_username("testing_api")
+
+    assert username == PostgresqlService.get_shared_database_username("testing_api")
+    assert len(username) == 32
+
+
 # ======================================================================
 # KUBERNETES CLUSTER _AND_ HELM SERVER REQUIRED FROM THIS POINT FORWARD
 # ======================================================================
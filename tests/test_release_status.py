@@ -0,0 +1,190 @@
+from typing import Any, List, Optional
+from unittest import mock
+
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.libs.release_status import REVISION_ANNOTATION, ReleaseStatusCollector
+
+
+def _container_status(
+    name: str,
+    ready: bool = True,
+    restart_count: int = 0,
+    waiting_reason: Optional[str] = None,
+    last_terminated_reason: Optional[str] = None,
+) -> k8s_client.V1ContainerStatus:
+    state = k8s_client.V1ContainerState(
+        waiting=k8s_client.V1ContainerStateWaiting(reason=waiting_reason)
+        if waiting_reason
+        else None
+    )
+    last_state = k8s_client.V1ContainerState(
+        terminated=k8s_client.V1ContainerStateTerminated(
+            exit_code=137, reason=last_terminated_reason
+        )
+        if last_terminated_reason
+        else None
+    )
+    return k8s_client.V1ContainerStatus(
+        name=name,
+        image="image",
+        image_id="",
+        ready=ready,
+        restart_count=restart_count,
+        state=state,
+        last_state=last_state,
+    )
+
+
+def _pod(name: str, *containers: k8s_client.V1ContainerStatus) -> k8s_client.V1Pod:
+    return k8s_client.V1Pod(
+        metadata=k8s_client.V1ObjectMeta(name=name),
+        status=k8s_client.V1PodStatus(phase="Running", container_statuses=containers),
+    )
+
+
+def _paginated(pages: List[List[Any]]) -> mock.MagicMock:
+    """
+    A list function returning the pages one by one with continue tokens
+    """
+
+    def list_function(namespace: str, **kwargs: Any) -> Any:
+        index = int(kwargs.get("_continue") or 0)
+        _continue = str(index + 1) if index + 1 < len(pages) else None
+        return mock.MagicMock(
+            items=pages[index], metadata=k8s_client.V1ListMeta(_continue=_continue)
+        )
+
+    return mock.MagicMock(side_effect=list_function)
+
+
+def test_parse_pod() -> None:
+    pod = _pod(
+        "app-1",
+        _container_status(
+            "app",
+            ready=False,
+            restart_count=3,
+            waiting_reason="CrashLoopBackOff",
+            last_terminated_reason="OOMKilled",
+        ),
+        _container_status("sidecar", restart_count=1),
+    )
+
+    status = ReleaseStatusCollector.parse_pod(pod)
+
+    assert status.phase == "Running"
+    assert (status.ready_containers, status.containers) == (1, 2)
+    assert not status.ready
+    assert status.restarts == 4
+    assert status.waiting_reasons == ["app: CrashLoopBackOff"]
+    assert status.oom_killed == ["app"]
+
+
+def test_collect() -> None:
+    deployment = k8s_client.V1Deployment(
+        metadata=k8s_client.V1ObjectMeta(name="app"),
+        spec=k8s_client.V1DeploymentSpec(
+            replicas=2, selector=k8s_client.V1LabelSelector(), template={}
+        ),
+        status=k8s_client.V1DeploymentStatus(ready_replicas=1, updated_replicas=2),
+    )
+    replica_set = k8s_client.V1ReplicaSet(
+        metadata=k8s_client.V1ObjectMeta(
+            name="app-abc", annotations={REVISION_ANNOTATION: "4"}
+        ),
+        status=k8s_client.V1ReplicaSetStatus(replicas=2, ready_replicas=1),
+    )
+    pods = [
+        _pod("app-1", _container_status("app")),
+        _pod(
+            "app-2",
+            _container_status(
+                "app", ready=False, last_terminated_reason="OOMKilled", restart_count=2
+            ),
+        ),
+        _pod("app-3", _container_status("app")),
+    ]
+
+    apps_v1 = mock.MagicMock()
+    apps_v1.list_namespaced_deployment = _paginated([[deployment]])
+    apps_v1.list_namespaced_replica_set = mock.MagicMock(
+        side_effect=ApiException(status=403)
+    )
+    core_v1 = mock.MagicMock()
+    core_v1.list_namespaced_pod = _paginated([pods[:2], pods[2:]])
+
+    with mock.patch(
+        "kolga.libs.release_status.k8s_client.AppsV1Api", return_value=apps_v1
+    ), mock.patch(
+        "kolga.libs.release_status.k8s_client.CoreV1Api", return_value=core_v1
+    ):
+        collector = ReleaseStatusCollector(mock.MagicMock(), page_size=2)
+        status = collector.collect("testing", {"release": "app", "track": "stable"})
+
+    assert core_v1.list_namespaced_pod.call_count == 2
+    _, kwargs = core_v1.list_namespaced_pod.call_args
+    assert kwargs["label_selector"] == "release=app,track=stable"
+    assert kwargs["limit"] == 2
+
+    assert [pod.name for pod in status.pods] == ["app-1", "app-2", "app-3"]
+    assert status.deployments[0].ready_replicas == 1
+    assert status.deployments[0].replicas == 2
+    # A failing listing leaves the snapshot partial
+    assert status.replica_sets == []
+    assert ReleaseStatusCollector.parse_replica_set(replica_set).revision == "4"
+    assert status.restarts == 2
+    assert [pod.name for pod in status.oom_killed_pods] == ["app-2"]
+
+    rendered = str(status)
+    assert "app-2" in rendered
+    assert "OOMKilled" in rendered
+
+
+def test_collect_pod_labels() -> None:
+    def _list(*items: Any) -> mock.MagicMock:
+        def list_function(namespace: str, **kwargs: Any) -> Any:
+            selector = dict(r.split("=") for r in kwargs["label_selector"].split(","))
+            matching = [
+                item
+                for item in items
+                if selector.items() <= (item.metadata.labels or {}).items()
+            ]
+            return mock.MagicMock(items=matching, metadata=None)
+
+        return mock.MagicMock(side_effect=list_function)
+
+    labels = {"release": "app", "track": "stable"}
+    pod_labels = {**labels, "deploymentTime": "1234"}
+    # The Deployment doesn't have the labels of its pod template
+    deployment = k8s_client.V1Deployment(
+        metadata=k8s_client.V1ObjectMeta(name="app", labels=labels)
+    )
+    replica_set = k8s_client.V1ReplicaSet(
+        metadata=k8s_client.V1ObjectMeta(name="app-abc", labels=pod_labels)
+    )
+    pod = _pod("app-1", _container_status("app"))
+    pod.metadata.labels = pod_labels
+    old_pod = _pod("app-0", _container_status("app"))
+    old_pod.metadata.labels = {**labels, "deploymentTime": "1000"}
+
+    apps_v1 = mock.MagicMock()
+    apps_v1.list_namespaced_deployment = _list(deployment)
+    apps_v1.list_namespaced_replica_set = _list(replica_set)
+    core_v1 = mock.MagicMock()
+    core_v1.list_namespaced_pod = _list(old_pod, pod)
+
+    with mock.patch(
+        "kolga.libs.release_status.k8s_client.AppsV1Api", return_value=apps_v1
+    ), mock.patch(
+        "kolga.libs.release_status.k8s_client.CoreV1Api", return_value=core_v1
+    ):
+        collector = ReleaseStatusCollector(mock.MagicMock())
+        status = collector.collect(
+            "testing", labels, pod_labels={"deploymentTime": "1234"}
+        )
+
+    assert [d.name for d in status.deployments] == ["app"]
+    assert [rs.name for rs in status.replica_sets] == ["app-abc"]
+    assert [p.name for p in status.pods] == ["app-1"]
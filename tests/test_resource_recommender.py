@@ -0,0 +1,200 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from kubernetes import client as k8s_client
+
+from kolga.libs.resource_recommender import (
+    MetricsApiSource,
+    PrometheusSource,
+    get_deployment_pod_regex,
+    percentile,
+    recommend_resources,
+)
+from kolga.utils.models import ResourceUsage
+
+NAMESPACE = "testing"
+
+
+class FakeMetricsServer(ThreadingHTTPServer):
+    """
+    Local server answering like the Kubernetes metrics API and Prometheus
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakeMetricsHandler)
+        self.pods: List[Dict[str, Any]] = []
+        self.series: Dict[str, List[List[float]]] = {"cpu": [], "memory": []}
+        self.queries: List[Dict[str, List[str]]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeMetricsHandler(BaseHTTPRequestHandler):
+    server: FakeMetricsServer
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        self.server.queries.append(query)
+
+        if url.path == f"/apis/metrics.k8s.io/v1beta1/namespaces/{NAMESPACE}/pods":
+            body: Dict[str, Any] = {"kind": "PodMetricsList", "items": self.server.pods}
+        elif url.path == "/api/v1/query_range":
+            kind = "cpu" if "cpu" in query["query"][0] else "memory"
+            body = {
+                "status": "success",
+                "data": {
+                    "resultType": "matrix",
+                    "result": [
+                        {
+                            "metric": {"pod": f"app-{i}"},
+                            "values": [[0, str(value)] for value in values],
+                        }
+                        for i, values in enumerate(self.server.series[kind])
+                    ],
+                },
+            }
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def metrics_server() -> Iterator[FakeMetricsServer]:
+    server = FakeMetricsServer()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _pod_metrics(name: str, *containers: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "metadata": {"name": name, "namespace": NAMESPACE},
+        "containers": [
+            {"name": f"container-{i}", "usage": usage}
+            for i, usage in enumerate(containers)
+        ],
+    }
+
+
+def test_percentile() -> None:
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([5, 1, 4, 2, 3], 90) == pytest.approx(4.6)
+    assert percentile([7], 99) == 7
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def test_get_deployment_pod_regex() -> None:
+    pod_regex = re.compile(get_deployment_pod_regex(["review-1", "review-1-api"]))
+
+    assert pod_regex.fullmatch("review-1-7d9f8c6b5-x2k4q")
+    assert pod_regex.fullmatch("review-1-api-5c8b7f-zt9wb")
+    # Services and dependency projects of the environment
+    assert not pod_regex.fullmatch("review-1-postgresql-0")
+    assert not pod_regex.fullmatch("review-1-rabbitmq-7d9f8c6b5-x2k4q")
+    assert not pod_regex.fullmatch("review-1-initialize-x2k4q")
+
+
+def test_recommend_resources() -> None:
+    usage = ResourceUsage(
+        cpu_cores=[0.1 * i for i in range(1, 11)],
+        memory_bytes=[100 * 1024**2 * i for i in range(1, 11)],
+    )
+
+    recommendation = recommend_resources(
+        usage, request_percentile=50, limit_percentile=100, headroom=0.5
+    )
+
+    assert recommendation.as_settings() == {
+        "K8S_REQUEST_CPU": "550m",
+        "K8S_REQUEST_RAM": "550Mi",
+        "K8S_LIMIT_CPU": "1500m",
+        "K8S_LIMIT_RAM": "1500Mi",
+    }
+    assert recommendation.samples == 10
+
+
+def test_recommend_resources_minimum() -> None:
+    usage = ResourceUsage(cpu_cores=[0.0001], memory_bytes=[1024])
+
+    recommendation = recommend_resources(usage)
+
+    assert recommendation.request_cpu == "10m"
+    assert recommendation.request_ram == "32Mi"
+
+
+def test_recommend_resources_without_usage() -> None:
+    with pytest.raises(ValueError):
+        recommend_resources(ResourceUsage())
+
+
+def test_metrics_api_source(metrics_server: FakeMetricsServer) -> None:
+    metrics_server.pods = [
+        _pod_metrics("app-1", {"cpu": "250m", "memory": "100Mi"}),
+        _pod_metrics(
+            "app-2",
+            {"cpu": "500000000n", "memory": "200Mi"},
+            {"cpu": "10m", "memory": "1Mi"},
+        ),
+    ]
+    api_client = k8s_client.ApiClient(
+        configuration=k8s_client.Configuration(host=metrics_server.url)
+    )
+    source = MetricsApiSource(
+        custom_objects=k8s_client.CustomObjectsApi(api_client),
+        namespace=NAMESPACE,
+        label_selector="release=app,deploymentTime",
+        samples=2,
+        interval=0,
+    )
+
+    usage = source.get_usage()
+
+    assert usage.cpu_cores == pytest.approx([0.25, 0.51] * 2)
+    assert usage.memory_bytes == [100 * 1024**2, 201 * 1024**2] * 2
+    assert metrics_server.queries[0]["labelSelector"] == ["release=app,deploymentTime"]
+
+
+def test_prometheus_source(metrics_server: FakeMetricsServer) -> None:
+    metrics_server.series = {
+        "cpu": [[0.1, 0.2], [0.3]],
+        "memory": [[1000.0, 2000.0], [3000.0]],
+    }
+    source = PrometheusSource(
+        url=metrics_server.url,
+        namespace=NAMESPACE,
+        pod_regex=get_deployment_pod_regex(["app.v2"]),
+        window=3600,
+    )
+
+    usage = source.get_usage()
+
+    assert usage.cpu_cores == [0.1, 0.2, 0.3]
+    assert usage.memory_bytes == [1000.0, 2000.0, 3000.0]
+    query = metrics_server.queries[0]
+    assert f'namespace="{NAMESPACE}"' in query["query"][0]
+    assert 'pod=~"(app\\\\.v2)-' in query["query"][0]
+    assert float(query["end"][0]) - float(query["start"][0]) == pytest.approx(3600)
@@ -1,6 +1,7 @@
 import json
 import tempfile
 from contextlib import nullcontext as does_not_raise
+from importlib.metadata import EntryPoint
 from pathlib import Path
 from random import sample
 from string import ascii_lowercase
@@ -8,10 +9,13 @@ from typing import TYPE_CHECKING, Any, ContextManager, Dict, Optional, Type, cas
 from unittest import mock
 
 import pytest
+from environs import Env
 from pydantic import ValidationError
 
 import kolga
+from kolga.plugins import _read_manifests, get_entry_point_manifests
 from kolga.plugins.base import PluginBase
+from kolga.plugins.manifest import PluginManifest
 from kolga.settings import GitHubActionsMapper, Settings, settings
 from kolga.utils.models import BasicAuthUser
 from tests import MockEnv
@@ -179,6 +183,107 @@ def test_load_unload_plugins(test_plugin: Type[PluginBase]) -> None:
     assert settings._unload_plugin(plugin=test_plugin)
 
 
+class ManifestTestPlugin(PluginBase):
+    name = "manifest_test_plugin"
+    verbose_name = "Kolga Manifest Test Plugin"
+
+    def __init__(self, env: Env) -> None:
+        self.required_variables = [("TEST_PLUGIN_VARIABLE", env.str)]
+        self.configure(env)
+
+
+MANIFEST = PluginManifest(
+    name="manifest_test_plugin",
+    module=__name__,
+    attribute="ManifestTestPlugin",
+    required_variables=["TEST_PLUGIN_VARIABLE"],
+)
+
+
+def test_core_plugin_manifests() -> None:
+    manifests = list(_read_manifests())
+    assert [manifest.name for manifest in manifests] == [
+        "binfmt",
+        "opentelemetry",
+        "sentry",
+        "slack",
+    ]
+
+    for manifest in manifests:
+        plugin = manifest.load()
+        assert plugin.name == manifest.name
+        assert PluginManifest.get_implemented_hooks(plugin) == set(manifest.hooks)
+
+
+def test_read_manifests_without_manifest(tmp_path: Path) -> None:
+    (tmp_path / "legacy").mkdir()
+    (tmp_path / "legacy" / "__init__.py").touch()
+    (tmp_path / "described").mkdir()
+    (tmp_path / "described" / "__init__.py").touch()
+    (tmp_path / "described" / "plugin.toml").write_text(
+        'name = "described"\nrequired_variables = ["DESCRIBED"]\n'
+    )
+    (tmp_path / "not_a_package").mkdir()
+
+    manifests = list(_read_manifests(tmp_path))
+
+    # Packages without a manifest are still imported, as they were before
+    assert manifests == [
+        PluginManifest(
+            name="described",
+            module="kolga.plugins.described",
+            required_variables=["DESCRIBED"],
+        ),
+        PluginManifest(name="legacy", module="kolga.plugins.legacy"),
+    ]
+
+
+def test_load_plugins_skips_unconfigured() -> None:
+    missing = PluginManifest(
+        name="missing", module="kolga.plugins.missing", required_variables=["MISSING"]
+    )
+    with mock.patch("kolga.settings.KOLGA_CORE_PLUGINS", [missing, MANIFEST]):
+        settings.load_plugins()
+
+    # Neither plugin was imported, so the missing module was never looked up
+    assert not settings.plugin_manager.get_plugin(MANIFEST.name)
+    assert MANIFEST.name not in settings.plugin_load_times
+
+
+@mock.patch.dict("os.environ", {"TEST_PLUGIN_VARIABLE": "odins_raven"})
+def test_load_plugins_from_manifest() -> None:
+    with mock.patch("kolga.settings.KOLGA_CORE_PLUGINS", [MANIFEST]):
+        settings.load_plugins()
+
+    try:
+        assert isinstance(
+            settings.plugin_manager.get_plugin(MANIFEST.name), ManifestTestPlugin
+        )
+        assert settings.plugin_load_times[MANIFEST.name] >= 0
+    finally:
+        settings._unload_plugin(ManifestTestPlugin)
+
+
+def test_entry_point_manifests() -> None:
+    points = [
+        EntryPoint(
+            name="manifest", value=f"{__name__}:MANIFEST", group="kolga.plugins"
+        ),
+        EntryPoint(
+            name="direct",
+            value=f"{__name__}:ManifestTestPlugin",
+            group="kolga.plugins",
+        ),
+    ]
+    with mock.patch("kolga.plugins.entry_points", return_value=points):
+        manifests = get_entry_point_manifests()
+
+    assert manifests[0] is MANIFEST
+    assert manifests[1] == PluginManifest(
+        name="direct", module=__name__, attribute="ManifestTestPlugin"
+    )
+
+
 def test_gh_event_data_set(mockenv: MockEnv) -> None:
     # The test data is a subset of the full specification example:
     # https://docs.github.com/en/developers/webhooks-and-events/webhook-events-and-payloads#pull_request
@@ -0,0 +1,128 @@
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from kolga.utils.build_context import (
+    DockerIgnore,
+    analyze_build_context,
+    create_minimal_context,
+)
+from kolga.utils.dockerfile import parse_dockerfile
+
+
+@pytest.mark.parametrize(
+    "patterns, path, expected",
+    [
+        (["node_modules"], "node_modules/react/index.js", True),
+        (["node_modules"], "app/node_modules/react/index.js", False),
+        (["**/node_modules"], "app/node_modules/react/index.js", True),
+        (["/build"], "build/main.js", True),
+        (["*.md"], "README.md", True),
+        (["*.md"], "docs/README.md", False),
+        (["docs/*.md"], "docs/README.md", True),
+        (["*.md", "!README.md"], "README.md", False),
+        (["*.md", "!README.md", "README*"], "README.md", True),
+        (["# comment", "", "src/?.py"], "src/a.py", True),
+        (["src/[ab].py"], "src/c.py", False),
+    ],
+)
+def test_dockerignore(patterns: List[str], path: str, expected: bool) -> None:
+    assert DockerIgnore(patterns).is_ignored(path) is expected
+
+
+def _create_files(root: Path, files: Dict[str, int]) -> None:
+    for path, size in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(b"x" * size)
+
+
+DOCKERFILE = """\
+FROM python:3.12 AS base
+COPY requirements.txt /app/
+RUN --mount=type=bind,source=scripts,target=/scripts /scripts/install.sh
+
+FROM base
+COPY ["src", "/app/src"]
+ADD https://example.com/archive.tar.gz /tmp/
+"""
+
+
+@pytest.fixture
+def context(tmp_path: Path) -> Path:
+    _create_files(
+        tmp_path,
+        {
+            "requirements.txt": 10,
+            "scripts/install.sh": 20,
+            "src/app.py": 100,
+            "src/app/views.py": 200,
+            "docs/index.md": 1000,
+            "node_modules/react/index.js": 5000,
+            ".git/objects/pack": 10000,
+        },
+    )
+    (tmp_path / "Dockerfile").write_text(DOCKERFILE)
+    (tmp_path / ".dockerignore").write_text("node_modules\n.git\n")
+    return tmp_path
+
+
+def test_analyze_build_context(context: Path) -> None:
+    sources = parse_dockerfile(DOCKERFILE).context_sources
+    assert sources == ["requirements.txt", "scripts", "src"]
+
+    report = analyze_build_context(
+        context, sources=sources, dockerfile=context / "Dockerfile", top=2
+    )
+
+    assert report.file_count == 7
+    assert report.largest_paths == [("docs", 1000), ("src", 300)]
+    assert report.unused_bytes == 1000
+    assert report.unused_paths == [("docs", 1000)]
+    assert sorted(report.used_files) == [
+        ".dockerignore",
+        "Dockerfile",
+        "requirements.txt",
+        "scripts/install.sh",
+        "src/app.py",
+        "src/app/views.py",
+    ]
+
+
+def test_analyze_build_context_copy_all(context: Path) -> None:
+    report = analyze_build_context(context, sources=["./"])
+
+    assert report.unused_bytes == 0
+    assert len(report.used_files) == report.file_count
+
+
+def test_create_minimal_context(
+    context: Path, tmp_path_factory: pytest.TempPathFactory
+) -> None:
+    destination = tmp_path_factory.mktemp("minimal")
+    sources = parse_dockerfile(DOCKERFILE).context_sources
+    report = analyze_build_context(context, sources=sources)
+
+    create_minimal_context(context, report.used_files, destination)
+
+    assert (destination / "src" / "app" / "views.py").read_bytes() == b"x" * 200
+    assert not (destination / "docs").exists()
+    assert not (destination / "node_modules").exists()
+
+
+def test_create_minimal_context_directory_symlink(
+    context: Path, tmp_path_factory: pytest.TempPathFactory
+) -> None:
+    destination = tmp_path_factory.mktemp("minimal")
+    (context / "src" / "lib").symlink_to(context / "scripts")
+    sources = parse_dockerfile(DOCKERFILE).context_sources
+    report = analyze_build_context(context, sources=sources)
+
+    assert "src/lib" in report.used_files
+    assert "src/lib/install.sh" not in report.used_files
+
+    create_minimal_context(context, report.used_files, destination)
+
+    link = destination / "src" / "lib"
+    assert link.is_symlink()
+    assert link.readlink() == context / "scripts"
@@ -1,7 +1,11 @@
+import gzip
+import json
 import os
 import re
+import sys
 from contextlib import nullcontext as does_not_raise
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 from unittest import mock
 from uuid import uuid4
 
@@ -10,20 +14,26 @@ import pytest
 from kolga.settings import settings
 from kolga.utils.exceptions import ImproperlyConfigured
 from kolga.utils.general import (
+    ARTIFACT_INDEX_FILENAME,
     DEPLOY_NAME_MAX_HELM_NAME_LENGTH,
     camel_case_split,
     create_artifact_file_from_dict,
     deep_get,
+    format_bytes,
     get_deploy_name,
     get_environment_vars_by_prefix,
     get_project_secret_var,
     get_secret_name,
     get_track,
     loads_json,
-    string_to_yaml,
+    parse_size,
+    read_artifact_env_dir,
+    run_os_command,
     truncate_with_hash,
     unescape_string,
 )
+from kolga.utils.log_artifacts import bound_output
+from tests.testcase import override_settings
 
 DEFAULT_TRACK = os.environ.get("DEFAULT_TRACK", "stable")
 
@@ -149,44 +159,6 @@ def test_unescape_string(value: str, expected_value: Optional[str]) -> None:
     assert unescaped_value == expected_value
 
 
-@pytest.mark.parametrize(
-    "value, expected_value, indentation, strip",
-    (
-        ("Hello World", b"Hello World", 0, True),  # No change
-        ("  Hello World!  ", b"Hello World!", 0, True),  # Strip
-        ("  Hello World!  ", b"  Hello World!  ", 0, False),  # No strip
-        ("Hello \n World", b"|-\nHello\nWorld", 0, True),  # \n in string + strip
-        ("Hello \n World", b"|-\nHello \n World", 0, False),  # \n in string + no strip
-        (" Hello World", b"  Hello World", 1, False),  # Indentation + no strip
-        ("Hello World", b" Hello World", 1, True),  # Indentation + strip
-        ("Hello World", b"    Hello World", 4, True),  # Indentation + strip
-        (
-            "Hello \n World",
-            b"|-\n Hello\n World",
-            1,
-            True,
-        ),  # Indentation + \n in string + strip
-        (
-            "Hello \n World",
-            b"|-\n Hello \n  World",
-            1,
-            False,
-        ),  # Indentation + \n in string + no strip
-        (
-            "Hello \n World",
-            b"|-\n    Hello\n    World",
-            4,
-            True,
-        ),  # Indentation + \n in string
-    ),
-)
-def test_string_to_yaml(
-    value: str, expected_value: bytes, indentation: int, strip: bool
-) -> None:
-    yaml_string = string_to_yaml(value, indentation=indentation, strip=strip)
-    assert yaml_string == expected_value
-
-
 def test_truncate_with_hash() -> None:
     truncated_string = truncate_with_hash("abcde", 4)
     assert truncated_string == "a-36"
@@ -225,6 +197,44 @@ def test_create_artifact_file_from_dict(tmp_path: Any) -> None:
     assert file_lines == assert_data
 
 
+def test_read_artifact_env_dir_index(tmp_path: Path) -> None:
+    create_artifact_file_from_dict(str(tmp_path), {"A": "1", "B": "2"}, "first")
+    create_artifact_file_from_dict(str(tmp_path), {"C": "3"}, "second")
+    create_artifact_file_from_dict(str(tmp_path), {"C": "4"}, "second")
+
+    with mock.patch("kolga.utils.general.dotenv_values") as dotenv_values:
+        with mock.patch.object(Path, "read_bytes") as read_bytes:
+            values = read_artifact_env_dir(tmp_path)
+
+    assert values == {"A": "1", "B": "2", "C": "4"}
+    dotenv_values.assert_not_called()
+    read_bytes.assert_not_called()
+
+    # Rewriting a file replaces its entry instead of adding another one
+    index = json.loads((tmp_path / ARTIFACT_INDEX_FILENAME).read_text())
+    assert sorted(index["files"]) == ["first.env", "second.env"]
+
+
+def test_read_artifact_env_dir_stale_index(tmp_path: Path) -> None:
+    env_file = create_artifact_file_from_dict(str(tmp_path), {"A": "1"}, "first")
+    env_file.write_text("A=22\n")
+    (tmp_path / "unindexed.env").write_text("B=3\n")
+
+    assert read_artifact_env_dir(tmp_path) == {"A": "22", "B": "3"}
+
+    with mock.patch("kolga.utils.general.dotenv_values") as dotenv_values:
+        assert read_artifact_env_dir(tmp_path) == {"A": "22", "B": "3"}
+    dotenv_values.assert_not_called()
+
+
+def test_read_artifact_env_dir_corrupt_index(tmp_path: Path) -> None:
+    create_artifact_file_from_dict(str(tmp_path), {"A": "1"}, "first")
+    (tmp_path / ARTIFACT_INDEX_FILENAME).write_text('{"files": {"first.env"')
+
+    assert read_artifact_env_dir(tmp_path) == {"A": "1"}
+    assert read_artifact_env_dir(tmp_path / "missing") == {}
+
+
 @pytest.mark.parametrize(
     "value, expected_value",
     (
@@ -262,3 +272,81 @@ def test_get_track(
         with mock.patch.object(settings, "TRACK", track_env):
             with assumption:
                 assert get_track(track) == expected_value
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [
+        (0, "0 B"),
+        (1023, "1023 B"),
+        (1536, "1.5 KiB"),
+        (5 * 1024**3, "5.0 GiB"),
+        (2 * 1024**4, "2.0 TiB"),
+    ],
+)
+def test_format_bytes(size: int, expected: str) -> None:
+    assert format_bytes(size) == expected
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [
+        ("0B", 0),
+        ("512B", 512),
+        ("1.5kB", 1500),
+        ("1.23GB", 1_230_000_000),
+        ("2KiB", 2048),
+        ("10gb", 10_000_000_000),
+    ],
+)
+def test_parse_size(size: str, expected: int) -> None:
+    assert parse_size(size) == expected
+
+
+def test_parse_size_invalid() -> None:
+    with pytest.raises(ValueError):
+        parse_size("a lot")
+
+
+def test_run_os_command_log_artifact(tmp_path: Path) -> None:
+    script = (
+        "import sys\n"
+        "for i in range(1000):\n"
+        "    print(f'out {i}')\n"
+        "    print(f'err {i}', file=sys.stderr)\n"
+    )
+
+    with override_settings(BUILD_ARTIFACT_FOLDER=str(tmp_path)):
+        result = run_os_command([sys.executable, "-c", script], log_artifact="a/b")
+
+    assert result.return_code == 0
+    assert result.out.splitlines()[-1] == "out 999"
+    assert result.err.splitlines()[-1] == "err 999"
+    assert result.log_file == str(tmp_path / "logs" / "a-b.log.gz")
+
+    with gzip.open(result.log_file, "rt") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 2000
+    assert sorted(lines) == sorted([*result.out.splitlines(), *result.err.splitlines()])
+
+
+def test_run_os_command_without_artifact_folder() -> None:
+    with override_settings(BUILD_ARTIFACT_FOLDER=""):
+        result = run_os_command(["echo", "test"], log_artifact="echo")
+
+    assert result.out == "test\n"
+    assert result.log_file == ""
+
+
+@pytest.mark.parametrize(
+    "head_lines, tail_lines, expected",
+    [
+        (0, 0, [str(i) for i in range(10)]),
+        (5, 5, [str(i) for i in range(10)]),
+        (2, 3, ["0", "1", "... 5 lines omitted ...", "7", "8", "9"]),
+        (2, 0, ["0", "1", "... 8 lines omitted ..."]),
+    ],
+)
+def test_bound_output(head_lines: int, tail_lines: int, expected: List[str]) -> None:
+    output = "\n".join(str(i) for i in range(10))
+    assert bound_output(output, head_lines, tail_lines).splitlines() == expected
@@ -0,0 +1,152 @@
+import gzip
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+import pytest
+
+from kolga.hooks import hookimpl
+from kolga.plugins.base import PluginBase
+from kolga.utils.general import run_os_command
+from kolga.utils.models import SubprocessResult
+from kolga.utils.retry import get_retry_delay, get_retry_reason
+from tests.testcase import load_plugin, override_settings
+
+
+def _result(return_code: int = 0, err: str = "") -> SubprocessResult:
+    return SubprocessResult(
+        out="", err=err, return_code=return_code, child=None, command=""
+    )
+
+
+@pytest.mark.parametrize(
+    "command, result, expected",
+    [
+        (
+            ["docker", "buildx", "build", "--push"],
+            _result(1, "ERROR: failed to push: 502 Bad Gateway"),
+            "502 Bad Gateway",
+        ),
+        (
+            ["helm", "repo", "update"],
+            _result(1, "read tcp 10.0.0.1:443: connection reset by peer"),
+            "connection reset by peer",
+        ),
+        (
+            ["/usr/local/bin/kubectl", "apply"],
+            _result(1, "Error from server: the server has received too many requests"),
+            "the server has received too many requests",
+        ),
+        # Permanent failures
+        (["docker", "build"], _result(1, "failed to solve: exit code: 2"), None),
+        (["helm", "upgrade"], _result(1, "UPGRADE FAILED: timed out"), None),
+        # Succeeded
+        (["kubectl", "apply"], _result(0, "connection refused"), None),
+        # No classifier for the tool
+        (["ls"], _result(1, "connection refused"), None),
+        ([], _result(1, "connection refused"), None),
+    ],
+)
+def test_get_retry_reason(
+    command: List[str], result: SubprocessResult, expected: Optional[str]
+) -> None:
+    assert get_retry_reason(command, result) == expected
+
+
+def test_get_retry_delay() -> None:
+    for attempt, expected in ((1, 2.0), (2, 4.0), (3, 8.0), (10, 30.0)):
+        delay = get_retry_delay(attempt, base_delay=2.0, max_delay=30.0)
+        assert expected / 2 <= delay <= expected
+
+
+class RetryTrackingPlugin(PluginBase):
+    name = "retry_tracking_plugin"
+    verbose_name = "Retry-tracking Test plugin"
+    version = 0.1
+
+    retries: List[Dict[str, Any]] = []
+
+    @hookimpl
+    def command_retry(
+        self, command: str, attempt: int, delay: float, reason: str
+    ) -> Optional[bool]:
+        self.retries.append(
+            {"command": command, "attempt": attempt, "delay": delay, "reason": reason}
+        )
+        return True
+
+
+@mock.patch("kolga.utils.general.time.sleep")
+def test_run_os_command_retries(mock_sleep: mock.MagicMock) -> None:
+    results = [
+        _result(1, "dial tcp: i/o timeout"),
+        _result(1, "503 Service Unavailable"),
+        _result(0),
+    ]
+    RetryTrackingPlugin.retries = []
+    with load_plugin(RetryTrackingPlugin), mock.patch(
+        "kolga.utils.general._run_os_command_once", side_effect=results
+    ):
+        result = run_os_command(["helm", "repo", "update"], retry=True)
+
+    assert result.return_code == 0
+    assert result.attempts == 3
+    assert mock_sleep.call_count == 2
+    assert [retry["attempt"] for retry in RetryTrackingPlugin.retries] == [1, 2]
+    assert [retry["reason"] for retry in RetryTrackingPlugin.retries] == [
+        "i/o timeout",
+        "503 Service Unavailable",
+    ]
+
+
+@mock.patch("kolga.utils.general.time.sleep")
+def test_run_os_command_retry_log_artifacts(
+    mock_sleep: mock.MagicMock, tmp_path: Path
+) -> None:
+    script = (
+        "import pathlib, sys\n"
+        f"marker = pathlib.Path({str(tmp_path / 'attempted')!r})\n"
+        "if not marker.exists():\n"
+        "    marker.touch()\n"
+        "    sys.exit('git: connection refused')\n"
+        "print('done')\n"
+    )
+    with override_settings(BUILD_ARTIFACT_FOLDER=str(tmp_path)), mock.patch(
+        "kolga.utils.general.get_retry_reason",
+        side_effect=lambda command, result: "connection refused"
+        if result.return_code
+        else None,
+    ):
+        result = run_os_command(
+            [sys.executable, "-c", script], log_artifact="git", retry=True
+        )
+
+    assert result.attempts == 2
+    assert result.log_file == str(tmp_path / "logs" / "git-attempt-2.log.gz")
+    # The output of the failed attempt is kept
+    with gzip.open(tmp_path / "logs" / "git.log.gz", "rt") as f:
+        assert f.read() == "git: connection refused\n"
+    with gzip.open(result.log_file, "rt") as f:
+        assert f.read() == "done\n"
+
+
+@mock.patch("kolga.utils.general.time.sleep")
+def test_run_os_command_retry_limits(mock_sleep: mock.MagicMock) -> None:
+    failure = _result(1, "connection refused")
+    with mock.patch(
+        "kolga.utils.general._run_os_command_once", return_value=failure
+    ) as mock_run:
+        # Commands are only retried on request
+        assert run_os_command(["kubectl", "get", "pods"]).attempts == 1
+        assert mock_run.call_count == 1
+
+        with override_settings(KOLGA_COMMAND_RETRY_ATTEMPTS=5):
+            result = run_os_command(["kubectl", "get", "pods"], retry=True)
+        assert result.attempts == 5
+        assert result.return_code == 1
+
+        # No time left in the budget for waiting
+        with override_settings(KOLGA_COMMAND_RETRY_BUDGET=0):
+            result = run_os_command(["kubectl", "get", "pods"], retry=True)
+            assert result.attempts == 1
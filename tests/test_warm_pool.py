@@ -0,0 +1,250 @@
+import copy
+import os
+import threading
+from typing import Any, Dict, List
+from unittest import mock
+
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from kolga.libs.service import Service
+from kolga.libs.services.postresql import PostgresqlService
+from kolga.libs.services.rabbitmq import RabbitmqService
+from kolga.libs.warm_pool import (
+    INSTANCE_LABEL,
+    STATE_CLAIMED,
+    STATE_READY,
+    WARM_POOL_CLAIMED_BY_LABEL,
+    WARM_POOL_SPEC_LABEL,
+    WARM_POOL_STATE_LABEL,
+    WarmPool,
+)
+from kolga.utils.models import SubprocessResult
+
+DEFAULT_TRACK = os.environ.get("DEFAULT_TRACK", "stable")
+POOL_NAMESPACE = "warm-pool"
+
+
+def _matches(labels: Dict[str, str], label_selector: str) -> bool:
+    for requirement in label_selector.split(","):
+        key, value = requirement.split("=")
+        if labels.get(key) != value:
+            return False
+    return True
+
+
+class FakeCoreV1Api:
+    """
+    In-memory stand-in for the parts of ``CoreV1Api`` used by the warm pool
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.secrets: Dict[str, k8s_client.V1Secret] = {}
+        self.ready_instances: List[str] = []
+        self.deleted_pvcs: List[str] = []
+
+    def list_namespaced_secret(
+        self, namespace: str, label_selector: str
+    ) -> k8s_client.V1SecretList:
+        with self.lock:
+            items = [
+                copy.deepcopy(secret)
+                for secret in self.secrets.values()
+                if _matches(secret.metadata.labels, label_selector)
+            ]
+        return k8s_client.V1SecretList(items=items)
+
+    def create_namespaced_secret(
+        self, namespace: str, body: k8s_client.V1Secret
+    ) -> k8s_client.V1Secret:
+        with self.lock:
+            if body.metadata.name in self.secrets:
+                raise ApiException(status=409)
+            body = copy.deepcopy(body)
+            body.metadata.resource_version = "1"
+            self.secrets[body.metadata.name] = body
+        return body
+
+    def replace_namespaced_secret(
+        self, name: str, namespace: str, body: k8s_client.V1Secret
+    ) -> k8s_client.V1Secret:
+        with self.lock:
+            current = self.secrets[name]
+            if body.metadata.resource_version != current.metadata.resource_version:
+                raise ApiException(status=409)
+            body = copy.deepcopy(body)
+            body.metadata.resource_version = str(
+                int(current.metadata.resource_version) + 1
+            )
+            self.secrets[name] = body
+        return body
+
+    def delete_namespaced_secret(self, name: str, namespace: str) -> None:
+        with self.lock:
+            del self.secrets[name]
+
+    def list_namespaced_pod(
+        self, namespace: str, label_selector: str
+    ) -> k8s_client.V1PodList:
+        release_name = label_selector.split("=")[1]
+        items = []
+        if release_name in self.ready_instances:
+            condition = k8s_client.V1PodCondition(type="Ready", status="True")
+            items.append(
+                k8s_client.V1Pod(status=k8s_client.V1PodStatus(conditions=[condition]))
+            )
+        return k8s_client.V1PodList(items=items)
+
+    def delete_collection_namespaced_persistent_volume_claim(
+        self, namespace: str, label_selector: str
+    ) -> None:
+        self.deleted_pvcs.append(label_selector)
+
+
+def _get_warm_pool(size: int = 2) -> Any:
+    helm = mock.MagicMock()
+    helm.upgrade_chart.return_value = SubprocessResult(
+        out="", err="", return_code=0, child=None, command=""
+    )
+    return WarmPool(
+        core_v1=FakeCoreV1Api(), helm=helm, namespace=POOL_NAMESPACE, size=size
+    )
+
+
+def _get_postgresql_service() -> PostgresqlService:
+    service = PostgresqlService(track=DEFAULT_TRACK)
+    service.add_prerequisite(
+        Service(name="api", track=DEFAULT_TRACK, chart="testing/project")
+    )
+    return service
+
+
+def test_replenish() -> None:
+    warm_pool = _get_warm_pool(size=2)
+    service = _get_postgresql_service()
+
+    assert warm_pool.replenish(service) == 2
+    assert warm_pool.replenish(service) == 0
+    assert len(warm_pool.core_v1.secrets) == 2
+
+    _, kwargs = warm_pool.helm.upgrade_chart.call_args
+    assert kwargs["namespace"] == POOL_NAMESPACE
+    assert kwargs["atomic"] is False
+    assert kwargs["values"]["fullnameOverride"] == kwargs["name"]
+
+
+def test_replenish_removes_outdated_instances() -> None:
+    warm_pool = _get_warm_pool(size=1)
+    old_service = _get_postgresql_service()
+    warm_pool.replenish(old_service)
+    (old_release,) = warm_pool.core_v1.secrets
+
+    service = PostgresqlService(track=DEFAULT_TRACK, chart_version="12.2.0")
+    assert warm_pool.replenish(service) == 1
+    assert old_release not in warm_pool.core_v1.secrets
+    assert warm_pool.core_v1.deleted_pvcs == [f"{INSTANCE_LABEL}={old_release}"]
+    warm_pool.helm.uninstall_chart.assert_called_once_with(
+        name=old_release, namespace=POOL_NAMESPACE
+    )
+
+
+def test_replenish_failed_install() -> None:
+    warm_pool = _get_warm_pool(size=1)
+    warm_pool.helm.upgrade_chart.return_value.return_code = 1
+
+    warm_pool.replenish(_get_postgresql_service())
+
+    assert not warm_pool.core_v1.secrets
+
+
+def test_claim() -> None:
+    warm_pool = _get_warm_pool(size=1)
+    service = _get_postgresql_service()
+    warm_pool.replenish(service)
+    (release_name,) = warm_pool.core_v1.secrets
+
+    # Instances are not handed out before they are ready
+    assert not warm_pool.claim(service, namespace="review-1")
+
+    warm_pool.core_v1.ready_instances.append(release_name)
+    assert warm_pool.claim(service, namespace="review-1")
+
+    labels = warm_pool.core_v1.secrets[release_name].metadata.labels
+    assert labels[WARM_POOL_STATE_LABEL] == STATE_CLAIMED
+    assert labels[WARM_POOL_CLAIMED_BY_LABEL] == "review-1"
+
+    artifacts = service.get_artifacts()
+    assert artifacts["API_K8S_SECRET_DATABASE_HOST"] == (
+        f"{release_name}.{POOL_NAMESPACE}.svc"
+    )
+
+    # The instance can only be claimed once
+    assert not warm_pool.claim(_get_postgresql_service(), namespace="review-2")
+
+
+def test_claim_ignores_other_specs() -> None:
+    warm_pool = _get_warm_pool(size=1)
+    warm_pool.replenish(_get_postgresql_service())
+    warm_pool.core_v1.ready_instances.extend(warm_pool.core_v1.secrets)
+
+    service = PostgresqlService(track=DEFAULT_TRACK, chart_version="12.2.0")
+    assert not warm_pool.claim(service, namespace="review-1")
+
+
+def test_claim_conflict() -> None:
+    warm_pool = _get_warm_pool(size=1)
+    service = RabbitmqService(track=DEFAULT_TRACK)
+    warm_pool.replenish(service)
+    (release_name,) = warm_pool.core_v1.secrets
+    warm_pool.core_v1.ready_instances.append(release_name)
+
+    # Simulate a concurrent claim between listing and relabeling the instance
+    listed = warm_pool._list_service_instances(service)
+    other_pool = _get_warm_pool()
+    other_pool.core_v1 = warm_pool.core_v1
+    assert other_pool.claim(RabbitmqService(track=DEFAULT_TRACK), "review-2")
+
+    with mock.patch.object(warm_pool, "_list_service_instances", return_value=listed):
+        assert not warm_pool.claim(service, namespace="review-1")
+    assert service.server_url is None
+
+
+def test_release() -> None:
+    warm_pool = _get_warm_pool(size=2)
+    service = RabbitmqService(track=DEFAULT_TRACK)
+    warm_pool.replenish(service)
+    warm_pool.core_v1.ready_instances.extend(warm_pool.core_v1.secrets)
+    assert warm_pool.claim(service, namespace="review-1")
+
+    released = warm_pool.release(namespace="review-1")
+
+    assert len(released) == 1
+    assert released[0] not in warm_pool.core_v1.secrets
+    (remaining,) = warm_pool.core_v1.secrets.values()
+    assert remaining.metadata.labels[WARM_POOL_STATE_LABEL] == STATE_READY
+    assert remaining.metadata.labels[WARM_POOL_SPEC_LABEL] == WarmPool.get_spec(service)
+
+
+def test_replenish_in_background() -> None:
+    warm_pool = _get_warm_pool(size=1)
+
+    thread = warm_pool.replenish_in_background(RabbitmqService(track=DEFAULT_TRACK))
+    thread.join()
+
+    assert not thread.daemon
+    assert len(warm_pool.core_v1.secrets) == 1
+
+
+def test_replenish_in_background_failure() -> None:
+    warm_pool = _get_warm_pool(size=1)
+    warm_pool.replenish(RabbitmqService(track=DEFAULT_TRACK))
+    warm_pool.helm.uninstall_chart.side_effect = Exception("Helm uninstall failed")
+
+    # Outdated instances are removed first, which fails
+    service = RabbitmqService(track=DEFAULT_TRACK, chart_version="8.0.0")
+    with mock.patch("kolga.libs.warm_pool.logger") as logger:
+        thread = warm_pool.replenish_in_background(service)
+        thread.join()
+
+    assert "Helm uninstall failed" in logger.warning.call_args.kwargs["message"]